@@ -0,0 +1,215 @@
+from datetime import datetime, time, timedelta
+
+from django.db.models import Count, Sum
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils import timezone
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from .conditional import upload_version, make_etag, not_modified, add_etag
+from .models import DatasetRollup, DatasetTypeCount, Equipment
+from .partitions import query_readings
+from .renderers import LIST_RENDERER_CLASSES
+from .serializers import format_datetime
+
+# Questions across all of a user's uploads, answered with GROUP BY /
+# indexed lookups on DatasetTypeCount and EquipmentReading instead of reading
+# and decoding every dataset's equipment_distribution JSON (or the files).
+# They change only when an upload is added or deleted, so they use the same
+# ETag as get-history/.
+
+
+def page_params(request):
+    # limit / offset like get-history/, ValueError when they aren't numbers
+    return int(request.GET.get("limit") or 5), int(request.GET.get("offset") or 0)
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+@renderer_classes(LIST_RENDERER_CLASSES)
+def typeTotals(request):
+
+    # Every type in the user's uploads: how many uploads have it and how many there are in total
+    etag = make_etag(request, upload_version(request.user))
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+
+    totals = (
+        DatasetTypeCount.objects.filter(uploaded_by=request.user)
+        .values("type")
+        .annotate(datasets=Count("id"), total=Sum("count"))  # one row per (dataset, type)
+        .order_by("-total", "type")
+    )
+    return add_etag(Response({"results": list(totals)}), etag)
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+@renderer_classes(LIST_RENDERER_CLASSES)
+def typeDatasets(request, type_name):
+
+    # The user's uploads that contain type_name (newest first) with how many of it each has.
+    # limit / offset work like get-history/
+    try:
+        limit, offset = page_params(request)
+    except ValueError:
+        return Response({"error": "Invalid query parameters."}, status=400)
+
+    etag = make_etag(request, upload_version(request.user))
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+
+    # newest first by id (ids grow with uploads), so the page is read in index
+    # order and only its own rows are joined to their dataset
+    qs = DatasetTypeCount.objects.filter(uploaded_by=request.user, type=type_name)
+    page = (
+        qs.order_by("-dataset_id")
+        .values_list("dataset_id", "dataset__name", "dataset__uploaded_at", "count")[offset:offset + limit]
+    )
+
+    tz = timezone.get_current_timezone()
+    return add_etag(Response({
+        "type": type_name,
+        "count": qs.count(),
+        "limit": limit,
+        "offset": offset,
+        "results": [
+            {"id": dataset_id, "name": name, "uploaded_at": format_datetime(uploaded_at, tz), "count": count}
+            for dataset_id, name, uploaded_at, count in page
+        ],
+    }), etag)
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+@renderer_classes(LIST_RENDERER_CLASSES)
+def equipmentHistory(request, name):
+
+    # One equipment's readings (its means in each upload), newest upload first,
+    # live and archived. limit / offset work like get-history/
+    try:
+        limit, offset = page_params(request)
+    except ValueError:
+        return Response({"error": "Invalid query parameters."}, status=400)
+
+    etag = make_etag(request, upload_version(request.user))
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+
+    equipment = Equipment.objects.filter(owner=request.user, name=name).values("id", "type").first()
+    if equipment is None:
+        return Response({"error": "Equipment not found."}, status=404)
+
+    page, count, _ = query_readings(request.user, equipment_id=equipment["id"], limit=limit, offset=offset)
+
+    tz = timezone.get_current_timezone()
+    return add_etag(Response({
+        "name": name,
+        "type": equipment["type"],
+        "count": count,
+        "limit": limit,
+        "offset": offset,
+        "results": [
+            {
+                "dataset": dataset_id,
+                "dataset_name": dataset_name,
+                "uploaded_at": format_datetime(uploaded_at, tz),
+                "rows": rows,
+                "flowrate": flowrate,
+                "pressure": pressure,
+                "temperature": temperature,
+            }
+            for dataset_id, dataset_name, uploaded_at, _, rows, flowrate, pressure, temperature in page
+        ],
+    }), etag)
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+@renderer_classes(LIST_RENDERER_CLASSES)
+def monthlyRollups(request):
+
+    # The user's compacted history (api/retention.py): one row per month of
+    # datasets that were folded into a rollup, newest month first
+    etag = make_etag(request, upload_version(request.user))
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+
+    rollups = DatasetRollup.objects.filter(user=request.user).order_by("-month").values(
+        "month", "datasets", "total_rows", "invalid_rows",
+        *(f"{column}_{stat}" for column in ("flowrate", "pressure", "temperature") for stat in ("mean", "min", "max")),
+        "equipment_distribution",
+    )
+    return add_etag(Response({
+        "results": [{**rollup, "month": f"{rollup['month']:%Y-%m}"} for rollup in rollups],
+    }), etag)
+
+
+
+def parse_time(value):
+    # ISO date or datetime -> aware datetime (naive ones in TIME_ZONE), ValueError if it's neither
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(value)
+        parsed = datetime.combine(day, time())
+    return parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed)
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+@renderer_classes(LIST_RENDERER_CLASSES)
+def readingRange(request):
+
+    # Equipment readings of the uploads in [since, until) (default: the last 7
+    # days), live and archived, newest first; ?equipment=<name> for one of them.
+    # "partitions" tells how many archive files there are and how many were read.
+    # limit / offset work like get-history/. No ETag: without ?until= the
+    # range moves with the clock.
+    try:
+        limit, offset = page_params(request)
+        until = parse_time(request.GET["until"]) if request.GET.get("until") else timezone.now()
+        since = parse_time(request.GET["since"]) if request.GET.get("since") else until - timedelta(days=7)
+    except ValueError:
+        return Response({"error": "Invalid query parameters."}, status=400)
+
+    equipment_id = None
+    name = request.GET.get("equipment")
+    if name:
+        equipment_id = Equipment.objects.filter(owner=request.user, name=name).values_list("id", flat=True).first()
+        if equipment_id is None:
+            return Response({"error": "Equipment not found."}, status=404)
+
+    page, count, partitions = query_readings(request.user, since, until, equipment_id, limit, offset)
+    names = {equipment_id: name} if name else dict(
+        Equipment.objects.filter(id__in={reading[3] for reading in page}).values_list("id", "name")
+    )
+
+    tz = timezone.get_current_timezone()
+    return Response({
+        "since": format_datetime(since, tz),
+        "until": format_datetime(until, tz),
+        "count": count,
+        "limit": limit,
+        "offset": offset,
+        "partitions": partitions,
+        "results": [
+            {
+                "dataset": dataset_id,
+                "dataset_name": dataset_name,
+                "uploaded_at": format_datetime(uploaded_at, tz),
+                "equipment": names[equipment],
+                "rows": rows,
+                "flowrate": flowrate,
+                "pressure": pressure,
+                "temperature": temperature,
+            }
+            for dataset_id, dataset_name, uploaded_at, equipment, rows, flowrate, pressure, temperature in page
+        ],
+    })
@@ -1,7 +1,16 @@
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from .authentication import USERNAME_CLAIM
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     
+    # get_token builds the refresh token, its claims are copied into every access token made from it.
+    # The username claim lets CachedJWTAuthentication build request.user without a database query.
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        token[USERNAME_CLAIM] = user.get_username()
+        return token
+    
     # valiadte is the method that responsible for returning the token pair (access and refresh tokens). 
     
     # validate method is overridden to include additional user information in the token response.
@@ -1,5 +1,14 @@
 from rest_framework_simplejwt.views import TokenObtainPairView
+from . import hashers
 from .auth_serializer import CustomTokenObtainPairSerializer
+from .throttling import LoginIPThrottle, LoginUsernameThrottle
 
 class CustomTokenObtainPairView(TokenObtainPairView):
-    serializer_class = CustomTokenObtainPairSerializer
\ No newline at end of file
+    serializer_class = CustomTokenObtainPairSerializer
+    # token buckets per client IP and per username (password guessing, login bursts)
+    throttle_classes = [LoginIPThrottle, LoginUsernameThrottle]
+
+    def post(self, request, *args, **kwargs):
+        # 503 right away if the password hashing queue is full
+        with hashers.reserved():
+            return super().post(request, *args, **kwargs)
\ No newline at end of file
@@ -0,0 +1,79 @@
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+# JWTAuthentication loads the User row on every request. The access token is
+# signed and already carries the user id and (see CustomTokenObtainPairSerializer)
+# the username, which is all our API views need, so CachedJWTAuthentication
+# builds the user from those claims and keeps it for a short while instead.
+#
+# Trade-off: deactivating or deleting a user only locks them out once their
+# access token expires (SIMPLE_JWT["ACCESS_TOKEN_LIFETIME"]). Paths listed in
+# JWT_DB_USER_PATHS (admin) always load the real user from the database.
+
+USERNAME_CLAIM = "username"
+
+_cache = {}  # user id -> (expires at, user)
+_lock = threading.Lock()
+
+
+def clear_user_cache():
+    with _lock:
+        _cache.clear()
+
+
+def _read_only_save(*args, **kwargs):
+    # The user was built from token claims, saving it would blank every other column
+    raise RuntimeError("This user was built from token claims and can't be saved, load it from the database.")
+
+
+def claims_user(user_id, username):
+    # Unsaved User that behaves like a loaded one for filters, FKs and serializers
+    User = get_user_model()
+    # the claim is a string, the model wants its own type
+    user_id = User._meta.get_field(jwt_settings.USER_ID_FIELD).to_python(user_id)
+    user = User(**{jwt_settings.USER_ID_FIELD: user_id, User.USERNAME_FIELD: username, "is_active": True})
+    user._state.adding = False
+    user._state.db = DEFAULT_DB_ALIAS
+    user.save = _read_only_save
+    return user
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def authenticate(self, request):
+        self.path = request.path
+        return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        if self.path.startswith(tuple(getattr(settings, "JWT_DB_USER_PATHS", ()))):
+            return super().get_user(validated_token)
+
+        try:
+            user_id = validated_token[jwt_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken("Token contained no recognizable user identification")
+
+        now = time.monotonic()
+        with _lock:
+            cached = _cache.get(user_id)
+        if cached is not None and cached[0] > now:
+            return cached[1]
+
+        username = validated_token.get(USERNAME_CLAIM)
+        if username is None:
+            # issued before the username claim existed, look the user up once per TTL
+            user = super().get_user(validated_token)
+        else:
+            user = claims_user(user_id, username)
+
+        with _lock:
+            if len(_cache) >= getattr(settings, "JWT_USER_CACHE_SIZE", 10000):
+                _cache.clear()
+            _cache[user_id] = (now + getattr(settings, "JWT_USER_CACHE_TTL", 60), user)
+        return user
@@ -0,0 +1,180 @@
+import os
+import tarfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone as dt_timezone
+from pathlib import Path, PurePosixPath
+
+import django
+from django.db import transaction
+
+from .equipment import store_many_readings
+from .ingest import CSVAggregator, CSVRejected
+from .models import Dataset, DatasetTypeCount, ImportedFile
+
+# Bulk import of CSV files from a directory or tarball
+# (`manage.py import_csv_archive`), for backfilling history without going
+# through the upload endpoints a file at a time.
+#
+# Files are parsed by CSVAggregator in a pool of processes, the same numbers
+# and the same checks as an upload. The main process reads the source in
+# order, keeps at most WINDOW_PER_WORKER files per worker in flight (a
+# tarball is never read into memory as a whole) and writes the results a
+# batch at a time: the datasets, type counts, equipment readings and the
+# ImportedFile rows in one transaction, with bulk INSERTs. ImportedFile is
+# the checkpoint: running the import again skips every file already in it.
+
+BATCH_SIZE = 1000
+READ_BYTES = 1024 * 1024
+WINDOW_PER_WORKER = 4
+
+
+class ImportProgress:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.files = 0
+        self.imported = 0
+        self.rejected = 0
+        self.rows = 0
+
+    @property
+    def seconds(self):
+        return time.perf_counter() - self.started
+
+    def __str__(self):
+        seconds = self.seconds or 1e-9
+        return (
+            f"{self.files:,} files ({self.imported:,} imported, {self.rejected:,} rejected), {self.rows:,} rows "
+            f"in {seconds:.1f} s: {self.files / seconds:,.1f} files/s, {self.rows / seconds:,.0f} rows/s"
+        )
+
+
+def summarize(job):
+    # (path, mtime, content) -> (path, mtime, summary, error). content is the
+    # file's bytes (from a tarball) or where to read it from. Runs in the workers.
+    path, mtime, content = job
+    aggregator = CSVAggregator()
+    try:
+        if isinstance(content, bytes):
+            for start in range(0, len(content), READ_BYTES):
+                aggregator.feed(content[start:start + READ_BYTES])
+        else:
+            with open(content, "rb") as f:
+                for chunk in iter(lambda: f.read(READ_BYTES), b""):
+                    aggregator.feed(chunk)
+        return path, mtime, aggregator.finish(), None
+    except CSVRejected as e:
+        return path, mtime, None, e.message
+    except OSError as e:
+        return path, mtime, None, f"Failed to read file: {e}"
+
+
+def csv_files(source, skip=frozenset()):
+    # (path within source, mtime, content) for every .csv file not in skip;
+    # a directory's in path order, a tarball's in the order they're stored
+    source = Path(source)
+    if source.is_dir():
+        for directory, dirnames, filenames in os.walk(source):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                full = Path(directory, filename)
+                path = full.relative_to(source).as_posix()
+                if filename.lower().endswith(".csv") and path not in skip:
+                    yield path, full.stat().st_mtime, str(full)
+        return
+
+    with tarfile.open(source, "r:*") as tar:
+        for member in tar:
+            if member.isfile() and member.name.lower().endswith(".csv") and member.name not in skip:
+                with tar.extractfile(member) as f:
+                    yield member.name, member.mtime, f.read()
+
+
+def run(user, source, workers=None, batch_size=BATCH_SIZE, file_times=False, progress=None):
+    # Imports source's CSV files as user's datasets. workers=0 parses in this
+    # process. progress(ImportProgress, [(path, error)]) is called after each
+    # batch. Returns the ImportProgress. ValueError if the source's path is
+    # too long for ImportedFile.source.
+    source = str(Path(source).resolve())
+    max_source = ImportedFile._meta.get_field("source").max_length
+    if len(source) > max_source:
+        raise ValueError(f"{source} is longer than {max_source} characters")
+    done = set(ImportedFile.objects.filter(user=user, source=source).values_list("path", flat=True))
+    jobs = csv_files(source, skip=done)
+    stats = ImportProgress()
+
+    def write_batches(results):
+        batch = []
+        for result in results:
+            batch.append(result)
+            if len(batch) >= batch_size:
+                rejected = write(user, source, batch, file_times, stats)
+                if progress:
+                    progress(stats, rejected)
+                batch = []
+        if batch:
+            rejected = write(user, source, batch, file_times, stats)
+            if progress:
+                progress(stats, rejected)
+
+    if workers == 0:
+        write_batches(map(summarize, jobs))
+    else:
+        workers = workers or os.cpu_count()
+        with ProcessPoolExecutor(workers, initializer=django.setup) as pool:
+            write_batches(_ordered(pool, jobs, workers * WINDOW_PER_WORKER))
+    return stats
+
+
+def _ordered(pool, jobs, window):
+    # pool.map without submitting every job up front
+    pending = deque()
+    for job in jobs:
+        pending.append(pool.submit(summarize, job))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def write(user, source, results, file_times, stats):
+    # One batch of summarize() results in one transaction -> [(path, error)]
+    max_name = Dataset._meta.get_field("name").max_length
+    max_path = ImportedFile._meta.get_field("path").max_length
+    uploads, times, records, rejected = [], [], [], []
+    for path, mtime, summary, error in results:
+        name = PurePosixPath(path).name
+        if len(path) > max_path:
+            # can't be recorded either, so it's rejected again on every run
+            rejected.append((path, f"Path is longer than {max_path} characters"))
+            continue
+        if summary is not None and len(name) > max_name:
+            summary, error = None, f"File name is longer than {max_name} characters"
+        if summary is None:
+            rejected.append((path, error))
+            records.append(ImportedFile(user=user, source=source, path=path, error=error[:255]))
+            continue
+        equipment = summary.pop("equipment")
+        dataset = Dataset(name=name, uploaded_by=user, **summary)
+        uploads.append((dataset, equipment))
+        times.append(datetime.fromtimestamp(mtime, tz=dt_timezone.utc))
+        records.append(ImportedFile(user=user, source=source, path=path, dataset=dataset))
+        stats.rows += summary["total_rows"]
+
+    datasets = [dataset for dataset, _ in uploads]
+    with transaction.atomic():
+        Dataset.objects.bulk_create(datasets)
+        if file_times and datasets:
+            # uploaded_at is auto_now_add, so it's set after the INSERT
+            for dataset, uploaded_at in zip(datasets, times):
+                dataset.uploaded_at = uploaded_at
+            Dataset.objects.bulk_update(datasets, ["uploaded_at"], batch_size=500)
+        DatasetTypeCount.objects.bulk_create([row for dataset in datasets for row in DatasetTypeCount.for_dataset(dataset)])
+        store_many_readings(user, uploads)
+        ImportedFile.objects.bulk_create(records)
+
+    stats.files += len(results)
+    stats.imported += len(datasets)
+    stats.rejected += len(rejected)
+    return rejected
@@ -0,0 +1,46 @@
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+from rest_framework.response import Response
+
+from .models import Dataset
+
+# Bump this when the shape of a response changes, so clients holding an old
+# ETag get the new body instead of a 304.
+ETAG_VERSION = "1"
+
+
+def upload_version(user):
+    # (latest dataset id, number of datasets) for the user.
+    # One aggregate query, changes on every upload and on every delete.
+    stats = Dataset.objects.filter(uploaded_by=user).aggregate(latest=Max("id"), count=Count("id"))
+    return stats["latest"] or 0, stats["count"]
+
+
+def make_etag(request, version):
+    # Same data, same URL (limit/offset/fields/format) and same media type -> same ETag
+    raw = f"{ETAG_VERSION}:{request.user.pk}:{version}:{request.get_full_path()}:{request.accepted_media_type}"
+    return '"' + hashlib.sha1(raw.encode()).hexdigest() + '"'
+
+
+def not_modified(request, etag):
+    # 304 response if the client already has this version, else None
+    header = request.headers.get("If-None-Match")
+    if not header:
+        return None
+
+    # weak comparison, W/"x" matches "x"
+    etags = {tag[2:] if tag.startswith("W/") else tag for tag in parse_etags(header)}
+    if etag in etags or "*" in etags:
+        return add_etag(Response(status=304), etag)
+    return None
+
+
+def add_etag(response, etag):
+    response["ETag"] = etag
+    # the browser / client may keep it but must revalidate every time
+    response["Cache-Control"] = "private, no-cache"
+    patch_vary_headers(response, ("Accept", "Authorization"))
+    return response
@@ -0,0 +1,131 @@
+import threading
+from itertools import islice
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .models import Equipment, EquipmentReading
+
+# The equipment registry. Equipment names are interned per user: each
+# (owner, name) of an upload with an Equipment Name column gets one Equipment
+# row, and readings refer to its integer id. An upload resolves all of its
+# names at once: ids already known to this process come from _cache, the rest
+# from one SELECT per LOOKUP_BATCH names, and names seen for the first time
+# are created with one bulk_create. ignore_conflicts and a second lookup
+# cover two uploads creating the same name at the same time.
+#
+# Ids are only cached once the upload's transaction has committed, so a
+# rolled back upload never leaves ids behind that don't exist, and they're
+# dropped when their Equipment row is deleted (admin, or its owner with it).
+#
+# With settings.EQUIPMENT_READINGS on (the default), each upload also stores
+# one EquipmentReading per name: the means of its rows. A file that names
+# every row differently has about one reading per row, so they're written
+# with one executemany of plain INSERTs per READING_BATCH, a few µs a row,
+# instead of building a model instance per reading for bulk_create
+# (benchmarks/bench_equipment.py).
+
+LOOKUP_BATCH = 500
+READING_BATCH = 10000
+
+_cache = {}  # owner id -> {name: equipment id}
+_cached = 0  # names in _cache
+_lock = threading.Lock()
+
+
+def clear_equipment_cache():
+    global _cached
+    with _lock:
+        _cache.clear()
+        _cached = 0
+
+
+@receiver(post_delete, sender=Equipment)
+def _forget_equipment(sender, instance, **kwargs):
+    # a reading written with its id would fail on the foreign key
+    global _cached
+    with _lock:
+        if _cache.get(instance.owner_id, {}).pop(instance.name, None) is not None:
+            _cached -= 1
+
+
+def _remember(owner_id, ids):
+    global _cached
+    with _lock:
+        if _cached + len(ids) > getattr(settings, "EQUIPMENT_CACHE_SIZE", 100000):
+            _cache.clear()
+            _cached = 0
+        known = _cache.setdefault(owner_id, {})
+        before = len(known)
+        known.update(ids)
+        _cached += len(known) - before
+
+
+def _lookup(owner, names):
+    ids = {}
+    for start in range(0, len(names), LOOKUP_BATCH):
+        ids.update(
+            Equipment.objects.filter(owner=owner, name__in=names[start:start + LOOKUP_BATCH]).values_list("name", "id")
+        )
+    return ids
+
+
+def intern_equipment(owner, names, types):
+    # names and their types (lists) -> [equipment id] in the same order,
+    # creating the names owner doesn't have yet
+    owner_id = owner.pk
+    with _lock:
+        known = _cache.get(owner_id, {})
+        ids = list(map(known.get, names))
+    if None not in ids:
+        return ids
+
+    found = _lookup(owner, list(dict.fromkeys(name for name, equipment_id in zip(names, ids) if equipment_id is None)))
+    new = {name: type_name for name, type_name, equipment_id in zip(names, types, ids)
+           if equipment_id is None and name not in found}
+    if new:
+        Equipment.objects.bulk_create(
+            [Equipment(owner_id=owner_id, name=name, type=type_name) for name, type_name in new.items()],
+            ignore_conflicts=True,
+        )
+        found.update(_lookup(owner, list(new)))
+    ids = [found[name] if equipment_id is None else equipment_id for name, equipment_id in zip(names, ids)]
+    # all of them: a full cache is cleared before they're added, and this
+    # upload's names are the likeliest to come again
+    transaction.on_commit(lambda: _remember(owner_id, dict(zip(names, ids))))
+    return ids
+
+
+def store_readings(dataset, equipment):
+    # equipment: CSVAggregator's summary["equipment"]
+    if equipment:
+        store_many_readings(dataset.uploaded_by, [(dataset, equipment)])
+
+
+def store_many_readings(owner, uploads):
+    # [(dataset, equipment)] of one owner: their names interned together and
+    # their readings written in one go (bulk imports, api/bulk_import.py)
+    names, types = [], []
+    for _, equipment in uploads:
+        names += equipment["name"]
+        types += equipment["type"]
+    if not names:
+        return
+    ids = iter(intern_equipment(owner, names, types))
+    if not getattr(settings, "EQUIPMENT_READINGS", True):
+        return
+
+    table = EquipmentReading._meta.db_table
+    fields = ("dataset", "equipment", "rows", "flowrate", "pressure", "temperature")
+    columns = ", ".join(connection.ops.quote_name(EquipmentReading._meta.get_field(field).column) for field in fields)
+    sql = f"INSERT INTO {connection.ops.quote_name(table)} ({columns}) VALUES ({', '.join(['%s'] * len(fields))})"
+    with connection.cursor() as cursor:
+        for dataset, equipment in uploads:
+            readings = zip(
+                [dataset.pk] * len(equipment["name"]), ids, equipment["rows"],
+                equipment["flowrate"], equipment["pressure"], equipment["temperature"],
+            )
+            for batch in iter(lambda: list(islice(readings, READING_BATCH)), []):
+                cursor.executemany(sql, batch)
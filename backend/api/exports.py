@@ -0,0 +1,58 @@
+import csv
+import json
+
+from .models import Dataset
+from .serializers import only_fields, serialize_datasets
+
+# Rows fetched per query while streaming an export.
+# Memory stays bounded by one chunk no matter how many datasets a user has.
+EXPORT_CHUNK_SIZE = 2000
+
+
+def iter_dataset_chunks(user, fields, chunk_size=None):
+    chunk_size = chunk_size or EXPORT_CHUNK_SIZE
+
+    # Keyset pagination on id instead of one big cursor / OFFSET:
+    # every chunk is a short indexed query and nothing is kept between chunks.
+    # Every row belongs to `user`, so uploaded_by is filled from it instead of
+    # joining (and building) a User per row.
+    columns = ["uploaded_by" if column == "uploaded_by__username" else column for column in only_fields(fields)]
+    qs = Dataset.objects.filter(uploaded_by=user).order_by("id").only(*columns)
+
+    last_id = 0
+    while True:
+        chunk = list(qs.filter(id__gt=last_id)[:chunk_size])
+        if not chunk:
+            return
+        if "uploaded_by" in fields:
+            for dataset in chunk:
+                dataset.uploaded_by = user
+        yield serialize_datasets(chunk, fields)
+        last_id = chunk[-1].id
+
+
+# Both encoders emit one string per chunk rather than per row, which keeps the
+# number of writes to the socket (and the per-write overhead) low.
+
+def ndjson_lines(chunks):
+    for rows in chunks:
+        yield "".join(json.dumps(row) + "\n" for row in rows)
+
+
+class _Echo:
+    # csv.writer needs a file, this one just hands the line back (see Django docs "Streaming large CSV files")
+    def write(self, value):
+        return value
+
+
+def csv_lines(chunks, fields):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(fields)
+    for rows in chunks:
+        yield "".join(
+            writer.writerow([
+                json.dumps(row[field]) if field == "equipment_distribution" else row[field]
+                for field in fields
+            ])
+            for row in rows
+        )
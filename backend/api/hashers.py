@@ -0,0 +1,79 @@
+import os
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, must_update_salt
+from rest_framework.exceptions import APIException
+
+# Password hashing is by far the most CPU hungry thing the backend does (one
+# PBKDF2 run per login / signup). PooledPBKDF2PasswordHasher runs every hash on
+# a small, shared pool of PASSWORD_HASHING_WORKERS threads, so a burst of logins
+# can use at most that many cores and the rest of the API keeps responding.
+# Up to PASSWORD_HASHING_MAX_WAITING more hashes may queue up. The API's login
+# and signup views take their place in the queue up front (reserved()), so
+# when it's full they fail fast with a 503 instead of piling up behind the
+# others. Everything else that hashes (the admin login, check_password in a
+# management command) isn't a DRF view and can't turn that into a response:
+# when the queue is full it hashes on its own thread instead.
+#
+# The algorithm name stays "pbkdf2_sha256", so existing hashes keep working.
+# A hash with fewer iterations than PASSWORD_HASH_ITERATIONS is upgraded on
+# the user's next successful login, one with more is left as it is.
+
+WORKERS = getattr(settings, "PASSWORD_HASHING_WORKERS", None) or os.cpu_count() or 1
+MAX_WAITING = getattr(settings, "PASSWORD_HASHING_MAX_WAITING", 32)
+
+_pool = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="password-hash")
+_slots = threading.BoundedSemaphore(WORKERS + MAX_WAITING)
+_reserved = ContextVar("password_hashing_reserved", default=False)
+
+
+class PasswordHashingBusy(APIException):
+    status_code = 503
+    default_detail = "Too many logins at once, try again in a moment."
+    default_code = "password_hashing_busy"
+    wait = 1  # DRF sends it as Retry-After
+
+
+@contextmanager
+def reserved():
+    # A place in the queue for the hashes of one API request, or
+    # PasswordHashingBusy (503) if there is none
+    if _reserved.get():
+        yield
+        return
+    if not _slots.acquire(blocking=False):
+        raise PasswordHashingBusy()
+    token = _reserved.set(True)
+    try:
+        yield
+    finally:
+        _reserved.reset(token)
+        _slots.release()
+
+
+def run_bounded(fn, *args):
+    if _reserved.get():
+        return _pool.submit(fn, *args).result()
+    if not _slots.acquire(blocking=False):
+        return fn(*args)  # not an API request, see above
+    try:
+        return _pool.submit(fn, *args).result()
+    finally:
+        _slots.release()
+
+
+class PooledPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    iterations = getattr(settings, "PASSWORD_HASH_ITERATIONS", None) or PBKDF2PasswordHasher.iterations
+
+    def encode(self, password, salt, iterations=None):
+        # verify() and harden_runtime() go through here too
+        return run_bounded(super().encode, password, salt, iterations)
+
+    def must_update(self, encoded):
+        # as PBKDF2PasswordHasher, but never rewrites a hash at a lower cost than it has
+        decoded = self.decode(encoded)
+        return decoded["iterations"] < self.iterations or must_update_salt(decoded["salt"], self.salt_entropy)
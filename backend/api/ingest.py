@@ -0,0 +1,418 @@
+import codecs
+import csv
+import io
+import re
+import time
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile, StopUpload
+from django.http.multipartparser import MultiPartParser as DjangoMultiPartParser, MultiPartParserError
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import DataAndFiles, MultiPartParser
+
+from .models import Equipment
+
+# Parse-while-receiving CSV ingest for the upload endpoints.
+#
+# With Django's default upload handlers the CSV is copied into memory or a
+# temp file while it's received, and pd.read_csv then reads the whole thing
+# again before the averages can start. CSVUploadParser instead hands each
+# multipart chunk of the "file" field to a CSVAggregator as it arrives: every
+# CSV_PARSE_BLOCK_BYTES of complete lines go through pandas' C parser and are
+# folded into running sums and counts, so by the time the last byte is in,
+# only the last block is left to parse and the file is never stored.
+#
+# It also rejects bad uploads before reading them: a non-.csv name, a first
+# line that isn't a CSV header with our columns, or more than
+# CSV_UPLOAD_MAX_BYTES (checked against Content-Length up front, then while
+# receiving).
+#
+# Header names are matched ignoring case, spaces, "_" and "-" ("flow_rate",
+# "FLOW RATE" are Flowrate); CSV_COLUMN_ALIASES maps other names onto our
+# columns. A value that isn't a number is left out of the averages and its
+# row counted as invalid, in the same pass; once more than
+# CSV_MAX_INVALID_FRACTION of the rows read so far are invalid (checked from
+# INVALID_CHECK_ROWS rows on) the upload is rejected without reading the rest.
+#
+# With an Equipment Name column in the file, rows are also added up per name
+# (type, rows, sums and counts), for the equipment registry and its readings
+# (api/equipment.py). The names of a block are numbered with pd.factorize and
+# their sums taken with np.bincount, a lot cheaper than a groupby when most
+# rows name a different equipment. A file with a name or a type longer than
+# Equipment's columns is rejected: cut to fit, two names could become one.
+#
+# Under an ASGI server Django receives the whole body before the view runs
+# (core/asgi.py), so there the parsing starts after the upload arrived, but
+# still in one pass over it.
+
+FIELD = "file"
+COLUMNS = ("Type", "Flowrate", "Pressure", "Temperature")
+NUMERIC_COLUMNS = ("Flowrate", "Pressure", "Temperature")
+# optional, read when present
+NAME_COLUMN = "Equipment Name"
+
+# Per-equipment partial sums are merged once this many blocks' worth pile up,
+# unless a merge didn't even halve them (most names only appear once): then
+# the rest of the rows are kept as they are and added up at the end
+MERGE_PARTS = 16
+# What's added up per name, besides the numeric columns' sums
+COUNT_COLUMNS = tuple(f"{column}_count" for column in NUMERIC_COLUMNS)
+
+EQUIPMENT_NAME_LENGTH = Equipment._meta.get_field("name").max_length
+EQUIPMENT_TYPE_LENGTH = Equipment._meta.get_field("type").max_length
+
+# The header row must show up within this many bytes
+SNIFF_BYTES = 64 * 1024
+
+# Room for the multipart boundaries and part headers around the file
+MULTIPART_OVERHEAD = 64 * 1024
+
+# Don't judge the invalid share on fewer rows than this (until the end)
+INVALID_CHECK_ROWS = 1000
+
+NOT_CSV = "Only CSV files are supported"
+
+
+class CSVRejected(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def normalize(name):
+    return re.sub(r"[\s_\-]+", "", name).lower()
+
+
+def column_names(header):
+    # Header names -> names for read_csv: ours where they match, placeholders
+    # for the rest (they aren't read, and may repeat)
+    known = {normalize(column): column for column in COLUMNS + (NAME_COLUMN,)}
+    for alias, column in getattr(settings, "CSV_COLUMN_ALIASES", {}).items():
+        known[normalize(alias)] = column
+
+    names = []
+    for index, name in enumerate(header):
+        column = known.get(normalize(name))
+        if column in names:
+            raise CSVRejected(f"CSV file has more than one {column} column")
+        names.append(column or f"_{index}")
+    return names
+
+
+class CSVAggregator:
+    # Row count, per-column mean/min/max/count and the Type distribution of a
+    # CSV fed in arbitrary chunks; the same numbers as len(df),
+    # df[column].mean() / .min() / .max() / .count() and
+    # df["Type"].value_counts().
+
+    def __init__(self, block_bytes=None):
+        self.block_bytes = block_bytes or getattr(settings, "CSV_PARSE_BLOCK_BYTES", 1024 * 1024)
+        self.max_invalid = getattr(settings, "CSV_MAX_INVALID_FRACTION", 0.5)
+        self.pending = bytearray()
+        self.columns = None
+        self.rows = 0
+        self.invalid_rows = 0
+        self.sums = dict.fromkeys(NUMERIC_COLUMNS, 0.0)
+        self.counts = dict.fromkeys(NUMERIC_COLUMNS, 0)
+        self.mins = dict.fromkeys(NUMERIC_COLUMNS)
+        self.maxs = dict.fromkeys(NUMERIC_COLUMNS)
+        self.types = Counter()
+        self.usecols = COLUMNS
+        self.equipment_parts = []
+        self.merge_parts = True
+        # time spent in read_csv and in adding the blocks up, for tracing
+        self.parse_ns = 0
+        self.aggregate_ns = 0
+
+    def feed(self, data):
+        self.pending += data
+        if self.columns is None:
+            self._read_header()
+        if self.columns is not None and len(self.pending) >= self.block_bytes:
+            self._parse(final=False)
+
+    def finish(self):
+        if self.columns is None:
+            if not self.pending.strip():
+                raise CSVRejected("CSV file is empty")
+            self.pending += b"\n"  # header without a line break
+            self._read_header()
+        self._parse(final=True)
+        if self.rows == 0:
+            raise CSVRejected("CSV file is empty")
+        self._check_invalid(final=True)
+        started = time.perf_counter_ns()
+        summary = self._summary()
+        self.aggregate_ns += time.perf_counter_ns() - started
+        return summary
+
+    def _summary(self):
+        # Keyed like the Dataset fields. mean/min/max are None when a column
+        # has no values at all.
+        summary = {"total_rows": self.rows, "invalid_rows": self.invalid_rows}
+        for column in NUMERIC_COLUMNS:
+            count = self.counts[column]
+            prefix = column.lower()
+            summary[f"{prefix}_mean"] = self.sums[column] / count if count else None
+            summary[f"{prefix}_min"] = self.mins[column]
+            summary[f"{prefix}_max"] = self.maxs[column]
+            summary[f"{prefix}_count"] = count
+        longest = max(self.types, key=len, default="")
+        if len(longest) > EQUIPMENT_TYPE_LENGTH:
+            raise CSVRejected(
+                f"Types can be at most {EQUIPMENT_TYPE_LENGTH} characters ({longest[:20]}... is longer)"
+            )
+        summary["equipment_distribution"] = dict(self.types.most_common())
+        summary["equipment"] = self._equipment()
+        return summary
+
+    def _read_header(self):
+        end = self.pending.find(b"\n")
+        if end == -1:
+            if len(self.pending) > SNIFF_BYTES:
+                raise CSVRejected(NOT_CSV)
+            return
+
+        line = bytes(self.pending[:end]).rstrip(b"\r")
+        if line.startswith(codecs.BOM_UTF8):
+            line = line[len(codecs.BOM_UTF8):]
+        if b"\0" in line:
+            raise CSVRejected(NOT_CSV)
+        try:
+            header = next(csv.reader([line.decode("utf-8")]), [])
+        except (UnicodeDecodeError, csv.Error):
+            raise CSVRejected(NOT_CSV)
+
+        columns = column_names(header)
+        missing = [column for column in COLUMNS if column not in columns]
+        if missing:
+            raise CSVRejected(f"CSV file is missing columns: {', '.join(missing)}")
+        self.columns = columns
+        if NAME_COLUMN in columns:
+            self.usecols = COLUMNS + (NAME_COLUMN,)
+        del self.pending[:end + 1]
+
+    def _parse(self, final):
+        if final:
+            block = bytes(self.pending)
+            self.pending.clear()
+        else:
+            end = self.pending.rfind(b"\n")
+            # a quoted field can span lines: only cut where the quotes are balanced
+            if end == -1 or self.pending.count(b'"', 0, end) % 2:
+                return
+            block = bytes(self.pending[:end + 1])
+            del self.pending[:end + 1]
+
+        if not block.strip():
+            return
+        started = time.perf_counter_ns()
+        try:
+            df = pd.read_csv(
+                io.BytesIO(block), header=None, names=self.columns, usecols=self.usecols,
+                # plain Python strings: faster to count and factorize than "str"
+                dtype={"Type": object, NAME_COLUMN: object},
+            )
+        except (ValueError, pd.errors.ParserError) as e:
+            raise CSVRejected(f"Failed to read CSV file: {e}")
+        parsed = time.perf_counter_ns()
+        self.parse_ns += parsed - started
+        self._add_block(df, final)
+        self.aggregate_ns += time.perf_counter_ns() - parsed
+
+    def _add_block(self, df, final):
+        invalid = None
+        for column in NUMERIC_COLUMNS:
+            values = df[column]
+            # the C parser already made numeric columns numbers; only a block
+            # with something else in it needs converting
+            if not pd.api.types.is_numeric_dtype(values):
+                numbers = pd.to_numeric(values, errors="coerce")
+                bad = numbers.isna() & values.notna()
+                invalid = bad if invalid is None else invalid | bad
+                values = df[column] = numbers
+            count = int(values.count())
+            if count:
+                self.sums[column] += float(values.sum())
+                self.counts[column] += count
+                low, high = float(values.min()), float(values.max())
+                self.mins[column] = low if self.mins[column] is None else min(self.mins[column], low)
+                self.maxs[column] = high if self.maxs[column] is None else max(self.maxs[column], high)
+        self.rows += len(df)
+        if invalid is not None:
+            self.invalid_rows += int(invalid.sum())
+        self.types.update(df["Type"].value_counts().to_dict())
+        if NAME_COLUMN in df:
+            self._add_equipment(df)
+        self._check_invalid(final)
+
+    def _add_equipment(self, df):
+        totals = {"rows": np.ones(len(df))}
+        for column in NUMERIC_COLUMNS:
+            values = df[column]
+            totals[column] = values.fillna(0).to_numpy(dtype=float)
+            totals[f"{column}_count"] = values.notna().to_numpy(dtype=float)
+        part = df[NAME_COLUMN].to_numpy(dtype=object), df["Type"].to_numpy(dtype=object), totals
+        # once merging doesn't pay, neither does adding up each block on its own
+        self.equipment_parts.append(_by_name(*part) if self.merge_parts else part)
+        if self.merge_parts and len(self.equipment_parts) >= MERGE_PARTS:
+            before = sum(len(names) for names, _, _ in self.equipment_parts)
+            self.equipment_parts = [self._merge_equipment()]
+            self.merge_parts = len(self.equipment_parts[0][0]) * 2 <= before
+
+    def _merge_equipment(self):
+        names, types, totals = zip(*self.equipment_parts)
+        return _by_name(
+            np.concatenate(names), np.concatenate(types),
+            {column: np.concatenate([part[column] for part in totals]) for column in totals[0]},
+        )
+
+    def _equipment(self):
+        # {"name": [...], "type": [...], "rows": [...], "flowrate": [means],
+        # "pressure": ..., "temperature": ...}, one item per name; empty
+        # without an Equipment Name column
+        if not self.equipment_parts:
+            return {}
+        # one block (most files) is already added up by name
+        names, types, totals = self.equipment_parts[0] if len(self.equipment_parts) == 1 else self._merge_equipment()
+        longest = max(names, key=len, default="")
+        if len(longest) > EQUIPMENT_NAME_LENGTH:
+            raise CSVRejected(
+                f"Equipment names can be at most {EQUIPMENT_NAME_LENGTH} characters ({longest[:20]}... is longer)"
+            )
+        equipment = {
+            "name": names.tolist(),
+            "type": np.where(pd.isna(types), "", types).tolist(),
+            "rows": totals["rows"].astype(np.int64).tolist(),
+        }
+        for column in NUMERIC_COLUMNS:
+            counts = totals[f"{column}_count"]
+            # None where an equipment had no values in a column
+            means = (totals[column] / np.maximum(counts, 1)).astype(object)
+            means[counts == 0] = None
+            equipment[column.lower()] = means.tolist()
+        return equipment
+
+    def _check_invalid(self, final):
+        if self.invalid_rows and (final or self.rows >= INVALID_CHECK_ROWS):
+            if self.invalid_rows > self.rows * self.max_invalid:
+                raise CSVRejected(
+                    f"Too many rows with non-numeric values ({self.invalid_rows:,} of the first {self.rows:,})"
+                )
+
+
+def _by_name(names, types, totals):
+    # Adds totals ({column: array}, one value per row) up per name
+    # -> (names, each one's first type, {column: array}), names in the order
+    # they first appear. Rows without a name aren't anyone's (dropped).
+    codes, unique = pd.factorize(names)
+    if len(unique) < len(codes) or (codes < 0).any():
+        named = codes >= 0
+        codes, types = codes[named], types[named]
+        # factorize numbers names as they first appear: a name's first row
+        # is where the running maximum of the codes goes up
+        first = np.flatnonzero(np.diff(np.maximum.accumulate(codes), prepend=-1) > 0)
+        totals = {column: np.bincount(codes, weights=values[named], minlength=len(unique)) for column, values in totals.items()}
+        types = types[first]
+    return np.asarray(unique, dtype=object), types, totals
+
+
+class CSVUpload:
+    # What request.FILES["file"] holds with CSVUploadParser: the aggregates
+    # (or why the file was rejected), not the file's contents, and the
+    # rows read and time spent parsing / aggregating them (for tracing)
+    def __init__(self, name):
+        self.name = name
+        self.size = 0
+        self.summary = None
+        self.error = None
+        self.rows = 0
+        self.parse_ns = 0
+        self.aggregate_ns = 0
+
+    def close(self):
+        pass
+
+
+class CSVUploadHandler(FileUploadHandler):
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.max_bytes = getattr(settings, "CSV_UPLOAD_MAX_BYTES", 512 * 1024 * 1024)
+        self.request_length = None
+        self.upload = None
+        self.aggregator = None
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        self.request_length = content_length
+        return None  # let the multipart parser run, chunks come to receive_data_chunk
+
+    def new_file(self, field_name, file_name, *args, **kwargs):
+        super().new_file(field_name, file_name, *args, **kwargs)
+        if field_name != FIELD or self.upload is not None:
+            raise SkipFile
+
+        self.upload = CSVUpload(file_name)
+        if not file_name.endswith(".csv"):
+            self.reject(CSVRejected(NOT_CSV))
+        if self.request_length and self.request_length > self.max_bytes + MULTIPART_OVERHEAD:
+            self.reject(self.too_large())
+        self.aggregator = CSVAggregator()
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > self.max_bytes:
+            self.reject(self.too_large())
+        try:
+            self.aggregator.feed(raw_data)
+        except CSVRejected as e:
+            self.reject(e)
+        return None  # consumed, nothing is stored
+
+    def file_complete(self, file_size):
+        self.upload.size = file_size
+        try:
+            self.upload.summary = self.aggregator.finish()
+        except CSVRejected as e:
+            self.upload.error = e
+        self.add_timings()
+        return self.upload
+
+    def add_timings(self):
+        if self.aggregator is not None:
+            self.upload.rows = self.aggregator.rows
+            self.upload.parse_ns = self.aggregator.parse_ns
+            self.upload.aggregate_ns = self.aggregator.aggregate_ns
+
+    def too_large(self):
+        return CSVRejected(f"File is larger than the {self.max_bytes // (1024 * 1024)} MB upload limit", status=413)
+
+    def reject(self, error):
+        # Stop right here without reading the rest of the body
+        self.upload.error = error
+        self.add_timings()
+        raise StopUpload(connection_reset=True)
+
+
+class CSVUploadParser(MultiPartParser):
+    # DRF's MultiPartParser with CSVUploadHandler as the only upload handler
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        request = parser_context["request"]
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        meta = request.META.copy()
+        meta["CONTENT_TYPE"] = media_type
+        handler = CSVUploadHandler(request)
+
+        try:
+            data, files = DjangoMultiPartParser(meta, stream, [handler], encoding).parse()
+        except MultiPartParserError as exc:
+            raise ParseError(f"Multipart form parse error - {exc}")
+
+        # a rejected upload never completes; still hand the view its error
+        if handler.upload is not None and FIELD not in files:
+            files.appendlist(FIELD, handler.upload)
+        return DataAndFiles(data, files)
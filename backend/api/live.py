@@ -0,0 +1,248 @@
+import asyncio
+import json
+import threading
+import time
+from urllib.parse import parse_qs
+
+from django.conf import settings
+from django.db import transaction
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .serializers import serialize_datasets
+
+# Live updates: every client of a user gets a small "dataset.created" event
+# when that user uploads something, over a WebSocket or, where WebSockets
+# aren't available, Server-Sent Events. Both are plain ASGI apps mounted in
+# front of Django in core/asgi.py, so they only work under an ASGI server
+# (uvicorn / daphne), not under the WSGI runserver.
+#
+# Subscribers live in this process. With several worker processes each one
+# only sees uploads it handled itself, so run a single ASGI worker or replace
+# Broker with a shared pub/sub (e.g. Redis) keeping the same interface.
+
+WEBSOCKET_PATH = "/api/ws/datasets/"
+EVENTS_PATH = "/api/events/"
+
+# Idle connections get a keepalive this often, so proxies don't drop them
+KEEPALIVE_SECONDS = 25
+
+# Events queued for one slow client before it is told to resync instead
+QUEUE_SIZE = 100
+
+# Sent instead of the dropped events, the client refetches with ?since=
+RESYNC = json.dumps({"type": "resync"})
+
+
+class Subscription:
+    # One connected client. Kept small, there can be thousands of idle ones.
+    __slots__ = ("user_id", "loop", "queue")
+
+    def __init__(self, user_id, loop):
+        self.user_id = user_id
+        self.loop = loop
+        self.queue = asyncio.Queue(QUEUE_SIZE)
+
+    def deliver(self, payload):
+        # Runs on the subscriber's event loop. None means "disconnected".
+        if self.queue.full() or payload is None:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            if payload is not None:
+                payload = RESYNC
+        self.queue.put_nowait(payload)
+
+
+class Broker:
+    def __init__(self):
+        # publish() is called from the thread running the (sync) upload view,
+        # subscribe / unsubscribe from the event loop
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def subscribe(self, user_id):
+        subscription = Subscription(str(user_id), asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.setdefault(subscription.user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscribers.get(subscription.user_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscribers[subscription.user_id]
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(subscriptions) for subscriptions in self._subscribers.values())
+
+    def publish(self, user_id, payload):
+        # payload is already encoded, once, no matter how many clients get it
+        with self._lock:
+            subscriptions = list(self._subscribers.get(str(user_id), ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, payload)
+            except RuntimeError:
+                # loop already closed, the connection is going away anyway
+                pass
+
+
+broker = Broker()
+
+
+def dataset_created_payload(dataset):
+    # Same record the history API returns, so clients can add it as is
+    event = {"type": "dataset.created", "dataset": serialize_datasets([dataset])[0]}
+    return json.dumps(event, cls=JSONEncoder, separators=(",", ":"))
+
+
+def publish_dataset_created(dataset):
+    payload = dataset_created_payload(dataset)
+    # only tell clients about rows that are actually committed
+    transaction.on_commit(lambda: broker.publish(dataset.uploaded_by_id, payload))
+
+
+def authenticate(scope):
+    # (user id, token expiry) from "Authorization: Bearer ..." or ?token=...
+    # (browsers can't set headers on WebSocket / EventSource requests).
+    # Only the signature is checked, no database query per connection.
+    token = None
+    for name, value in scope.get("headers", ()):
+        if name == b"authorization":
+            parts = value.decode("latin-1").split()
+            if len(parts) == 2 and parts[0] in jwt_settings.AUTH_HEADER_TYPES:
+                token = parts[1]
+    if token is None:
+        token = parse_qs(scope.get("query_string", b"").decode()).get("token", [None])[0]
+    if not token:
+        return None
+
+    try:
+        access = AccessToken(token)
+    except TokenError:
+        return None
+    return access[jwt_settings.USER_ID_CLAIM], access["exp"]
+
+
+async def _watch_disconnect(receive, subscription, disconnect_type):
+    while (await receive())["type"] != disconnect_type:
+        pass
+    subscription.deliver(None)
+
+
+async def _stream(receive, subscription, expires_at, disconnect_type, send_event, send_keepalive):
+    # Forward events until the client disconnects or its token expires
+    # (it reconnects with a refreshed one).
+    watcher = asyncio.ensure_future(_watch_disconnect(receive, subscription, disconnect_type))
+    try:
+        while True:
+            timeout = min(KEEPALIVE_SECONDS, expires_at - time.time())
+            if timeout <= 0:
+                return True
+            try:
+                payload = await asyncio.wait_for(subscription.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                if time.time() < expires_at:
+                    await send_keepalive()
+                continue
+            if payload is None:
+                return False
+            await send_event(payload)
+    finally:
+        watcher.cancel()
+        broker.unsubscribe(subscription)
+
+
+async def websocket_endpoint(scope, receive, send):
+    if (await receive())["type"] != "websocket.connect":
+        return
+    auth = authenticate(scope)
+    if auth is None:
+        # closing before accepting rejects the handshake with a 403
+        await send({"type": "websocket.close", "code": 4401})
+        return
+
+    user_id, expires_at = auth
+    subscription = broker.subscribe(user_id)
+    await send({"type": "websocket.accept"})
+
+    async def send_event(payload):
+        await send({"type": "websocket.send", "text": payload})
+
+    async def send_keepalive():
+        await send({"type": "websocket.send", "text": '{"type":"ping"}'})
+
+    if await _stream(receive, subscription, expires_at, "websocket.disconnect", send_event, send_keepalive):
+        await send({"type": "websocket.close", "code": 4401})
+
+
+def _cors_headers(scope):
+    origin = None
+    for name, value in scope.get("headers", ()):
+        if name == b"origin":
+            origin = value.decode("latin-1")
+    if origin is None:
+        return []
+    allowed = getattr(settings, "CORS_ALLOW_ALL_ORIGINS", False) or origin in getattr(settings, "CORS_ALLOWED_ORIGINS", [])
+    if not allowed:
+        return []
+    return [(b"access-control-allow-origin", origin.encode("latin-1")), (b"vary", b"Origin")]
+
+
+async def events_endpoint(scope, receive, send):
+    auth = authenticate(scope)
+    if auth is None:
+        await send({
+            "type": "http.response.start",
+            "status": 401,
+            "headers": [(b"content-type", b"application/json")] + _cors_headers(scope),
+        })
+        await send({"type": "http.response.body", "body": b'{"detail":"Authentication credentials were not provided or are invalid."}'})
+        return
+
+    user_id, expires_at = auth
+    subscription = broker.subscribe(user_id)
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [
+            (b"content-type", b"text/event-stream"),
+            (b"cache-control", b"no-cache"),
+            (b"x-accel-buffering", b"no"),  # don't let nginx buffer the stream
+        ] + _cors_headers(scope),
+    })
+    # reconnect after 5s if the connection drops
+    await send({"type": "http.response.body", "body": b"retry: 5000\n\n", "more_body": True})
+
+    async def send_event(payload):
+        # unnamed events, so EventSource.onmessage sees them; the JSON carries the type
+        body = f"data: {payload}\n\n".encode()
+        await send({"type": "http.response.body", "body": body, "more_body": True})
+
+    async def send_keepalive():
+        await send({"type": "http.response.body", "body": b": keepalive\n\n", "more_body": True})
+
+    if await _stream(receive, subscription, expires_at, "http.disconnect", send_event, send_keepalive):
+        await send({"type": "http.response.body", "body": b""})
+
+
+def live_updates(application):
+    # ASGI app serving the live update endpoints, everything else goes to `application`
+    async def app(scope, receive, send):
+        path = scope.get("path")
+        if scope["type"] == "websocket":
+            if path == WEBSOCKET_PATH:
+                return await websocket_endpoint(scope, receive, send)
+            # Django itself doesn't speak WebSocket
+            await receive()
+            return await send({"type": "websocket.close"})
+        if scope["type"] == "http" and path == EVENTS_PATH and scope["method"] == "GET":
+            return await events_endpoint(scope, receive, send)
+        return await application(scope, receive, send)
+
+    return app
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+
+from api import retention
+
+
+class Command(BaseCommand):
+    help = (
+        "Compacts datasets older than each user's retention policy into monthly rollups, "
+        "archiving their columns first, then refreshes the database statistics."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", type=int, action="append", dest="users",
+                            help="only this user id (repeatable)")
+        parser.add_argument("--batch-size", type=int, default=None,
+                            help="datasets per transaction (default: settings.RETENTION_BATCH_SIZE)")
+        parser.add_argument("--pause", type=float, default=0.0,
+                            help="seconds to wait between batches, to leave room for other writers")
+        parser.add_argument("--dry-run", action="store_true", help="only count what would be compacted")
+        parser.add_argument("--vacuum", action="store_true",
+                            help="also VACUUM (SQLite locks the whole database while it runs)")
+
+    def handle(self, *args, users=None, batch_size=None, pause=0.0, dry_run=False, vacuum=False, **options):
+        if not dry_run:
+            finished = retention.finish_pending(users)
+            if finished:
+                self.stdout.write(f"{finished} archive files of an interrupted run finished")
+        total = 0
+        for user_id, keep_days, archive in retention.policies(users):
+            if dry_run:
+                count = retention.expired(user_id, keep_days).count()
+            else:
+                count = retention.compact(user_id, keep_days, archive=archive, batch_size=batch_size, pause=pause)
+            if count:
+                self.stdout.write(f"user {user_id}: {count} datasets older than {keep_days} days")
+            total += count
+
+        verb = "would be compacted" if dry_run else "compacted"
+        self.stdout.write(f"{total} datasets {verb}")
+        if dry_run:
+            return
+        for statement in retention.analyze(vacuum=vacuum):
+            self.stdout.write(f"ran {statement}")
@@ -0,0 +1,46 @@
+import os
+import tarfile
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from api import bulk_import
+
+
+class Command(BaseCommand):
+    help = (
+        "Imports every CSV file in a directory or tarball as datasets of one user, parsed in a pool of "
+        "processes. Interrupted imports resume where they stopped when run again."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("source", help="directory or tarball (.tar, .tar.gz, .tgz, ...)")
+        parser.add_argument("--user", required=True, help="username the datasets are uploaded by")
+        parser.add_argument("--workers", type=int, default=None,
+                            help="parsing processes (default: one per CPU, 0: parse in this process)")
+        parser.add_argument("--batch-size", type=int, default=bulk_import.BATCH_SIZE,
+                            help="files written per transaction")
+        parser.add_argument("--file-times", action="store_true",
+                            help="use each file's modification time as its upload time")
+
+    def handle(self, *args, source, user, workers=None, batch_size=bulk_import.BATCH_SIZE, file_times=False,
+               **options):
+        try:
+            owner = User.objects.get(username=user)
+        except User.DoesNotExist:
+            raise CommandError(f"No user named {user!r}")
+        if not (os.path.isdir(source) or os.path.isfile(source) and tarfile.is_tarfile(source)):
+            raise CommandError(f"{source} is not a directory or a tarball")
+
+        def progress(stats, rejected):
+            for path, error in rejected:
+                self.stderr.write(f"{path}: {error}")
+            self.stdout.write(str(stats))
+
+        try:
+            stats = bulk_import.run(
+                owner, source, workers=workers, batch_size=batch_size, file_times=file_times, progress=progress,
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(f"done: {stats}")
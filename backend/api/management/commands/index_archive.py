@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from api import partitions
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the index of the archive's files (ReadingPartition) from ARCHIVE_DIR."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", type=int, action="append", dest="users",
+                            help="only this user id (repeatable)")
+
+    def handle(self, *args, users=None, **options):
+        self.stdout.write(f"{partitions.rebuild_index(users)} files indexed")
@@ -0,0 +1,137 @@
+import logging
+import threading
+from bisect import bisect_left
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+
+# In-process request metrics (recorded by api.middleware.MetricsMiddleware) in
+# the Prometheus text format, served at /metrics.
+#
+# Series are labelled by URL pattern ("api/get-history/"), not by path, so the
+# number of series stays fixed however many ids or query strings clients send.
+# Every worker process keeps its own numbers; Prometheus scrapes each worker
+# (or sums them) the same way it would for any multi-process server.
+
+# seconds
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# queries per request
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+# bytes
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+logger = logging.getLogger(__name__)
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.series = {}  # labels -> [count per bucket (+Inf last), sum]
+
+    def observe(self, labels, value):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def render(self, label_names):
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} histogram"
+        for labels, (counts, total) in sorted(self.series.items()):
+            base = format_labels(label_names, labels)
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                yield f'{self.name}_bucket{{{base},le="{bound}"}} {cumulative}'
+            yield f"{self.name}_sum{{{base}}} {total}"
+            yield f"{self.name}_count{{{base}}} {cumulative}"
+
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self.series = {}  # labels -> value
+
+    def inc(self, labels, value=1):
+        self.series[labels] = self.series.get(labels, 0) + value
+
+    def render(self, label_names):
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} counter"
+        for labels, value in sorted(self.series.items()):
+            yield f"{self.name}{{{format_labels(label_names, labels)}}} {value}"
+
+
+def escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(names, values):
+    return ",".join(f'{name}="{escape(value)}"' for name, value in zip(names, values))
+
+
+REQUEST_LABELS = ("method", "route", "status")
+ROUTE_LABELS = ("method", "route")
+
+request_duration = Histogram(
+    "http_request_duration_seconds", "Time spent in the view and middleware below MetricsMiddleware.", DURATION_BUCKETS
+)
+db_queries = Histogram("http_request_db_queries", "Database queries run per request.", QUERY_BUCKETS)
+db_duration = Counter("http_request_db_duration_seconds_total", "Time spent running database queries.")
+response_size = Histogram(
+    "http_response_size_bytes", "Response body size (streamed responses are not included).", SIZE_BUCKETS
+)
+request_size = Counter("http_request_size_bytes_total", "Request body bytes received (uploads).")
+
+_lock = threading.Lock()
+
+
+def record(method, route, status, duration, queries, query_time, request_bytes, response_bytes):
+    labels = (method, route, str(status))
+    with _lock:
+        request_duration.observe(labels, duration)
+        db_queries.observe(labels, queries)
+        db_duration.inc((method, route), query_time)
+        if request_bytes:
+            request_size.inc((method, route), request_bytes)
+        if response_bytes is not None:
+            response_size.observe(labels, response_bytes)
+
+
+def reset():
+    with _lock:
+        for metric in (request_duration, db_queries, db_duration, response_size, request_size):
+            metric.series.clear()
+
+
+def render():
+    with _lock:
+        lines = [
+            *request_duration.render(REQUEST_LABELS),
+            *db_queries.render(REQUEST_LABELS),
+            *db_duration.render(ROUTE_LABELS),
+            *response_size.render(REQUEST_LABELS),
+            *request_size.render(ROUTE_LABELS),
+        ]
+    return "\n".join(lines) + "\n"
+
+
+def metricsView(request):
+    # Plain Django view: no DRF authentication or content negotiation, the
+    # scraper only ever wants text. METRICS_TOKEN is required as a Bearer
+    # token; with none configured nothing is served.
+    if not getattr(settings, "METRICS_ENABLED", False):
+        raise Http404
+    token = getattr(settings, "METRICS_TOKEN", None)
+    if not token:
+        logger.warning("METRICS_ENABLED is set without a METRICS_TOKEN, /metrics is refused")
+        return HttpResponse(status=403)
+    if request.headers.get("Authorization") != f"Bearer {token}":
+        return HttpResponse(status=401)
+    return HttpResponse(render(), content_type=CONTENT_TYPE)
@@ -0,0 +1,85 @@
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+from . import metrics, profiling
+
+# MetricsMiddleware records latency, database queries, and request / response
+# sizes for every request into api.metrics. Put it first in MIDDLEWARE so the
+# timings cover the rest of the middleware too.
+#
+# ProfilingMiddleware runs a request under a profiler when a staff user asks
+# for it with the X-Profile header (see api.profiling).
+#
+# Each one raises MiddlewareNotUsed when turned off (METRICS_ENABLED,
+# PROFILING_ENABLED), and Django leaves it out of the chain altogether, so
+# disabled costs nothing per request.
+
+METHODS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"}
+
+
+class QueryTimer:
+    # connection.execute_wrapper() hook: counts and times every query
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - start
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        if not getattr(settings, "METRICS_ENABLED", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timer = QueryTimer()
+        start = time.perf_counter()
+        with connection.execute_wrapper(timer):
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        match = request.resolver_match
+        # pattern, not path, so ids and typos don't each make a new series
+        route = match.route if match is not None else "unmatched"
+
+        try:
+            request_bytes = int(request.META.get("CONTENT_LENGTH") or 0)
+        except ValueError:
+            request_bytes = 0
+
+        # a streamed body isn't produced until after we return; its time and
+        # size aren't known here (the duration covers the view up to the first byte)
+        response_bytes = None if response.streaming else len(response.content)
+
+        method = request.method if request.method in METHODS else "other"
+        metrics.record(
+            method, route, response.status_code, duration,
+            timer.count, timer.seconds, request_bytes, response_bytes,
+        )
+        return response
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        if not getattr(settings, "PROFILING_ENABLED", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        # only requests asking for it pay for the staff check
+        if not request.META.get(profiling.HEADER) or profiling.staff_user(request) is None:
+            return self.get_response(request)
+
+        response, name = profiling.run_profiled(self.get_response, request)
+        response["X-Profile-Id"] = name
+        return response
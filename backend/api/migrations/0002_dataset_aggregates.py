@@ -0,0 +1,93 @@
+# Generated by Django 6.0.1 on 2026-10-19 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        # nullable, so 0004 can be reversed on a table that has rows
+        migrations.AlterField(
+            model_name='dataset',
+            name='avg_usage_hours',
+            field=models.FloatField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='dataset',
+            name='avg_power',
+            field=models.FloatField(null=True),
+        ),
+        migrations.AddField(
+            model_name='dataset',
+            name='invalid_rows',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='dataset',
+            name='flowrate_mean',
+            field=models.FloatField(null=True),
+        ),
+        migrations.AddField(
+            model_name='dataset',
+            name='flowrate_min',
+            field=models.FloatField(null=True),
+        ),
+        migrations.AddField(
+            model_name='dataset',
+            name='flowrate_max',
+            field=models.FloatField(null=True),
+        ),
+        migrations.AddField(
+            model_name='dataset',
+            name='flowrate_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='dataset',
+            name='pressure_mean',
+            field=models.FloatField(null=True),
+        ),
+        migrations.AddField(
+            model_name='dataset',
+            name='pressure_min',
+            field=models.FloatField(null=True),
+        ),
+        migrations.AddField(
+            model_name='dataset',
+            name='pressure_max',
+            field=models.FloatField(null=True),
+        ),
+        migrations.AddField(
+            model_name='dataset',
+            name='pressure_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='dataset',
+            name='temperature_mean',
+            field=models.FloatField(null=True),
+        ),
+        migrations.AddField(
+            model_name='dataset',
+            name='temperature_min',
+            field=models.FloatField(null=True),
+        ),
+        migrations.AddField(
+            model_name='dataset',
+            name='temperature_max',
+            field=models.FloatField(null=True),
+        ),
+        migrations.AddField(
+            model_name='dataset',
+            name='temperature_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='dataset',
+            index=models.Index(fields=['uploaded_by', '-uploaded_at'], name='dataset_user_uploaded_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+from django.db import migrations
+from django.db.models import F
+
+# avg_usage_hours held the Flowrate mean and avg_power the Pressure mean.
+# Their counts were never stored; total_rows stands in for them (as in
+# retention.add_dataset), so count-weighted means don't leave these rows out.
+# min / max and everything about Temperature stay null / 0 until the file is
+# uploaded again.
+
+
+def forwards(apps, schema_editor):
+    Dataset = apps.get_model('api', 'Dataset')
+    Dataset.objects.update(flowrate_mean=F('avg_usage_hours'), pressure_mean=F('avg_power'))
+    Dataset.objects.filter(flowrate_mean__isnull=False).update(flowrate_count=F('total_rows'))
+    Dataset.objects.filter(pressure_mean__isnull=False).update(pressure_count=F('total_rows'))
+
+
+def backwards(apps, schema_editor):
+    Dataset = apps.get_model('api', 'Dataset')
+    Dataset.objects.update(avg_usage_hours=F('flowrate_mean'), avg_power=F('pressure_mean'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_dataset_aggregates'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 6.0.1 on 2026-10-19 09:12
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_backfill_dataset_aggregates'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='dataset',
+            name='avg_usage_hours',
+        ),
+        migrations.RemoveField(
+            model_name='dataset',
+            name='avg_power',
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 6.0.1 on 2026-10-19 11:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_remove_dataset_avg_usage_hours_avg_power'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DatasetTypeCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type', models.CharField(max_length=100)),
+                ('count', models.PositiveIntegerField()),
+                ('dataset', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='type_counts', to='api.dataset')),
+                ('uploaded_by', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['type', 'dataset'], name='type_dataset_idx'), models.Index(fields=['uploaded_by', 'type', 'dataset', 'count'], name='user_type_idx')],
+                'constraints': [models.UniqueConstraint(fields=('dataset', 'type'), name='dataset_type_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+from django.db import migrations
+
+# One DatasetTypeCount per entry of every existing equipment_distribution.
+# In batches, so memory stays flat on a big table.
+
+BATCH_SIZE = 2000
+
+
+def forwards(apps, schema_editor):
+    Dataset = apps.get_model('api', 'Dataset')
+    DatasetTypeCount = apps.get_model('api', 'DatasetTypeCount')
+
+    last_id = 0
+    while True:
+        batch = list(
+            Dataset.objects.filter(id__gt=last_id).order_by('id')
+            .values_list('id', 'uploaded_by_id', 'equipment_distribution')[:BATCH_SIZE]
+        )
+        if not batch:
+            return
+        DatasetTypeCount.objects.bulk_create([
+            DatasetTypeCount(dataset_id=dataset_id, uploaded_by_id=user_id, type=type_name, count=count)
+            for dataset_id, user_id, distribution in batch
+            for type_name, count in (distribution or {}).items()
+        ])
+        last_id = batch[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_datasettypecount'),
+    ]
+
+    operations = [
+        # backwards: 0005 drops the table
+        migrations.RunPython(forwards, migrations.RunPython.noop),
+    ]
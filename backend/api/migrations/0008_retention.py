@@ -0,0 +1,51 @@
+# Generated by Django 6.0.1 on 2026-10-19 15:02
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_equipment'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RetentionPolicy',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='retention_policy', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('keep_days', models.PositiveIntegerField(blank=True, null=True)),
+                ('archive', models.BooleanField(default=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DatasetRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('datasets', models.PositiveIntegerField()),
+                ('total_rows', models.BigIntegerField()),
+                ('invalid_rows', models.BigIntegerField(default=0)),
+                ('flowrate_mean', models.FloatField(null=True)),
+                ('flowrate_min', models.FloatField(null=True)),
+                ('flowrate_max', models.FloatField(null=True)),
+                ('flowrate_count', models.BigIntegerField(default=0)),
+                ('pressure_mean', models.FloatField(null=True)),
+                ('pressure_min', models.FloatField(null=True)),
+                ('pressure_max', models.FloatField(null=True)),
+                ('pressure_count', models.BigIntegerField(default=0)),
+                ('temperature_mean', models.FloatField(null=True)),
+                ('temperature_min', models.FloatField(null=True)),
+                ('temperature_max', models.FloatField(null=True)),
+                ('temperature_count', models.BigIntegerField(default=0)),
+                ('equipment_distribution', models.JSONField(default=dict)),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'month'), name='rollup_user_month_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 6.0.1 on 2026-10-19 16:41
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_retention'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReadingPartition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('path', models.CharField(max_length=255)),
+                ('first_uploaded_at', models.DateTimeField()),
+                ('last_uploaded_at', models.DateTimeField()),
+                ('datasets', models.PositiveIntegerField()),
+                ('readings', models.PositiveIntegerField()),
+                ('size', models.PositiveBigIntegerField()),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='partitions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'last_uploaded_at'], name='partition_user_last_idx')],
+                'constraints': [models.UniqueConstraint(fields=('path',), name='partition_path_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 6.0.1 on 2026-10-19 19:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_importedfile'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dataset',
+            index=models.Index(fields=['name'], name='dataset_name_idx'),
+        ),
+    ]
@@ -8,10 +8,214 @@ class Dataset(models.Model):
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
     total_rows = models.IntegerField()
-    avg_usage_hours = models.FloatField()
-    avg_power = models.FloatField()
+    # rows with a non-numeric value, left out of the aggregates below
+    invalid_rows = models.PositiveIntegerField(default=0)
+
+    # Per numeric column: mean, min, max and how many rows had a value.
+    # mean/min/max are null when a column had no values.
+    # The API still sends the old names avg_usage_hours (flowrate_mean) and
+    # avg_power (pressure_mean), see serializers.py
+    flowrate_mean = models.FloatField(null=True)
+    flowrate_min = models.FloatField(null=True)
+    flowrate_max = models.FloatField(null=True)
+    flowrate_count = models.PositiveIntegerField(default=0)
+
+    pressure_mean = models.FloatField(null=True)
+    pressure_min = models.FloatField(null=True)
+    pressure_max = models.FloatField(null=True)
+    pressure_count = models.PositiveIntegerField(default=0)
+
+    temperature_mean = models.FloatField(null=True)
+    temperature_min = models.FloatField(null=True)
+    temperature_max = models.FloatField(null=True)
+    temperature_count = models.PositiveIntegerField(default=0)
 
     equipment_distribution = models.JSONField()
 
+    class Meta:
+        indexes = [
+            # a user's history, newest first: read in index order instead of
+            # sorting all of their rows for every page
+            models.Index(fields=["uploaded_by", "-uploaded_at"], name="dataset_user_uploaded_idx"),
+            # name prefix search in the admin (DatasetAdmin.get_search_results)
+            models.Index(fields=["name"], name="dataset_name_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.uploaded_by.username})"
+
+
+class DatasetTypeCount(models.Model):
+    # equipment_distribution as rows, one per (dataset, type), so questions
+    # across uploads ("which uploads have Valves", "Pumps in total") are
+    # indexed queries instead of decoding every dataset's JSON. Written with
+    # the dataset (DatasetSerializer.create); the JSON column stays as it is.
+    dataset = models.ForeignKey(Dataset, on_delete=models.CASCADE, related_name="type_counts", db_index=False)
+    # copied from the dataset, so a user's per-type questions are answered
+    # from user_type_idx alone, without joining every row to api_dataset
+    uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+", db_index=False)
+    type = models.CharField(max_length=100)
+    count = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            # also the index for "types of this dataset"
+            models.UniqueConstraint(fields=["dataset", "type"], name="dataset_type_unique"),
+        ]
+        indexes = [
+            models.Index(fields=["type", "dataset"], name="type_dataset_idx"),
+            models.Index(fields=["uploaded_by", "type", "dataset", "count"], name="user_type_idx"),
+        ]
+
+    @classmethod
+    def for_dataset(cls, dataset):
+        # unsaved rows for dataset.equipment_distribution
+        return [
+            cls(dataset=dataset, uploaded_by_id=dataset.uploaded_by_id, type=type_name, count=count)
+            for type_name, count in dataset.equipment_distribution.items()
+        ]
+
+    def __str__(self):
+        return f"{self.dataset_id}: {self.type} x{self.count}"
+
+
+class Equipment(models.Model):
+    # A named piece of equipment ("Pump-1") of one user, across all their
+    # uploads. Names are interned while ingesting (api/equipment.py), so
+    # readings refer to a small integer id instead of repeating the name.
+    id = models.AutoField(primary_key=True)  # 32-bit is plenty, and half the size in every reading
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name="equipment", db_index=False)
+    name = models.CharField(max_length=100)
+    type = models.CharField(max_length=100)  # from the first upload it appeared in
+
+    class Meta:
+        constraints = [
+            # also the index for looking names up
+            models.UniqueConstraint(fields=["owner", "name"], name="equipment_owner_name_unique"),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.type})"
+
+
+class EquipmentReading(models.Model):
+    # One equipment's values in one upload: the means over its rows in that
+    # file (a file usually has one row per equipment). Null where it had no
+    # values in a column.
+    dataset = models.ForeignKey(Dataset, on_delete=models.CASCADE, related_name="readings", db_index=False)
+    equipment = models.ForeignKey(Equipment, on_delete=models.CASCADE, related_name="readings", db_index=False)
+    rows = models.PositiveIntegerField()
+    flowrate = models.FloatField(null=True)
+    pressure = models.FloatField(null=True)
+    temperature = models.FloatField(null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["dataset", "equipment"], name="reading_dataset_equipment_unique"),
+        ]
+        indexes = [
+            # an equipment's history, newest upload first
+            models.Index(fields=["equipment", "-dataset"], name="reading_equipment_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.equipment_id} in {self.dataset_id}"
+
+
+class RetentionPolicy(models.Model):
+    # How long a user's datasets are kept as they are. Older ones are folded
+    # into DatasetRollup by `manage.py compact_history` (api/retention.py).
+    # Users without a policy get settings.RETENTION_DAYS.
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name="retention_policy")
+    keep_days = models.PositiveIntegerField(null=True, blank=True)  # null: keep forever
+    # write the datasets and their readings to the archive before deleting them
+    archive = models.BooleanField(default=True)
+
+    def __str__(self):
+        return f"{self.user_id}: {self.keep_days or 'forever'}"
+
+
+class DatasetRollup(models.Model):
+    # One user's compacted datasets of one month: the same aggregates as a
+    # Dataset, over all of them (means weighted by their value counts).
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="rollups", db_index=False)
+    month = models.DateField()  # first day of the month, in TIME_ZONE
+    datasets = models.PositiveIntegerField()
+
+    total_rows = models.BigIntegerField()
+    invalid_rows = models.BigIntegerField(default=0)
+
+    flowrate_mean = models.FloatField(null=True)
+    flowrate_min = models.FloatField(null=True)
+    flowrate_max = models.FloatField(null=True)
+    flowrate_count = models.BigIntegerField(default=0)
+
+    pressure_mean = models.FloatField(null=True)
+    pressure_min = models.FloatField(null=True)
+    pressure_max = models.FloatField(null=True)
+    pressure_count = models.BigIntegerField(default=0)
+
+    temperature_mean = models.FloatField(null=True)
+    temperature_min = models.FloatField(null=True)
+    temperature_max = models.FloatField(null=True)
+    temperature_count = models.BigIntegerField(default=0)
+
+    equipment_distribution = models.JSONField(default=dict)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "month"], name="rollup_user_month_unique"),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.month:%Y-%m} ({self.datasets} datasets)"
+
+
+
+class ReadingPartition(models.Model):
+    # One file of the archive (api/retention.py): a batch of one user's
+    # compacted datasets from one month, with their readings. Range queries
+    # over archived readings open only the files whose upload times overlap
+    # the range (api/partitions.py).
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="partitions", db_index=False)
+    month = models.DateField()
+    path = models.CharField(max_length=255)  # relative to ARCHIVE_DIR
+    first_uploaded_at = models.DateTimeField()
+    last_uploaded_at = models.DateTimeField()
+    datasets = models.PositiveIntegerField()
+    readings = models.PositiveIntegerField()
+    size = models.PositiveBigIntegerField()  # bytes
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["path"], name="partition_path_unique"),
+        ]
+        indexes = [
+            models.Index(fields=["user", "last_uploaded_at"], name="partition_user_last_idx"),
+        ]
+
+    def __str__(self):
+        return self.path
+
+
+
+class ImportedFile(models.Model):
+    # A file read by `manage.py import_csv_archive` (api/bulk_import.py): the
+    # checkpoint an interrupted import resumes from. Written in the same
+    # transaction as the file's dataset, so a file is either imported and
+    # recorded or neither.
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+", db_index=False)
+    source = models.CharField(max_length=500)  # the directory or tarball, absolute
+    path = models.CharField(max_length=500)  # within the source
+    # null when the file was rejected, or its dataset was deleted since
+    dataset = models.ForeignKey(Dataset, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    error = models.CharField(max_length=255, blank=True)  # why it was rejected
+    imported_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "source", "path"], name="imported_file_unique"),
+        ]
+
     def __str__(self):
-        return f"{self.name} ({self.uploaded_by.username})"
\ No newline at end of file
+        return f"{self.source}: {self.path}"
@@ -0,0 +1,171 @@
+import heapq
+import logging
+import math
+from datetime import timezone as dt_timezone
+from itertools import islice
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.contrib.auth.models import User
+
+from .models import EquipmentReading, ReadingPartition
+from .retention import PARTIAL
+
+logger = logging.getLogger(__name__)
+
+# Equipment readings over a range of upload times, for one user. Readings of
+# datasets still in the database are found through their dataset
+# (dataset_user_uploaded_idx), so only the range's datasets are read.
+# Compacted ones are in the archive, partitioned by user and month
+# (ARCHIVE_DIR/user_<id>/<YYYY-MM>/*.npz, api/retention.py): ReadingPartition
+# records each file's first and last upload time, and only the files that
+# overlap the range are opened. What was pruned is reported with the results.
+# A page of offset + limit readings takes at most that many from the database
+# and from each file, and only that many are kept while the files are read
+# one after the other, so a wide range doesn't load all of its readings.
+# A file committed by api/retention.py but not renamed yet is read under its
+# .partial name; one that isn't there at all is left out and counted as
+# "missing" (restore ARCHIVE_DIR, or `manage.py index_archive` to forget it).
+
+READING_FIELDS = ("dataset_id", "dataset_name", "uploaded_at", "equipment_id", "rows", "flowrate", "pressure", "temperature")
+
+
+def query_readings(user, since=None, until=None, equipment_id=None, limit=None, offset=0):
+    # -> (readings, count, stats). readings: tuples of READING_FIELDS, newest
+    # upload first, [offset:offset + limit] of the count in the range (all of
+    # them when limit is None). since / until None: no bound on that side.
+    end = None if limit is None else offset + limit
+    live = EquipmentReading.objects.filter(dataset__uploaded_by=user)
+    if since is not None:
+        live = live.filter(dataset__uploaded_at__gte=since)
+    if until is not None:
+        live = live.filter(dataset__uploaded_at__lt=until)
+    if equipment_id is not None:
+        live = live.filter(equipment_id=equipment_id)
+    count = live.count()
+    newest_live = live.order_by("-dataset__uploaded_at", "-dataset_id", "-equipment_id").values_list(
+        "dataset_id", "dataset__name", "dataset__uploaded_at", "equipment_id", "rows", "flowrate", "pressure", "temperature",
+    )[:end]
+
+    partitions = ReadingPartition.objects.filter(user=user)
+    total = partitions.count()
+    if since is not None:
+        partitions = partitions.filter(last_uploaded_at__gte=since)
+    if until is not None:
+        partitions = partitions.filter(first_uploaded_at__lt=until)
+    overlapping = list(partitions.values_list("path", flat=True))
+    newest_archived, scanned, missing = [], 0, 0
+    for path in overlapping:
+        try:
+            archived, matched, read = read_partition(path, since, until, equipment_id, end)
+        except FileNotFoundError:
+            logger.warning("archive file %s is missing", path)
+            missing += 1
+            continue
+        if end is None:
+            newest_archived.extend(archived)
+        else:
+            newest_archived = list(islice(heapq.merge(newest_archived, archived, key=_newest, reverse=True), end))
+        count += matched
+        scanned += read
+    if end is None:
+        newest_archived.sort(key=_newest, reverse=True)
+
+    readings = list(islice(heapq.merge(newest_live, newest_archived, key=_newest, reverse=True), offset, end))
+    return readings, count, {
+        "total": total,
+        "scanned": len(overlapping),
+        "pruned": total - len(overlapping),
+        "archived_readings_scanned": scanned,
+        "missing": missing,
+    }
+
+
+def read_partition(path, since=None, until=None, equipment_id=None, limit=None):
+    # One archive file's readings in [since, until), newest upload first, at
+    # most limit of them -> (readings, readings in the range, readings in the file)
+    with _load(path) as archive:
+        uploaded = archive["uploaded_at"]
+        keep = np.ones(len(uploaded), dtype=bool)
+        if since is not None:
+            keep &= uploaded >= _datetime64(since)
+        if until is not None:
+            keep &= uploaded < _datetime64(until)
+        ids, names, uploaded = archive["id"][keep], archive["name"][keep], uploaded[keep]
+
+        dataset_ids = archive["reading_dataset_id"]
+        mask = np.isin(dataset_ids, ids)
+        if equipment_id is not None:
+            mask &= archive["reading_equipment_id"] == equipment_id
+        matching = np.flatnonzero(mask)
+        matched = len(matching)
+        # each reading's dataset (its position in ids), to sort by upload time
+        order = np.argsort(ids)
+        dataset = order[np.searchsorted(ids, dataset_ids[matching], sorter=order)]
+        newest = np.lexsort((
+            archive["reading_equipment_id"][matching], dataset_ids[matching], uploaded[dataset],
+        ))[::-1][:limit]
+        matching, dataset = matching[newest], dataset[newest]
+        columns = [
+            archive[f"reading_{name}"][matching].tolist()
+            for name in ("dataset_id", "equipment_id", "rows", "flowrate", "pressure", "temperature")
+        ]
+        names, uploaded = names[dataset].tolist(), uploaded[dataset].tolist()
+        scanned = len(dataset_ids)
+
+    readings = [
+        (
+            dataset_id, name, uploaded_at.replace(tzinfo=dt_timezone.utc), equipment, rows,
+            *(None if math.isnan(mean) else mean for mean in means),
+        )
+        for name, uploaded_at, (dataset_id, equipment, rows, *means) in zip(names, uploaded, zip(*columns))
+    ]
+    return readings, matched, scanned
+
+
+def rebuild_index(user_ids=None):
+    # ReadingPartition from the files in ARCHIVE_DIR, e.g. after restoring it
+    # from a backup. Files of deleted users are skipped, rows of files that
+    # aren't there any more are dropped. Returns how many files were indexed.
+    root = Path(settings.ARCHIVE_DIR)
+    users = User.objects.all() if user_ids is None else User.objects.filter(id__in=user_ids)
+    users = set(users.values_list("id", flat=True))
+    indexed, found = 0, set()
+    for path in sorted(root.glob("user_*/*/*.npz")):
+        user_id = int(path.parts[-3].removeprefix("user_"))
+        if user_id not in users:
+            continue
+        with np.load(path) as archive:
+            uploaded = archive["uploaded_at"]
+            fields = {
+                "user_id": user_id,
+                "month": np.datetime64(path.parent.name, "D").item(),
+                "first_uploaded_at": uploaded.min().item().replace(tzinfo=dt_timezone.utc),
+                "last_uploaded_at": uploaded.max().item().replace(tzinfo=dt_timezone.utc),
+                "datasets": len(uploaded),
+                "readings": len(archive["reading_dataset_id"]),
+                "size": path.stat().st_size,
+            }
+        found.add(path.relative_to(root).as_posix())
+        ReadingPartition.objects.update_or_create(path=path.relative_to(root).as_posix(), defaults=fields)
+        indexed += 1
+    ReadingPartition.objects.filter(user_id__in=users).exclude(path__in=found).delete()
+    return indexed
+
+
+def _load(path):
+    full = Path(settings.ARCHIVE_DIR) / path
+    try:
+        return np.load(full)
+    except FileNotFoundError:
+        # its batch committed, the rename hasn't happened yet
+        return np.load(full.with_name(full.name + PARTIAL))
+
+
+def _newest(reading):
+    return reading[2], reading[0], reading[3]
+
+
+def _datetime64(value):
+    return np.datetime64(value.astimezone(dt_timezone.utc).replace(tzinfo=None), "us")
@@ -0,0 +1,89 @@
+import cProfile
+import re
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from rest_framework.exceptions import APIException
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+# Opt-in per-request profiling: a staff user sends "X-Profile: 1" with any
+# request, it runs under a profiler and the response carries
+# "X-Profile-Id: <name>". The profile is saved in PROFILE_DIR and can be
+# downloaded from /api/admin/profiles/<name> (staff only).
+#
+# pyinstrument is used when installed (an HTML call tree, low overhead);
+# otherwise cProfile (a .pstats file for snakeviz / python -m pstats). Only
+# the newest PROFILE_KEEP profiles are kept.
+
+HEADER = "HTTP_X_PROFILE"
+NAME_PATTERN = re.compile(r"[0-9a-f]{32}\.(html|pstats)")
+
+try:
+    from pyinstrument import Profiler
+except ImportError:
+    Profiler = None
+
+
+def profile_dir():
+    return Path(getattr(settings, "PROFILE_DIR", Path(settings.BASE_DIR) / "profiles"))
+
+
+def staff_user(request):
+    # Runs before DRF, so authenticate here. Always from the database: users
+    # built from token claims (CachedJWTAuthentication) have no is_staff.
+    try:
+        result = JWTAuthentication().authenticate(request)
+    except APIException:
+        return None
+    if result is None or not result[0].is_staff:
+        return None
+    return result[0]
+
+
+def run_profiled(get_response, request):
+    # Returns (response, profile name). A streamed body is produced after
+    # this returns, so only the view up to the first chunk is profiled.
+    name = uuid.uuid4().hex
+    directory = profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+
+    if Profiler is not None:
+        profiler = Profiler()
+        profiler.start()
+        try:
+            response = get_response(request)
+        finally:
+            profiler.stop()
+        name += ".html"
+        (directory / name).write_text(profiler.output_html(), encoding="utf-8")
+    else:
+        profiler = cProfile.Profile()
+        response = profiler.runcall(get_response, request)
+        name += ".pstats"
+        profiler.dump_stats(directory / name)
+
+    prune(directory)
+    return response, name
+
+
+def prune(directory):
+    keep = getattr(settings, "PROFILE_KEEP", 50)
+    profiles = sorted(list_profiles(directory), key=lambda path: path.stat().st_mtime, reverse=True)
+    for path in profiles[keep:]:
+        path.unlink(missing_ok=True)
+
+
+def list_profiles(directory=None):
+    directory = directory or profile_dir()
+    if not directory.is_dir():
+        return []
+    return [path for path in directory.iterdir() if NAME_PATTERN.fullmatch(path.name)]
+
+
+def profile_path(name):
+    # None for anything that isn't one of our file names (no path traversal)
+    if not NAME_PATTERN.fullmatch(name):
+        return None
+    path = profile_dir() / name
+    return path if path.is_file() else None
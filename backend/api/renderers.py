@@ -0,0 +1,87 @@
+import csv
+import io
+import json
+
+from rest_framework.renderers import BaseRenderer, BrowsableAPIRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+# orjson and msgpack are optional.
+# If they are not installed the list endpoints just fall back to DRF's JSONRenderer.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+def _default(obj):
+    # Reuse DRF's encoder for anything orjson / msgpack can't handle (Decimal, lazy strings, ...)
+    return JSONEncoder().default(obj)
+
+
+class ORJSONRenderer(BaseRenderer):
+    media_type = "application/json"
+    format = "json"
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class MessagePackRenderer(BaseRenderer):
+    # Picked with "Accept: application/msgpack" or ?format=msgpack
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return msgpack.packb(data, default=_default, use_bin_type=True)
+
+
+class NDJSONRenderer(BaseRenderer):
+    # One JSON document per line, used by the streaming export
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Only reached for error responses, exports stream their own body
+        if data is None:
+            return b""
+        items = data if isinstance(data, list) else [data]
+        return "".join(json.dumps(item, cls=JSONEncoder) + "\n" for item in items).encode()
+
+
+class CSVRenderer(BaseRenderer):
+    media_type = "text/csv"
+    format = "csv"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Only reached for error responses, exports stream their own body
+        if data is None:
+            return b""
+        items = data if isinstance(data, list) else [data]
+        out = io.StringIO()
+        writer = csv.writer(out)
+        if items:
+            writer.writerow(items[0].keys())
+        for item in items:
+            writer.writerow(item.values())
+        return out.getvalue().encode()
+
+
+# Renderers for list endpoints, first one is the default
+LIST_RENDERER_CLASSES = [ORJSONRenderer if orjson else JSONRenderer, BrowsableAPIRenderer]
+if msgpack:
+    LIST_RENDERER_CLASSES.append(MessagePackRenderer)
+
+# Renderers for streaming exports, NDJSON by default, ?format=csv for CSV
+EXPORT_RENDERER_CLASSES = [NDJSONRenderer, CSVRenderer]
@@ -0,0 +1,228 @@
+import json
+import os
+import time
+from collections import Counter
+from datetime import timedelta, timezone as dt_timezone
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Dataset, DatasetRollup, EquipmentReading, ReadingPartition, RetentionPolicy
+
+# Retention for upload history (`manage.py compact_history`). A user's
+# datasets older than their policy are compacted a batch at a time:
+#   1. the batch's datasets and their equipment readings are written to the
+#      archive, one compressed .npz of columns per month
+#      (ARCHIVE_DIR/user_<id>/<YYYY-MM>/<first id>-<last id>.npz), first
+#      under a .partial name
+#   2. in one short transaction, the files are added to ReadingPartition (the
+#      archive's index), the datasets to that month's DatasetRollup, and the
+#      datasets are deleted (their type counts and readings go with them)
+#   3. once that has committed, the files are renamed into place
+# Each batch is its own transaction, so the tables are never locked for
+# longer than one batch takes, and an interrupted run loses nothing: a batch
+# is either still in Dataset (and is archived again) or in its rollup. The
+# next run (`manage.py compact_history`, for every user, whether or not
+# anything of theirs expired) finishes what an interrupted one left behind
+# (finish_pending): a .partial file whose batch committed is renamed, any
+# other is deleted, so the archive never has a file whose datasets are also
+# in another one (`manage.py index_archive` indexes every .npz it finds).
+
+PARTIAL = ".partial"
+
+NUMERIC_COLUMNS = ("flowrate", "pressure", "temperature")
+DATASET_COLUMNS = (
+    "id", "name", "uploaded_at", "total_rows", "invalid_rows",
+    *(f"{column}_{stat}" for column in NUMERIC_COLUMNS for stat in ("mean", "min", "max", "count")),
+    "equipment_distribution",
+)
+READING_COLUMNS = ("dataset_id", "equipment_id", "rows", "flowrate", "pressure", "temperature")
+
+
+def policies(user_ids=None):
+    # (user id, keep days, archive) for every user whose datasets expire
+    default = getattr(settings, "RETENTION_DAYS", None)
+    explicit = {
+        user_id: (keep_days, archive)
+        for user_id, keep_days, archive in RetentionPolicy.objects.values_list("user_id", "keep_days", "archive")
+    }
+    users = User.objects.order_by("id")
+    if user_ids is not None:
+        users = users.filter(id__in=user_ids)
+    for user_id in users.values_list("id", flat=True).iterator():
+        keep_days, archive = explicit.get(user_id, (default, True))
+        if keep_days is not None:
+            yield user_id, keep_days, archive
+
+
+def expired(user_id, keep_days, now=None):
+    cutoff = (now or timezone.now()) - timedelta(days=keep_days)
+    return Dataset.objects.filter(uploaded_by_id=user_id, uploaded_at__lt=cutoff)
+
+
+def compact(user_id, keep_days, archive=True, batch_size=None, pause=0.0, now=None):
+    # Compacts the user's expired datasets, oldest first. Returns how many.
+    batch_size = batch_size or getattr(settings, "RETENTION_BATCH_SIZE", 500)
+    finish_pending([user_id])
+    datasets = expired(user_id, keep_days, now).order_by("uploaded_at", "id").values_list(*DATASET_COLUMNS)
+    done = 0
+    while True:
+        batch = [dict(zip(DATASET_COLUMNS, row)) for row in datasets[:batch_size]]
+        if not batch:
+            return done
+        months = by_month(batch)
+        ids = [values["id"] for values in batch]
+        partitions = write_archive(user_id, months, ids) if archive else []
+        paths = [partition.pop("path") for partition in partitions]
+        with transaction.atomic():
+            for path, partition in zip(paths, partitions):
+                ReadingPartition.objects.update_or_create(path=path, defaults=partition)
+            merge_rollups(user_id, months)
+            Dataset.objects.filter(id__in=ids).delete()
+        root = Path(settings.ARCHIVE_DIR)
+        for path in paths:
+            os.replace(root / (path + PARTIAL), root / path)
+        done += len(batch)
+        if pause:
+            time.sleep(pause)
+
+
+def finish_pending(user_ids=None):
+    # The .partial files of an interrupted run, of these users (default: all):
+    # renamed into place when their batch committed (ReadingPartition has
+    # them), deleted when it didn't. Returns how many there were.
+    root = Path(settings.ARCHIVE_DIR)
+    if user_ids is None:
+        directories = sorted(root.glob("user_*"))
+    else:
+        directories = [root / f"user_{user_id}" for user_id in user_ids]
+    finished = 0
+    for directory in directories:
+        for partial in sorted(directory.glob(f"*/*.npz{PARTIAL}")):
+            path = partial.with_name(partial.name.removesuffix(PARTIAL))
+            if ReadingPartition.objects.filter(path=path.relative_to(root).as_posix()).exists():
+                os.replace(partial, path)
+            else:
+                partial.unlink()
+            finished += 1
+    return finished
+
+
+def by_month(batch):
+    months = {}
+    for values in batch:
+        month = timezone.localtime(values["uploaded_at"]).date().replace(day=1)
+        months.setdefault(month, []).append(values)
+    return months
+
+
+def merge_rollups(user_id, months):
+    rollups = {
+        rollup.month: rollup
+        for rollup in DatasetRollup.objects.select_for_update().filter(user_id=user_id, month__in=list(months))
+    }
+    for month, datasets in months.items():
+        rollup = rollups.get(month) or DatasetRollup(user_id=user_id, month=month, datasets=0, total_rows=0)
+        for values in datasets:
+            add_dataset(rollup, values)
+        rollup.save()
+
+
+def add_dataset(rollup, values):
+    rollup.datasets += 1
+    rollup.total_rows += values["total_rows"]
+    rollup.invalid_rows += values["invalid_rows"]
+    for column in NUMERIC_COLUMNS:
+        mean = values[f"{column}_mean"]
+        if mean is None:
+            continue
+        # datasets from before value counts were stored have a mean but a
+        # count of 0; their rows stand in for it
+        count = values[f"{column}_count"] or values["total_rows"]
+        total = getattr(rollup, f"{column}_count")
+        if total + count:
+            previous = getattr(rollup, f"{column}_mean") or 0.0
+            setattr(rollup, f"{column}_mean", previous + (mean - previous) * count / (total + count))
+        setattr(rollup, f"{column}_count", total + count)
+        for stat, pick in (("min", min), ("max", max)):
+            value, current = values[f"{column}_{stat}"], getattr(rollup, f"{column}_{stat}")
+            if value is not None:
+                setattr(rollup, f"{column}_{stat}", value if current is None else pick(current, value))
+    distribution = Counter(rollup.equipment_distribution)
+    distribution.update(values["equipment_distribution"] or {})
+    rollup.equipment_distribution = dict(distribution)
+
+
+def archive_path(user_id, month, ids):
+    # relative to ARCHIVE_DIR
+    return f"user_{user_id}/{month:%Y-%m}/{min(ids)}-{max(ids)}.npz"
+
+
+def write_archive(user_id, months, ids):
+    # Writes one file per month, under its path + PARTIAL until compact()
+    # renames it. Returns their ReadingPartition fields.
+    readings = {}
+    for row in EquipmentReading.objects.filter(dataset_id__in=ids).order_by("dataset_id", "id").values_list(*READING_COLUMNS):
+        readings.setdefault(row[0], []).append(row)
+
+    partitions = []
+    for month, datasets in months.items():
+        month_ids = [values["id"] for values in datasets]
+        arrays = {name: _array(name, [values[name] for values in datasets]) for name in DATASET_COLUMNS}
+        rows = [row for dataset_id in month_ids for row in readings.get(dataset_id, ())]
+        for position, name in enumerate(READING_COLUMNS):
+            arrays[f"reading_{name}"] = _array(name, [row[position] for row in rows])
+
+        relative = archive_path(user_id, month, month_ids)
+        path = Path(settings.ARCHIVE_DIR) / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        partial = path.with_name(path.name + PARTIAL)
+        with open(partial, "wb") as f:
+            np.savez_compressed(f, **arrays)
+
+        uploaded = [values["uploaded_at"] for values in datasets]
+        partitions.append({
+            "path": relative,
+            "user_id": user_id,
+            "month": month,
+            "first_uploaded_at": min(uploaded),
+            "last_uploaded_at": max(uploaded),
+            "datasets": len(datasets),
+            "readings": len(rows),
+            "size": partial.stat().st_size,
+        })
+    return partitions
+
+
+def _array(name, values):
+    if name == "uploaded_at":
+        return np.array(
+            [value.astimezone(dt_timezone.utc).replace(tzinfo=None) for value in values], dtype="datetime64[us]",
+        )
+    if name == "name":
+        return np.array(values, dtype=str)
+    if name == "equipment_distribution":
+        return np.array([json.dumps(value) for value in values], dtype=str)
+    if name in ("flowrate", "pressure", "temperature") or name.endswith(("_mean", "_min", "_max")):
+        return np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+    return np.array(values, dtype=np.int64)
+
+
+def analyze(vacuum=False):
+    # Refreshes the planner's statistics, and with vacuum returns the space the
+    # deleted rows took. SQLite's VACUUM rewrites the whole file and locks it
+    # while it does, so it's opt in. Returns the statements that were run.
+    if connection.vendor == "postgresql":
+        statements = ["VACUUM ANALYZE" if vacuum else "ANALYZE"]
+    elif connection.vendor == "sqlite":
+        statements = (["VACUUM"] if vacuum else []) + ["ANALYZE"]
+    else:
+        return []
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+    return statements
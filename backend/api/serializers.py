@@ -1,11 +1,148 @@
+from django.db import transaction
+from django.utils import timezone
 from rest_framework import serializers
-from .models import Dataset
+from .models import Dataset, DatasetTypeCount
+from .equipment import store_readings
+
+# Fields a client can pick with ?fields= on list endpoints.
+# Same names and same order as DatasetSerializer renders them.
+DATASET_FIELDS = (
+    "id",
+    "uploaded_by",
+    "name",
+    "uploaded_at",
+    "total_rows",
+    "avg_usage_hours",
+    "avg_power",
+    "invalid_rows",
+    "flowrate_mean",
+    "flowrate_min",
+    "flowrate_max",
+    "flowrate_count",
+    "pressure_mean",
+    "pressure_min",
+    "pressure_max",
+    "pressure_count",
+    "temperature_mean",
+    "temperature_min",
+    "temperature_max",
+    "temperature_count",
+    "equipment_distribution",
+)
+
+# Old names still sent while clients move to the new ones -> the column they read.
+# avg_usage_hours / avg_power always held the Flowrate / Pressure means.
+LEGACY_FIELDS = {
+    "avg_usage_hours": "flowrate_mean",
+    "avg_power": "pressure_mean",
+}
+
 
 class DatasetSerializer(serializers.ModelSerializer):
     # It means that the uploaded_by field will be read-only and will display the username of the user who uploaded the dataset.
-    
-    uploaded_by = serializers.ReadOnlyField(source='uploaded_by.username') 
-    
+
+    uploaded_by = serializers.ReadOnlyField(source='uploaded_by.username')
+
+    avg_usage_hours = serializers.FloatField(source=LEGACY_FIELDS["avg_usage_hours"], read_only=True)
+    avg_power = serializers.FloatField(source=LEGACY_FIELDS["avg_power"], read_only=True)
+
     class Meta:
         model = Dataset
-        fields = "__all__"
\ No newline at end of file
+        fields = DATASET_FIELDS
+
+    def create(self, validated_data):
+        # the distribution is stored twice: as JSON on the dataset and as
+        # DatasetTypeCount rows for queries across uploads.
+        # save(equipment=...) passes the per-equipment readings (CSVAggregator summary)
+        equipment = validated_data.pop("equipment", ())
+        with transaction.atomic():
+            dataset = super().create(validated_data)
+            DatasetTypeCount.objects.bulk_create(DatasetTypeCount.for_dataset(dataset))
+            store_readings(dataset, equipment)
+        return dataset
+
+
+def parse_fields(raw):
+    # "name,total_rows" -> ("name", "total_rows")
+    # empty / missing -> every field
+    if not raw:
+        return DATASET_FIELDS
+
+    requested = {field.strip() for field in raw.split(",") if field.strip()}
+    unknown = requested - set(DATASET_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+
+    # keep the serializer order, not the order the client typed them in
+    return tuple(field for field in DATASET_FIELDS if field in requested)
+
+
+def only_fields(fields):
+    # Model columns needed to render `fields`, used with queryset.only()
+    # so unselected columns (like the big equipment_distribution JSON) are never read.
+    # uploaded_by needs the username from the joined user row (see select_related in historyList)
+    columns = []
+    for field in fields:
+        if field == "uploaded_by":
+            column = "uploaded_by__username"
+        else:
+            column = LEGACY_FIELDS.get(field, field)
+        if field != "id" and column not in columns:
+            columns.append(column)
+    return columns or ["id"]
+
+
+def format_datetime(value, tz):
+    # Same output as DRF's DateTimeField ("2026-02-03T06:00:00.123456Z")
+    if value is None:
+        return None
+    if timezone.is_aware(value):
+        value = value.astimezone(tz)
+    value = value.isoformat()
+    if value.endswith("+00:00"):
+        value = value[:-6] + "Z"
+    return value
+
+
+def _float_or_none(value):
+    return None if value is None else float(value)
+
+
+_FIELD_GETTERS = {
+    "id": lambda dataset, tz: dataset.id,
+    "uploaded_by": lambda dataset, tz: dataset.uploaded_by.username,
+    "name": lambda dataset, tz: dataset.name,
+    "uploaded_at": lambda dataset, tz: format_datetime(dataset.uploaded_at, tz),
+    "total_rows": lambda dataset, tz: dataset.total_rows,
+    "invalid_rows": lambda dataset, tz: dataset.invalid_rows,
+    "equipment_distribution": lambda dataset, tz: dataset.equipment_distribution,
+}
+
+
+def _count_getter(column):
+    return lambda dataset, tz: getattr(dataset, column)
+
+
+def _float_getter(column):
+    return lambda dataset, tz: _float_or_none(getattr(dataset, column))
+
+
+# the per-column aggregates (and their old names)
+for _field in DATASET_FIELDS:
+    if _field.endswith("_count"):
+        _FIELD_GETTERS[_field] = _count_getter(_field)
+    elif _field not in _FIELD_GETTERS:
+        _FIELD_GETTERS[_field] = _float_getter(LEGACY_FIELDS.get(_field, _field))
+
+
+def serialize_datasets(datasets, fields=DATASET_FIELDS):
+    # Fast read-only path for list endpoints.
+    # Produces the same dicts as DatasetSerializer(many=True).data but skips
+    # DRF's per-field machinery, which dominates the cost on big pages.
+    # look the timezone up once per page instead of once per row
+    tz = timezone.get_current_timezone()
+    getters = [(field, _FIELD_GETTERS[field]) for field in fields]
+    return [
+        {field: getter(dataset, tz) for field, getter in getters}
+        for dataset in datasets
+    ]
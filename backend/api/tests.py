@@ -1,3 +1,1224 @@
-from django.test import TestCase
+import io
+import json
+import tarfile
+import tempfile
+import threading
+from datetime import date, datetime, timezone as dt_timezone
+from pathlib import Path
+from unittest import mock, skipUnless
+
+import numpy as np
+import pandas as pd
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from asgiref.testing import ApplicationCommunicator
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import exports, hashers, ingest, live, metrics, renderers, retention, tracing
+from .auth_serializer import CustomTokenObtainPairSerializer
+from .authentication import CachedJWTAuthentication, clear_user_cache
+from .equipment import clear_equipment_cache, store_many_readings
+from .models import (
+    Dataset, DatasetRollup, DatasetTypeCount, Equipment, EquipmentReading, ImportedFile, ReadingPartition,
+    RetentionPolicy,
+)
+from .serializers import DatasetSerializer, serialize_datasets
 
 # Create your tests here.
+
+SAMPLE_CSV = (
+    b"Equipment Name,Type,Flowrate,Pressure,Temperature\n"
+    b"Pump-1,Pump,120,5.2,110\n"
+    b"Compressor-1,Compressor,95,8.4,95\n"
+    b"Valve-1,Valve,60,4.1,105\n"
+)
+
+
+def make_dataset(user, name="shift.csv", **extra):
+    values = {
+        "name": name,
+        "uploaded_by": user,
+        "total_rows": 15,
+        "flowrate_mean": 120.5,
+        "pressure_mean": 6.25,
+        "equipment_distribution": {"Pump": 4, "Valve": 3},
+    }
+    values.update(extra)
+    return Dataset.objects.create(**values)
+
+
+class HistoryListTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="operator", password="secret-pass-1")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_fast_serializer_matches_drf_serializer(self):
+        make_dataset(self.user, "a.csv")
+        make_dataset(self.user, "b.csv")
+        datasets = Dataset.objects.order_by("id")
+
+        self.assertEqual(
+            serialize_datasets(datasets),
+            [dict(row) for row in DatasetSerializer(datasets, many=True).data],
+        )
+
+    def test_sparse_fields(self):
+        make_dataset(self.user)
+
+        response = self.client.get("/api/get-history/", {"fields": "total_rows,name"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["results"], [{"name": "shift.csv", "total_rows": 15}])
+
+    def test_since_returns_only_newer_datasets(self):
+        older = make_dataset(self.user, "older.csv")
+        make_dataset(self.user, "newer.csv")
+
+        response = self.client.get("/api/get-history/", {"since": older.uploaded_at.isoformat()})
+
+        self.assertEqual(response.json()["count"], 1)
+        self.assertEqual([row["name"] for row in response.json()["results"]], ["newer.csv"])
+
+    def test_unknown_field_is_rejected(self):
+        response = self.client.get("/api/get-history/", {"fields": "name,password"})
+
+        self.assertEqual(response.status_code, 400)
+
+    @skipUnless(renderers.msgpack, "msgpack is not installed")
+    def test_msgpack_rendering(self):
+        make_dataset(self.user)
+
+        response = self.client.get("/api/get-history/", HTTP_ACCEPT="application/msgpack")
+
+        self.assertEqual(response["Content-Type"], "application/msgpack")
+        body = renderers.msgpack.unpackb(response.content)
+        self.assertEqual(body["results"][0]["name"], "shift.csv")
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="operator", password="secret-pass-1")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        make_dataset(self.user)
+
+    def test_same_version_is_not_modified(self):
+        first = self.client.get("/api/get-history/")
+        second = self.client.get("/api/get-history/", HTTP_IF_NONE_MATCH=first["ETag"])
+
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second.content, b"")
+        self.assertEqual(second["ETag"], first["ETag"])
+
+    def test_new_upload_changes_etag(self):
+        etag = self.client.get("/api/get-history/")["ETag"]
+        make_dataset(self.user, "newer.csv")
+
+        response = self.client.get("/api/get-history/", HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["count"], 2)
+
+    def test_delete_changes_etag(self):
+        make_dataset(self.user, "newer.csv")
+        etag = self.client.get("/api/get-history/")["ETag"]
+        Dataset.objects.filter(name="shift.csv").delete()
+
+        self.assertEqual(self.client.get("/api/get-history/", HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_etag_depends_on_page(self):
+        first = self.client.get("/api/get-history/", {"limit": 10})["ETag"]
+        other = self.client.get("/api/get-history/", {"limit": 1000})["ETag"]
+
+        self.assertNotEqual(first, other)
+
+
+class ExportHistoryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="operator", password="secret-pass-1")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_ndjson_streams_every_dataset_in_chunks(self):
+        for i in range(5):
+            make_dataset(self.user, f"shift-{i}.csv")
+        make_dataset(User.objects.create_user(username="other"), "not-mine.csv")
+
+        # chunks of 2 -> 3 data queries + 1 empty one to finish
+        # (the ETag version query runs in the view, before streaming starts)
+        with mock.patch.object(exports, "EXPORT_CHUNK_SIZE", 2):
+            response = self.client.get("/api/export-history/")
+            with self.assertNumQueries(4):
+                body = b"".join(response.streaming_content)
+
+        rows = [json.loads(line) for line in body.decode().splitlines()]
+        self.assertEqual([row["name"] for row in rows], [f"shift-{i}.csv" for i in range(5)])
+
+    def test_csv(self):
+        make_dataset(self.user)
+
+        response = self.client.get("/api/export-history/", {"format": "csv", "fields": "name,equipment_distribution"})
+
+        self.assertEqual(response["Content-Type"], "text/csv")
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines, ["name,equipment_distribution", 'shift.csv,"{""Pump"": 4, ""Valve"": 3}"'])
+
+
+class LiveUpdatesTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="operator", password="secret-pass-1")
+        self.token = str(AccessToken.for_user(self.user))
+        # the upload's on_commit callbacks run here and cache equipment ids the rollback removes
+        self.addCleanup(clear_equipment_cache)
+
+    def connect(self, scope):
+        scope = {"headers": [], "query_string": f"token={self.token}".encode(), **scope}
+        return ApplicationCommunicator(live.live_updates(None), scope)
+
+    def test_upload_publishes_event(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        with mock.patch.object(live.broker, "publish") as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = client.post("/api/desktop/upload", {"file": SimpleUploadedFile("shift.csv", SAMPLE_CSV)})
+
+        user_id, payload = publish.call_args.args
+        self.assertEqual(user_id, self.user.pk)
+        dataset = response.json()
+        self.assertEqual(json.loads(payload), {"type": "dataset.created", "dataset": dataset})
+
+    async def test_websocket(self):
+        communicator = self.connect({"type": "websocket", "path": live.WEBSOCKET_PATH})
+        await communicator.send_input({"type": "websocket.connect"})
+        self.assertEqual((await communicator.receive_output())["type"], "websocket.accept")
+
+        live.broker.publish(self.user.pk, '{"type":"dataset.created"}')
+        self.assertEqual(await communicator.receive_output(), {"type": "websocket.send", "text": '{"type":"dataset.created"}'})
+
+        await communicator.send_input({"type": "websocket.disconnect", "code": 1000})
+        await communicator.wait()
+        self.assertEqual(live.broker.subscriber_count(), 0)
+
+    async def test_server_sent_events(self):
+        communicator = self.connect({"type": "http", "method": "GET", "path": live.EVENTS_PATH})
+        await communicator.send_input({"type": "http.request", "body": b""})
+        start = await communicator.receive_output()
+        self.assertEqual(start["status"], 200)
+        self.assertIn((b"content-type", b"text/event-stream"), start["headers"])
+        await communicator.receive_output()  # retry hint
+
+        live.broker.publish(str(self.user.pk), '{"type":"dataset.created"}')
+        self.assertEqual((await communicator.receive_output())["body"], b'data: {"type":"dataset.created"}\n\n')
+
+        await communicator.send_input({"type": "http.disconnect"})
+        await communicator.wait()
+
+    async def test_invalid_token_is_rejected(self):
+        self.token = "not-a-token"
+        communicator = self.connect({"type": "http", "method": "GET", "path": live.EVENTS_PATH})
+
+        self.assertEqual((await communicator.receive_output())["status"], 401)
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        clear_user_cache()
+        self.user = User.objects.create_user(username="operator", password="secret-pass-1")
+
+    def authenticate(self, token, path="/api/get-history/"):
+        request = RequestFactory().get(path, HTTP_AUTHORIZATION=f"Bearer {token}")
+        return CachedJWTAuthentication().authenticate(request)[0]
+
+    def test_user_comes_from_claims(self):
+        token = CustomTokenObtainPairSerializer.get_token(self.user).access_token
+
+        with self.assertNumQueries(0):
+            user = self.authenticate(token)
+
+        self.assertEqual((user.pk, user.username), (self.user.pk, "operator"))
+        self.assertEqual(Dataset.objects.filter(uploaded_by=user).count(), 0)
+        with self.assertRaises(RuntimeError):
+            user.save()
+
+    def test_token_without_username_loads_user_once(self):
+        token = AccessToken.for_user(self.user)
+
+        with self.assertNumQueries(1):
+            self.authenticate(token)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.authenticate(token).username, "operator")
+
+    def test_admin_paths_use_the_database(self):
+        token = CustomTokenObtainPairSerializer.get_token(self.user).access_token
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(token, path="/api/admin/profiles/")
+
+
+class SignupAndLoginTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def login(self, password="wrong-pass"):
+        return self.client.post("/api/app1/token/", {"username": "operator", "password": password}, format="json")
+
+    def test_duplicate_username_is_rejected(self):
+        data = {"username": "operator", "password": "secret-pass-1"}
+        self.assertEqual(self.client.post("/api/signup/", data, format="json").status_code, 200)
+
+        response = self.client.post("/api/signup/", data, format="json")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"error": "Username already exists."})
+        self.assertEqual(User.objects.filter(username="operator").count(), 1)
+
+    @override_settings(THROTTLE_BUCKETS={
+        "login_ip": {"capacity": 100, "refill": 1},
+        "login_user": {"capacity": 2, "refill": 0.001},
+    })
+    def test_login_is_throttled_per_username(self):
+        User.objects.create_user(username="operator", password="secret-pass-1")
+
+        self.assertEqual([self.login().status_code for _ in range(2)], [401, 401])
+        response = self.login("secret-pass-1")
+
+        self.assertEqual(response.status_code, 429)
+        self.assertIn("Retry-After", response)
+
+    def test_busy_hashing_pool_fails_fast(self):
+        with mock.patch.object(hashers, "_slots", threading.BoundedSemaphore(1)):
+            hashers._slots.acquire()  # every slot taken
+            response = self.login()
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "1")
+
+    def test_busy_hashing_pool_does_not_break_the_admin_login(self):
+        with mock.patch.object(hashers.PooledPBKDF2PasswordHasher, "iterations", 1000):
+            User.objects.create_superuser("admin", password="secret-pass-1")
+            with mock.patch.object(hashers, "_slots", threading.BoundedSemaphore(1)):
+                hashers._slots.acquire()
+                response = self.client.post("/admin/login/", {"username": "admin", "password": "secret-pass-1"})
+
+        self.assertEqual(response.status_code, 302)
+
+    def test_hash_at_the_default_cost_is_not_rewritten_at_a_lower_one(self):
+        self.assertGreaterEqual(hashers.PooledPBKDF2PasswordHasher.iterations, PBKDF2PasswordHasher.iterations)
+        user = User.objects.create_user(username="operator")
+        stock = PBKDF2PasswordHasher()
+        user.password = stock.encode("secret-pass-1", stock.salt())
+        user.save()
+
+        with mock.patch.object(hashers.PooledPBKDF2PasswordHasher, "iterations", 1000):
+            self.assertEqual(self.login("secret-pass-1").status_code, 200)
+
+        user.refresh_from_db()
+        self.assertEqual(user.password.split("$")[1], str(PBKDF2PasswordHasher.iterations))
+
+
+@override_settings(METRICS_ENABLED=True, METRICS_TOKEN="scrape-me")
+class MetricsTests(TestCase):
+    def setUp(self):
+        clear_user_cache()
+        metrics.reset()
+        self.user = User.objects.create_user(username="operator")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def scrape(self):
+        return self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer scrape-me").content.decode()
+
+    def test_request_is_recorded_by_route(self):
+        make_dataset(self.user)
+        body = self.client.get("/api/get-history/").content
+
+        text = self.scrape()
+
+        labels = 'method="GET",route="api/get-history/",status="200"'
+        self.assertIn(f"http_request_duration_seconds_count{{{labels}}} 1", text)
+        self.assertIn(f'http_response_size_bytes_sum{{{labels}}} {len(body)}', text)
+        self.assertIn(f'http_request_db_queries_bucket{{{labels},le="0"}} 0', text)
+        self.assertIn(f'http_request_db_queries_count{{{labels}}} 1', text)
+
+    def test_unknown_paths_share_one_series(self):
+        self.client.get("/nope/1")
+        self.client.get("/nope/2")
+
+        text = self.scrape()
+
+        self.assertIn('http_request_duration_seconds_count{method="GET",route="unmatched",status="404"} 2', text)
+
+    @override_settings(METRICS_ENABLED=False)
+    def test_disabled(self):
+        with mock.patch.object(metrics, "record") as record:
+            response = APIClient().get("/metrics")
+
+        self.assertEqual(response.status_code, 404)
+        record.assert_not_called()
+
+    def test_token_required(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 401)
+        response = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer scrape-me")
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(METRICS_TOKEN=None)
+    def test_refused_without_a_token_configured(self):
+        with self.assertLogs("api.metrics", "WARNING"):
+            response = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer anything")
+        self.assertEqual(response.status_code, 403)
+
+
+class TracingTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="operator")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_upload_stages_are_traced(self):
+        with tempfile.TemporaryDirectory() as directory:
+            trace_file = Path(directory) / "traces.jsonl"
+            with override_settings(TRACING="file", TRACING_FILE=trace_file):
+                response = self.client.post("/api/web/upload", {"file": SimpleUploadedFile("shift.csv", SAMPLE_CSV)})
+            spans = [json.loads(line) for line in trace_file.read_text().splitlines()]
+
+        self.assertEqual(response.status_code, 201)
+        by_name = {span["name"]: span for span in spans}
+        self.assertEqual(
+            sorted(by_name),
+            ["upload.aggregate", "upload.insert", "upload.read_body", "upload.read_csv", "upload.validate", "upload.web"],
+        )
+        root = by_name["upload.web"]
+        self.assertEqual(root["attributes"]["http.status_code"], 201)
+        self.assertEqual(by_name["upload.read_body"]["attributes"]["upload.bytes"], len(SAMPLE_CSV))
+        self.assertEqual(by_name["upload.aggregate"]["attributes"]["upload.rows"], 3)
+        for span in spans:
+            self.assertEqual(span["traceId"], root["traceId"])
+            if span is not root:
+                self.assertEqual(span["parentSpanId"], root["spanId"])
+                self.assertLessEqual(root["startTimeUnixNano"], span["startTimeUnixNano"])
+
+    def test_disabled_by_default(self):
+        with tracing.span("upload.web") as current:
+            self.assertIs(current, tracing.NOOP_SPAN)
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.settings_override = override_settings(PROFILE_DIR=Path(self.directory.name))
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+    def auth(self, user):
+        token = CustomTokenObtainPairSerializer.get_token(user).access_token
+        return {"HTTP_AUTHORIZATION": f"Bearer {token}"}
+
+    def test_staff_request_is_profiled_and_downloadable(self):
+        staff = User.objects.create_user(username="admin", is_staff=True)
+        client = APIClient()
+
+        response = client.get("/api/get-history/", HTTP_X_PROFILE="1", **self.auth(staff))
+        name = response["X-Profile-Id"]
+        listed = client.get("/api/admin/profiles/", **self.auth(staff)).json()["results"]
+        download = client.get(f"/api/admin/profiles/{name}", **self.auth(staff))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([profile["name"] for profile in listed], [name])
+        self.assertEqual(download.status_code, 200)
+        self.assertEqual(b"".join(download.streaming_content), (Path(self.directory.name) / name).read_bytes())
+
+    def test_other_users_are_not_profiled(self):
+        user = User.objects.create_user(username="operator")
+        client = APIClient()
+
+        response = client.get("/api/get-history/", HTTP_X_PROFILE="1", **self.auth(user))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("X-Profile-Id", response)
+        self.assertEqual(list(Path(self.directory.name).iterdir()), [])
+        self.assertEqual(client.get("/api/admin/profiles/", **self.auth(user)).status_code, 403)
+
+    def test_download_rejects_other_file_names(self):
+        staff = User.objects.create_user(username="admin", is_staff=True)
+
+        response = APIClient().get("/api/admin/profiles/db.sqlite3", **self.auth(staff))
+
+        self.assertEqual(response.status_code, 404)
+
+
+class CSVIngestTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="operator")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def upload(self, content, name="shift.csv"):
+        return self.client.post("/api/web/upload", {"file": SimpleUploadedFile(name, content)})
+
+    def test_aggregates_match_pandas(self):
+        content = (
+            b"\xef\xbb\xbfEquipment Name,Type,Flowrate,Pressure,Temperature\r\n"
+            + b"".join(
+                f'"Pump, ""north""\n{i}",Pump,{100 + i},5.{i % 10},110\r\nValve-{i},Valve,{60 + i},,105\r\n'.encode()
+                for i in range(200)
+            )
+            + b"Reactor-1,Reactor,140,7.5,140"  # no trailing newline
+        )
+        expected = pd.read_csv(io.BytesIO(content), encoding="utf-8-sig")
+
+        # tiny blocks: many cuts, some inside the quoted names
+        with override_settings(CSV_PARSE_BLOCK_BYTES=100):
+            response = self.upload(content)
+
+        self.assertEqual(response.status_code, 201)
+        dataset = Dataset.objects.get()
+        self.assertEqual(dataset.total_rows, len(expected))
+        for column in ("Flowrate", "Pressure", "Temperature"):
+            prefix = column.lower()
+            self.assertAlmostEqual(getattr(dataset, f"{prefix}_mean"), expected[column].mean())
+            self.assertEqual(getattr(dataset, f"{prefix}_min"), expected[column].min())
+            self.assertEqual(getattr(dataset, f"{prefix}_max"), expected[column].max())
+            self.assertEqual(getattr(dataset, f"{prefix}_count"), expected[column].count())
+        self.assertEqual(dataset.equipment_distribution, expected["Type"].value_counts().to_dict())
+
+    def test_rejects_files_that_are_not_csv(self):
+        for name, content in (("shift.txt", SAMPLE_CSV), ("shift.csv", b"\x89PNG\r\n\x1a\n\0\0\0\rIHDR")):
+            response = self.upload(content, name)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json(), {"error": "Only CSV files are supported"})
+
+    def test_rejects_missing_columns(self):
+        response = self.upload(b"Equipment Name,Type,Flowrate\nPump-1,Pump,120\n")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"error": "CSV file is missing columns: Pressure, Temperature"})
+
+    def test_rejects_empty_and_unreadable_files(self):
+        self.assertEqual(self.upload(b"").json(), {"error": "CSV file is empty"})
+        self.assertEqual(self.upload(SAMPLE_CSV.split(b"\n")[0]).json(), {"error": "CSV file is empty"})
+        self.assertEqual(Dataset.objects.count(), 0)
+
+    def test_column_names_are_matched_loosely_and_by_alias(self):
+        content = b"equipment_type,FLOW RATE,press,Temperature,Notes\nPump,120,5.2,110,x\nValve,60,4.1,105,y\n"
+
+        response = self.upload(content)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["avg_usage_hours"], 90)
+        self.assertEqual(Dataset.objects.get().equipment_distribution, {"Pump": 1, "Valve": 1})
+
+    def test_rejects_ambiguous_columns(self):
+        response = self.upload(b"Type,Flowrate,flow_rate,Pressure,Temperature\nPump,1,2,3,4\n")
+
+        self.assertEqual(response.json(), {"error": "CSV file has more than one Flowrate column"})
+
+    def test_non_numeric_values_are_counted_and_skipped(self):
+        response = self.upload(SAMPLE_CSV + b"Pump-9,Pump,fast,5.0,110\n")
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["invalid_rows"], 1)
+        self.assertEqual(response.json()["total_rows"], 4)
+        self.assertAlmostEqual(response.json()["flowrate_mean"], (120 + 95 + 60) / 3)
+        self.assertEqual(response.json()["flowrate_count"], 3)
+        self.assertAlmostEqual(response.json()["pressure_mean"], (5.2 + 8.4 + 4.1 + 5.0) / 4)
+        self.assertEqual(response.json()["pressure_count"], 4)
+        # old names, same values
+        self.assertEqual(response.json()["avg_usage_hours"], response.json()["flowrate_mean"])
+        self.assertEqual(response.json()["avg_power"], response.json()["pressure_mean"])
+
+    def test_mostly_invalid_file_is_rejected_early(self):
+        # valid header, junk rows; rejected after the first block, not at the end
+        rows = b"Pump-1,Pump,high,low,hot\n" * 2000
+        with override_settings(CSV_PARSE_BLOCK_BYTES=8 * 1024), \
+                mock.patch.object(ingest.CSVAggregator, "finish") as finish:
+            response = self.upload(SAMPLE_CSV + rows * 20)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(response.json()["error"].startswith("Too many rows with non-numeric values"))
+        finish.assert_not_called()
+
+    @override_settings(CSV_UPLOAD_MAX_BYTES=1024)
+    def test_rejects_oversized_uploads(self):
+        big = SAMPLE_CSV + b"Pump-9,Pump,120,5.2,110\n" * 100
+
+        response = self.upload(big)
+
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(self.upload(SAMPLE_CSV).status_code, 201)
+
+
+class TypeAnalyticsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="operator", password="secret-pass-1")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.client.post("/api/web/upload", {"file": SimpleUploadedFile("a.csv", SAMPLE_CSV)})
+        self.client.post("/api/web/upload", {"file": SimpleUploadedFile("b.csv", SAMPLE_CSV + b"Pump-2,Pump,100,5.0,100\n")})
+
+        # someone else's uploads don't count
+        other = APIClient()
+        other.force_authenticate(User.objects.create_user(username="other", password="secret-pass-2"))
+        other.post("/api/web/upload", {"file": SimpleUploadedFile(
+            "c.csv", b"Equipment Name,Type,Flowrate,Pressure,Temperature\nReactor-1,Reactor,140,7.5,140\n",
+        )})
+
+    def test_upload_stores_type_counts(self):
+        dataset = Dataset.objects.get(name="b.csv")
+
+        self.assertEqual(
+            {row.type: row.count for row in dataset.type_counts.all()},
+            dataset.equipment_distribution,
+        )
+
+    def test_type_totals(self):
+        response = self.client.get("/api/analytics/types/")
+
+        self.assertEqual(response.json()["results"], [
+            {"type": "Pump", "datasets": 2, "total": 3},
+            {"type": "Compressor", "datasets": 2, "total": 2},
+            {"type": "Valve", "datasets": 2, "total": 2},
+        ])
+
+    def test_datasets_with_type(self):
+        response = self.client.get("/api/analytics/types/Pump/", {"limit": 1})
+
+        body = response.json()
+        self.assertEqual((body["type"], body["count"], body["limit"]), ("Pump", 2, 1))
+        self.assertEqual([(row["name"], row["count"]) for row in body["results"]], [("b.csv", 2)])
+        self.assertEqual(self.client.get("/api/analytics/types/Reactor/").json()["count"], 0)
+
+    def test_not_modified_until_next_upload(self):
+        etag = self.client.get("/api/analytics/types/")["ETag"]
+        self.assertEqual(self.client.get("/api/analytics/types/", HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.client.post("/api/web/upload", {"file": SimpleUploadedFile("d.csv", SAMPLE_CSV)})
+        self.assertEqual(self.client.get("/api/analytics/types/", HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class EquipmentTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="operator", password="secret-pass-1")
+        self.addCleanup(clear_equipment_cache)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def upload(self, name, content, client=None):
+        return (client or self.client).post("/api/web/upload", {"file": SimpleUploadedFile(name, content)})
+
+    def test_names_are_interned_across_uploads(self):
+        self.upload("a.csv", SAMPLE_CSV)
+        self.upload("b.csv", SAMPLE_CSV + b"Pump-2,Pump,100,5.0,100\n")
+
+        other = APIClient()
+        other.force_authenticate(User.objects.create_user(username="other", password="secret-pass-2"))
+        self.upload("c.csv", SAMPLE_CSV, other)
+
+        self.assertEqual(
+            sorted(Equipment.objects.filter(owner=self.user).values_list("name", "type")),
+            [("Compressor-1", "Compressor"), ("Pump-1", "Pump"), ("Pump-2", "Pump"), ("Valve-1", "Valve")],
+        )
+        self.assertEqual(Equipment.objects.count(), 7)
+        pump = Equipment.objects.get(owner=self.user, name="Pump-1")
+        self.assertEqual(pump.readings.count(), 2)
+
+    def test_rows_of_one_equipment_are_averaged(self):
+        self.upload("a.csv", SAMPLE_CSV + b"Pump-1,Pump,100,,90\n")
+
+        reading = EquipmentReading.objects.get(equipment__name="Pump-1")
+        self.assertEqual(
+            (reading.rows, reading.flowrate, reading.pressure, reading.temperature), (2, 110, 5.2, 100),
+        )
+
+    def test_files_without_names_have_no_readings(self):
+        response = self.upload("a.csv", b"Type,Flowrate,Pressure,Temperature\nPump,120,5.2,110\n")
+
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(Equipment.objects.exists())
+
+    @override_settings(EQUIPMENT_READINGS=False)
+    def test_names_are_interned_without_readings(self):
+        response = self.upload("a.csv", SAMPLE_CSV)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Equipment.objects.count(), 3)
+        self.assertFalse(EquipmentReading.objects.exists())
+
+    def test_long_names_are_rejected(self):
+        # cut to fit, these two would be one equipment
+        name = "Pump-" + "x" * 150
+        response = self.upload("a.csv", (
+            f"Equipment Name,Type,Flowrate,Pressure,Temperature\n{name}-1,Pump,100,5,100\n{name}-2,Pump,120,5,100\n"
+        ).encode())
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("at most 100 characters", response.json()["error"])
+
+        response = self.upload("b.csv", (
+            f"Equipment Name,Type,Flowrate,Pressure,Temperature\nPump-1,{'Centrifugal' * 20},100,5,100\n"
+        ).encode())
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Dataset.objects.exists())
+        self.assertFalse(Equipment.objects.exists())
+
+    def test_deleted_equipment_is_created_again(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.upload("a.csv", SAMPLE_CSV)
+        Equipment.objects.filter(name="Pump-1").delete()
+
+        self.assertEqual(self.upload("b.csv", SAMPLE_CSV).status_code, 201)
+        self.assertEqual(Equipment.objects.get(name="Pump-1").readings.count(), 1)
+
+    def test_history(self):
+        first = self.upload("a.csv", SAMPLE_CSV).json()["id"]
+        second = self.upload("b.csv", SAMPLE_CSV.replace(b"Pump-1,Pump,120", b"Pump-1,Pump,130")).json()["id"]
+
+        response = self.client.get("/api/equipment/Pump-1/")
+
+        body = response.json()
+        self.assertEqual((body["name"], body["type"], body["count"]), ("Pump-1", "Pump", 2))
+        self.assertEqual(
+            [(row["dataset"], row["dataset_name"], row["flowrate"]) for row in body["results"]],
+            [(second, "b.csv", 130), (first, "a.csv", 120)],
+        )
+        self.assertEqual(self.client.get("/api/equipment/Pump-9/").status_code, 404)
+
+
+class RetentionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="operator", password="secret-pass-1")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.addCleanup(clear_equipment_cache)
+        archive = tempfile.TemporaryDirectory()
+        self.addCleanup(archive.cleanup)
+        self.archive = Path(archive.name)
+        self.enterContext(override_settings(ARCHIVE_DIR=self.archive))
+
+    def upload(self, name, content, uploaded_at=None):
+        dataset_id = self.client.post("/api/web/upload", {"file": SimpleUploadedFile(name, content)}).json()["id"]
+        if uploaded_at:
+            Dataset.objects.filter(id=dataset_id).update(uploaded_at=uploaded_at)
+        return dataset_id
+
+    def compact(self, *args):
+        out = io.StringIO()
+        call_command("compact_history", *args, stdout=out)
+        return out.getvalue()
+
+    def test_old_datasets_become_a_monthly_rollup(self):
+        RetentionPolicy.objects.create(user=self.user, keep_days=365)
+        first = self.upload("a.csv", SAMPLE_CSV, datetime(2024, 1, 10, tzinfo=dt_timezone.utc))
+        second = self.upload("b.csv", SAMPLE_CSV + b"Pump-2,Pump,200,,\n", datetime(2024, 1, 20, tzinfo=dt_timezone.utc))
+        recent = self.upload("c.csv", SAMPLE_CSV)
+
+        output = self.compact("--batch-size", "1")
+
+        self.assertIn("2 datasets compacted", output)
+        self.assertEqual(list(Dataset.objects.values_list("id", flat=True)), [recent])
+        self.assertFalse(EquipmentReading.objects.filter(dataset_id__in=[first, second]).exists())
+        self.assertFalse(DatasetTypeCount.objects.filter(dataset_id__in=[first, second]).exists())
+
+        rollup = DatasetRollup.objects.get(user=self.user)
+        self.assertEqual((rollup.month, rollup.datasets, rollup.total_rows), (date(2024, 1, 1), 2, 7))
+        self.assertAlmostEqual(rollup.flowrate_mean, (275 + 475) / 7)
+        self.assertEqual((rollup.flowrate_count, rollup.pressure_count), (7, 6))
+        self.assertEqual((rollup.flowrate_min, rollup.flowrate_max), (60, 200))
+        self.assertEqual(rollup.equipment_distribution, {"Pump": 3, "Compressor": 2, "Valve": 2})
+
+        # one batch per transaction, so one archive file per batch
+        with np.load(self.archive / f"user_{self.user.pk}" / "2024-01" / f"{second}-{second}.npz") as archived:
+            self.assertEqual(list(archived["name"]), ["b.csv"])
+            self.assertEqual(json.loads(archived["equipment_distribution"][0]), {"Pump": 2, "Compressor": 1, "Valve": 1})
+            self.assertEqual(len(archived["reading_equipment_id"]), 4)
+            self.assertTrue(np.isnan(archived["reading_pressure"]).any())
+
+        response = self.client.get("/api/analytics/monthly/")
+        self.assertEqual(
+            [(row["month"], row["datasets"]) for row in response.json()["results"]], [("2024-01", 2)],
+        )
+
+    def test_later_runs_add_to_the_rollup(self):
+        RetentionPolicy.objects.create(user=self.user, keep_days=30)
+        self.upload("a.csv", SAMPLE_CSV, datetime(2024, 3, 1, tzinfo=dt_timezone.utc))
+        self.compact()
+        self.upload("b.csv", SAMPLE_CSV, datetime(2024, 3, 31, tzinfo=dt_timezone.utc))
+        self.compact()
+
+        rollup = DatasetRollup.objects.get(user=self.user)
+        self.assertEqual((rollup.datasets, rollup.total_rows, rollup.flowrate_count), (2, 6, 6))
+        self.assertAlmostEqual(rollup.flowrate_mean, 275 / 3)
+
+    def test_policy_and_default(self):
+        old = datetime(2020, 1, 1, tzinfo=dt_timezone.utc)
+        self.upload("a.csv", SAMPLE_CSV, old)
+        keeper = User.objects.create_user(username="keeper", password="secret-pass-2")
+        make_dataset(keeper)
+        Dataset.objects.filter(uploaded_by=keeper).update(uploaded_at=old)
+        RetentionPolicy.objects.create(user=keeper, keep_days=None, archive=False)
+
+        self.assertIn("0 datasets compacted", self.compact())  # RETENTION_DAYS = None
+
+        with override_settings(RETENTION_DAYS=90):
+            self.assertIn("1 datasets would be compacted", self.compact("--dry-run"))
+            self.assertEqual(Dataset.objects.count(), 2)
+            self.compact()
+        self.assertEqual(list(Dataset.objects.values_list("uploaded_by__username", flat=True)), ["keeper"])
+
+    def test_range_queries_read_only_overlapping_partitions(self):
+        RetentionPolicy.objects.create(user=self.user, keep_days=365)
+        self.upload("jan.csv", SAMPLE_CSV, datetime(2024, 1, 10, tzinfo=dt_timezone.utc))
+        self.upload("feb.csv", SAMPLE_CSV, datetime(2024, 2, 10, tzinfo=dt_timezone.utc))
+        self.upload("now.csv", SAMPLE_CSV)
+        self.compact()
+        self.assertEqual(
+            sorted(ReadingPartition.objects.values_list("month", "datasets", "readings")),
+            [(date(2024, 1, 1), 1, 3), (date(2024, 2, 1), 1, 3)],
+        )
+
+        body = self.client.get("/api/readings/", {"since": "2024-01-01", "until": "2024-02-01", "limit": 10}).json()
+        self.assertEqual(body["partitions"], {"total": 2, "scanned": 1, "pruned": 1, "archived_readings_scanned": 3, "missing": 0})
+        self.assertEqual(
+            sorted((row["dataset_name"], row["equipment"], row["flowrate"]) for row in body["results"]),
+            [("jan.csv", "Compressor-1", 95), ("jan.csv", "Pump-1", 120), ("jan.csv", "Valve-1", 60)],
+        )
+
+        body = self.client.get("/api/readings/", {"since": "2024-01-01", "equipment": "Pump-1"}).json()
+        self.assertEqual(
+            [row["dataset_name"] for row in body["results"]], ["now.csv", "feb.csv", "jan.csv"],
+        )
+        self.assertEqual(body["partitions"]["scanned"], 2)
+
+        # a page across the live readings and both files, and its count
+        body = self.client.get("/api/readings/", {"since": "2024-01-01", "limit": 4, "offset": 2}).json()
+        self.assertEqual(body["count"], 9)
+        self.assertEqual(
+            [(row["dataset_name"], row["equipment"]) for row in body["results"]],
+            [("now.csv", "Pump-1"), ("feb.csv", "Valve-1"), ("feb.csv", "Compressor-1"), ("feb.csv", "Pump-1")],
+        )
+
+        body = self.client.get("/api/equipment/Pump-1/").json()  # archived readings too
+        self.assertEqual(body["count"], 3)
+        self.assertEqual([row["dataset_name"] for row in body["results"]], ["now.csv", "feb.csv", "jan.csv"])
+        body = self.client.get("/api/equipment/Pump-1/", {"limit": 1, "offset": 1}).json()
+        self.assertEqual([row["dataset_name"] for row in body["results"]], ["feb.csv"])
+
+        body = self.client.get("/api/readings/").json()  # the last 7 days
+        self.assertEqual((body["count"], body["partitions"]["pruned"]), (3, 2))
+        self.assertEqual(self.client.get("/api/readings/", {"since": "last week"}).status_code, 400)
+
+    def test_index_is_rebuilt_from_the_archive(self):
+        RetentionPolicy.objects.create(user=self.user, keep_days=30)
+        self.upload("a.csv", SAMPLE_CSV, datetime(2024, 1, 10, tzinfo=dt_timezone.utc))
+        self.upload("b.csv", SAMPLE_CSV, datetime(2024, 1, 20, tzinfo=dt_timezone.utc))
+        self.compact("--batch-size", "1")
+        fields = ("user", "month", "path", "first_uploaded_at", "last_uploaded_at", "datasets", "readings", "size")
+        indexed = sorted(ReadingPartition.objects.values_list(*fields))
+        ReadingPartition.objects.all().delete()
+
+        out = io.StringIO()
+        call_command("index_archive", stdout=out)
+
+        self.assertIn("2 files indexed", out.getvalue())
+        self.assertEqual(sorted(ReadingPartition.objects.values_list(*fields)), indexed)
+
+    def test_interrupted_run_is_finished_by_the_next(self):
+        first, second, third = (
+            self.upload(f"{day}.csv", SAMPLE_CSV, datetime(2024, 1, day, tzinfo=dt_timezone.utc)) for day in (10, 11, 12)
+        )
+        month = self.archive / f"user_{self.user.pk}" / "2024-01"
+
+        # stopped before the batch committed: its file isn't in the archive
+        with mock.patch.object(retention, "merge_rollups", side_effect=RuntimeError("interrupted")):
+            with self.assertRaises(RuntimeError):
+                retention.compact(self.user.pk, 30, batch_size=2)
+        self.assertEqual([path.name for path in month.iterdir()], [f"{first}-{second}.npz.partial"])
+        self.assertEqual(Dataset.objects.count(), 3)
+
+        # stopped after it committed, before the file was renamed
+        with mock.patch("api.retention.os.replace", side_effect=RuntimeError("interrupted")):
+            with self.assertRaises(RuntimeError):
+                retention.compact(self.user.pk, 30, batch_size=2)
+        self.assertEqual([path.name for path in month.iterdir()], [f"{first}-{second}.npz.partial"])
+        self.assertEqual(list(Dataset.objects.values_list("id", flat=True)), [third])
+
+        # read under its .partial name until then
+        body = self.client.get("/api/equipment/Pump-1/").json()
+        self.assertEqual([row["dataset_name"] for row in body["results"]], ["12.csv", "11.csv", "10.csv"])
+
+        # compact_history finishes it, for every user, whether or not anything of theirs expired
+        self.assertIn("1 archive files of an interrupted run finished", self.compact())
+        self.assertEqual([path.name for path in month.iterdir()], [f"{first}-{second}.npz"])
+
+        self.assertEqual(retention.compact(self.user.pk, 30, batch_size=1), 1)
+        paths = [f"user_{self.user.pk}/2024-01/{ids}.npz" for ids in (f"{first}-{second}", f"{third}-{third}")]
+        self.assertEqual(sorted(path.relative_to(self.archive).as_posix() for path in month.iterdir()), paths)
+        self.assertEqual(sorted(ReadingPartition.objects.values_list("path", flat=True)), paths)
+        self.assertEqual(DatasetRollup.objects.get(user=self.user).datasets, 3)
+
+        call_command("index_archive", stdout=io.StringIO())
+        body = self.client.get("/api/readings/", {"since": "2024-01-01", "until": "2024-02-01"}).json()
+        self.assertEqual(body["count"], 9)
+
+        # a file that's gone is left out, not a 500
+        (month / f"{first}-{second}.npz").unlink()
+        with self.assertLogs("api.partitions", "WARNING"):
+            body = self.client.get("/api/readings/", {"since": "2024-01-01", "until": "2024-02-01"}).json()
+        self.assertEqual((body["count"], body["partitions"]["missing"]), (3, 1))
+        with self.assertLogs("api.partitions", "WARNING"):
+            self.assertEqual(self.client.get("/api/equipment/Pump-1/").json()["count"], 1)
+        # and index_archive forgets it
+        call_command("index_archive", stdout=io.StringIO())
+        body = self.client.get("/api/readings/", {"since": "2024-01-01", "until": "2024-02-01"}).json()
+        self.assertEqual(body["partitions"]["missing"], 0)
+
+
+class BulkImportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="operator", password="secret-pass-1")
+        self.addCleanup(clear_equipment_cache)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = Path(directory.name)
+
+    def write(self, path, content):
+        (self.root / path).parent.mkdir(parents=True, exist_ok=True)
+        (self.root / path).write_bytes(content)
+
+    def run_import(self, source, *args):
+        out, err = io.StringIO(), io.StringIO()
+        call_command("import_csv_archive", str(source), "--user", "operator", *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_directory(self):
+        self.write("2024/a.csv", SAMPLE_CSV)
+        self.write("2024/b.CSV", SAMPLE_CSV + b"Pump-2,Pump,100,5.0,100\n")
+        self.write("bad.csv", b"Type,Flowrate\nPump,1\n")
+        self.write("notes.txt", b"not a csv")
+
+        out, err = self.run_import(self.root, "--workers", "0", "--batch-size", "2")
+
+        self.assertIn("3 files (2 imported, 1 rejected), 7 rows", out)
+        self.assertIn("files/s", out)
+        self.assertIn("bad.csv: CSV file is missing columns: Pressure, Temperature", err)
+        datasets = Dataset.objects.filter(uploaded_by=self.user).order_by("id")
+        self.assertEqual([(dataset.name, dataset.total_rows) for dataset in datasets], [("a.csv", 3), ("b.CSV", 4)])
+        self.assertEqual(datasets[1].equipment_distribution, {"Pump": 2, "Compressor": 1, "Valve": 1})
+        self.assertEqual(DatasetTypeCount.objects.filter(dataset=datasets[1], type="Pump").get().count, 2)
+        self.assertEqual(EquipmentReading.objects.count(), 7)
+        self.assertEqual(
+            sorted(ImportedFile.objects.values_list("path", "error")),
+            [("2024/a.csv", ""), ("2024/b.CSV", ""), ("bad.csv", "CSV file is missing columns: Pressure, Temperature")],
+        )
+
+        # run again: only the new file
+        self.write("2025/c.csv", SAMPLE_CSV)
+        out, _ = self.run_import(self.root, "--workers", "0")
+        self.assertIn("done: 1 files (1 imported, 0 rejected)", out)
+        self.assertEqual(Dataset.objects.count(), 3)
+
+    def test_interrupted_import_resumes(self):
+        for name in ("a.csv", "b.csv", "c.csv"):
+            self.write(name, SAMPLE_CSV)
+
+        batches = []
+
+        def fail_second_batch(owner, uploads):
+            batches.append(uploads)
+            if len(batches) == 2:
+                raise RuntimeError("disk full")
+            store_many_readings(owner, uploads)
+
+        with mock.patch("api.bulk_import.store_many_readings", fail_second_batch):
+            with self.assertRaises(RuntimeError):
+                self.run_import(self.root, "--workers", "0", "--batch-size", "1")
+        self.assertEqual(list(Dataset.objects.values_list("name", flat=True)), ["a.csv"])
+        self.assertEqual(list(ImportedFile.objects.values_list("path", flat=True)), ["a.csv"])
+
+        self.run_import(self.root, "--workers", "0")
+        self.assertEqual(sorted(Dataset.objects.values_list("name", flat=True)), ["a.csv", "b.csv", "c.csv"])
+        self.assertEqual(EquipmentReading.objects.count(), 9)
+
+    def test_tarball_with_process_pool(self):
+        archive = self.root / "shifts.tar.gz"
+        with tarfile.open(archive, "w:gz") as tar:
+            for name, mtime in (("shifts/a.csv", 1_600_000_000), ("shifts/b.csv", 1_700_000_000)):
+                info = tarfile.TarInfo(name)
+                info.size, info.mtime = len(SAMPLE_CSV), mtime
+                tar.addfile(info, io.BytesIO(SAMPLE_CSV))
+
+        out, _ = self.run_import(archive, "--workers", "2", "--file-times")
+
+        self.assertIn("done: 2 files (2 imported, 0 rejected), 6 rows", out)
+        self.assertEqual(
+            list(Dataset.objects.order_by("id").values_list("name", "uploaded_at")),
+            [
+                ("a.csv", datetime.fromtimestamp(1_600_000_000, tz=dt_timezone.utc)),
+                ("b.csv", datetime.fromtimestamp(1_700_000_000, tz=dt_timezone.utc)),
+            ],
+        )
+        self.assertEqual(ImportedFile.objects.get(path="shifts/b.csv").source, str(archive.resolve()))
+
+    def test_long_paths_are_rejected(self):
+        deep = "/".join(["d" * 100] * 5) + "/a.csv"
+        self.write(deep, SAMPLE_CSV)
+        self.write("b.csv", SAMPLE_CSV)
+
+        out, err = self.run_import(self.root, "--workers", "0")
+
+        self.assertIn("done: 2 files (1 imported, 1 rejected)", out)
+        self.assertIn(f"{deep}: Path is longer than 500 characters", err)
+        self.assertEqual(list(ImportedFile.objects.values_list("path", flat=True)), ["b.csv"])
+
+        source = self.root / ("s" * 250) / ("s" * 250)
+        source.mkdir(parents=True)
+        with self.assertRaisesMessage(CommandError, "is longer than 500 characters"):
+            self.run_import(source)
+
+
+class DatasetAdminTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser("admin", password="secret-pass-1"))
+        self.operator = User.objects.create_user(username="operator", password="secret-pass-2")
+        self.other = User.objects.create_user(username="other", password="secret-pass-3")
+        User.objects.bulk_create([User(username=f"idle-{i}") for i in range(20)])
+        for name in ("shift-a.csv", "night-shift.csv", "Shift-b.csv"):
+            make_dataset(self.operator, name)
+        make_dataset(self.other, "shift-c.csv")
+
+    def changelist(self, **params):
+        return self.client.get("/admin/api/dataset/", params)
+
+    def test_user_filter_is_an_autocomplete(self):
+        response = self.changelist()
+
+        self.assertContains(response, 'class="admin-autocomplete"')
+        self.assertNotContains(response, "idle-")  # no link per user
+
+        response = self.changelist(uploaded_by__id__exact=self.other.pk)
+        self.assertEqual([dataset.name for dataset in response.context["cl"].result_list], ["shift-c.csv"])
+        self.assertContains(response, f'<option value="{self.other.pk}" selected>other</option>', html=True)
+
+    def test_search_is_a_name_prefix(self):
+        response = self.changelist(q="shift")
+
+        self.assertEqual(
+            sorted(dataset.name for dataset in response.context["cl"].result_list), ["shift-a.csv", "shift-c.csv"],
+        )
+        # the range alone isn't a prefix match under a locale collation (Postgres)
+        self.assertIn("LIKE", str(response.context["cl"].queryset.query))
+
+    @override_settings(ADMIN_EXACT_COUNT_MAX=1)
+    def test_big_tables_are_not_counted(self):
+        Dataset.objects.filter(name="night-shift.csv").delete()  # the estimate doesn't see gaps
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.changelist()
+
+        self.assertFalse([query for query in queries.captured_queries if "COUNT(" in query["sql"]])
+        self.assertEqual(response.context["cl"].result_count, 4)
+        self.assertEqual(len(response.context["cl"].result_list), 3)
+        # filtered, the count is exact
+        self.assertEqual(self.changelist(uploaded_by__id__exact=self.operator.pk).context["cl"].result_count, 2)
+
+
+# Number of SQL queries each endpoint is allowed to run, including JWT
+# authentication. QueryBudgetTests fails when an endpoint runs more (a new N+1
+# or extra lookup) and also when it runs fewer, so improvements get locked in
+# here instead of silently leaving room for the next regression.
+QUERY_BUDGETS = {
+    "home": 0,
+    "signup": 3,
+    "token": 1,
+    "token_refresh": 1,
+    "history": 2,
+    "history_not_modified": 1,
+    "export": 3,
+    # dataset, type counts and readings in one transaction (SAVEPOINT / RELEASE
+    # in tests), and looking up and creating the equipment seen for the first time
+    "web_upload": 8,
+    "desktop_upload": 8,
+    # the same with every name already cached
+    "equipment_known_upload": 5,
+    "type_totals": 2,
+    "type_datasets": 3,
+    # the ETag's version, the equipment, then like readings without the names
+    "equipment_history": 6,
+    "monthly_rollups": 2,
+    # COUNT and page of the live readings, the partition count and the
+    # overlapping ones, equipment names
+    "readings": 5,
+    # the session and its user, the table size estimate, COUNT (a small table), the page
+    "admin_changelist": 5,
+}
+
+
+class DatasetMigrationTests(TransactionTestCase):
+    latest = ("api", "0006_backfill_datasettypecount")
+
+    def migrate(self, target):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate([target])
+        return executor.loader.project_state([target]).apps
+
+    def tearDown(self):
+        self.migrate(self.latest)
+
+    def test_old_rows_are_backfilled(self):
+        apps = self.migrate(("api", "0001_initial"))
+        user = apps.get_model("auth", "User").objects.create(username="operator")
+        apps.get_model("api", "Dataset").objects.create(
+            name="old.csv", uploaded_by=user, total_rows=3, avg_usage_hours=91.6, avg_power=5.9,
+            equipment_distribution={"Pump": 3},
+        )
+
+        apps = self.migrate(self.latest)
+
+        dataset = apps.get_model("api", "Dataset").objects.get()
+        self.assertEqual((dataset.flowrate_mean, dataset.pressure_mean), (91.6, 5.9))
+        self.assertIsNone(dataset.temperature_mean)
+        # the rows stand in for the counts, so count-weighted means include it
+        self.assertEqual((dataset.flowrate_count, dataset.pressure_count, dataset.temperature_count), (3, 3, 0))
+        type_counts = apps.get_model("api", "DatasetTypeCount").objects.values_list("dataset", "type", "count")
+        self.assertEqual(list(type_counts), [(dataset.id, "Pump", 3)])
+
+
+class QueryBudgetTests(TestCase):
+    def setUp(self):
+        clear_user_cache()
+        cache.clear()  # throttle buckets
+        self.addCleanup(clear_equipment_cache)
+        self.user = User.objects.create_user(username="operator", password="secret-pass-1")
+        self.client = APIClient()
+        tokens = self.client.post(
+            "/api/app1/token/", {"username": "operator", "password": "secret-pass-1"}, format="json"
+        ).json()
+        self.refresh = tokens["refresh"]
+        self.auth = {"HTTP_AUTHORIZATION": f"Bearer {tokens['access']}"}
+
+    def assertQueryBudget(self, name, request):
+        with CaptureQueriesContext(connection) as queries:
+            response = request()
+        self.assertLess(response.status_code, 400, response.content)
+
+        executed = len(queries)
+        budget = QUERY_BUDGETS[name]
+        sql = "\n".join(query["sql"] for query in queries.captured_queries)
+        self.assertFalse(
+            executed > budget,
+            f"{name} ran {executed} queries, budget is {budget}:\n{sql}",
+        )
+        self.assertFalse(
+            executed < budget,
+            f"{name} now runs {executed} queries (budget {budget}), lower QUERY_BUDGETS[{name!r}]",
+        )
+        return response
+
+    def test_home(self):
+        self.assertQueryBudget("home", lambda: self.client.get("/api/"))
+
+    def test_signup(self):
+        self.assertQueryBudget("signup", lambda: self.client.post(
+            "/api/signup/", {"username": "new-operator", "password": "secret-pass-2"}, format="json"
+        ))
+
+    def test_token(self):
+        self.assertQueryBudget("token", lambda: self.client.post(
+            "/api/app1/token/", {"username": "operator", "password": "secret-pass-1"}, format="json"
+        ))
+
+    def test_token_refresh(self):
+        self.assertQueryBudget("token_refresh", lambda: self.client.post(
+            "/api/app1/token/refresh/", {"refresh": self.refresh}, format="json"
+        ))
+
+    def test_history_does_not_grow_with_page_size(self):
+        make_dataset(self.user)
+        self.assertQueryBudget("history", lambda: self.client.get("/api/get-history/", **self.auth))
+
+        for i in range(25):
+            make_dataset(self.user, f"shift-{i}.csv")
+        response = self.assertQueryBudget(
+            "history", lambda: self.client.get("/api/get-history/", {"limit": 50}, **self.auth)
+        )
+        self.assertEqual(len(response.json()["results"]), 26)
+        self.assertEqual(response.json()["results"][0]["uploaded_by"], "operator")
+
+    def test_history_not_modified(self):
+        make_dataset(self.user)
+        etag = self.client.get("/api/get-history/", **self.auth)["ETag"]
+
+        response = self.assertQueryBudget("history_not_modified", lambda: self.client.get(
+            "/api/get-history/", HTTP_IF_NONE_MATCH=etag, **self.auth
+        ))
+        self.assertEqual(response.status_code, 304)
+
+    def test_export(self):
+        make_dataset(self.user)
+
+        def export():
+            response = self.client.get("/api/export-history/", **self.auth)
+            # the rows are only queried while the stream is consumed
+            return HttpResponse(response.getvalue(), status=response.status_code)
+
+        self.assertQueryBudget("export", export)
+
+    def test_web_upload(self):
+        self.assertQueryBudget("web_upload", lambda: self.client.post(
+            "/api/web/upload", {"file": SimpleUploadedFile("shift.csv", SAMPLE_CSV)}, **self.auth
+        ))
+
+    def test_desktop_upload(self):
+        self.assertQueryBudget("desktop_upload", lambda: self.client.post(
+            "/api/desktop/upload", {"file": SimpleUploadedFile("shift.csv", SAMPLE_CSV)}, **self.auth
+        ))
+
+    def test_equipment_known_upload(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post("/api/web/upload", {"file": SimpleUploadedFile("shift.csv", SAMPLE_CSV)}, **self.auth)
+        self.assertQueryBudget("equipment_known_upload", lambda: self.client.post(
+            "/api/web/upload", {"file": SimpleUploadedFile("shift.csv", SAMPLE_CSV)}, **self.auth
+        ))
+
+    def test_type_totals(self):
+        self.client.post("/api/web/upload", {"file": SimpleUploadedFile("shift.csv", SAMPLE_CSV)}, **self.auth)
+        self.assertQueryBudget("type_totals", lambda: self.client.get("/api/analytics/types/", **self.auth))
+
+    def test_type_datasets(self):
+        self.client.post("/api/web/upload", {"file": SimpleUploadedFile("shift.csv", SAMPLE_CSV)}, **self.auth)
+        self.assertQueryBudget("type_datasets", lambda: self.client.get("/api/analytics/types/Pump/", **self.auth))
+
+    def test_equipment_history(self):
+        self.client.post("/api/web/upload", {"file": SimpleUploadedFile("shift.csv", SAMPLE_CSV)}, **self.auth)
+        self.assertQueryBudget("equipment_history", lambda: self.client.get("/api/equipment/Pump-1/", **self.auth))
+
+
+    def test_monthly_rollups(self):
+        DatasetRollup.objects.create(user=self.user, month=date(2024, 1, 1), datasets=2, total_rows=10)
+        self.assertQueryBudget("monthly_rollups", lambda: self.client.get("/api/analytics/monthly/", **self.auth))
+
+    def test_readings(self):
+        self.client.post("/api/web/upload", {"file": SimpleUploadedFile("shift.csv", SAMPLE_CSV)}, **self.auth)
+        self.assertQueryBudget("readings", lambda: self.client.get("/api/readings/", **self.auth))
+
+    def test_admin_changelist(self):
+        self.user.is_staff = self.user.is_superuser = True
+        self.user.save()
+        self.client.force_login(self.user)
+        for i in range(25):
+            make_dataset(User.objects.create_user(username=f"uploader-{i}"), f"shift-{i}.csv")
+        self.assertQueryBudget("admin_changelist", lambda: self.client.get("/admin/api/dataset/"))
\ No newline at end of file
@@ -0,0 +1,88 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.throttling import BaseThrottle
+
+# Token bucket throttles for the login and signup endpoints.
+#
+# Each client (IP address, or username) has a bucket holding up to `capacity`
+# tokens that refills at `refill` tokens per second; every request takes one
+# and is refused with a 429 (and Retry-After) when the bucket is empty. Unlike
+# DRF's fixed-rate throttles this allows short bursts (a user retyping a
+# password) while still capping the sustained rate, and the state per client
+# is two numbers instead of a list of timestamps.
+#
+# Buckets live in the default cache. With the default per-process LocMemCache
+# every worker process has its own buckets; configure a shared cache (Redis,
+# Memcached) in CACHES for one limit across processes.
+
+DEFAULT_BUCKETS = {
+    "login_ip": {"capacity": 30, "refill": 1.0},
+    "login_user": {"capacity": 10, "refill": 0.2},
+    "signup_ip": {"capacity": 5, "refill": 0.05},
+}
+
+
+class TokenBucketThrottle(BaseThrottle):
+    scope = None
+
+    def get_ident_key(self, request):
+        # What the bucket is per, or None to not throttle this request
+        raise NotImplementedError
+
+    def get_bucket(self):
+        buckets = getattr(settings, "THROTTLE_BUCKETS", DEFAULT_BUCKETS)
+        bucket = buckets.get(self.scope, DEFAULT_BUCKETS[self.scope])
+        return bucket["capacity"], bucket["refill"]
+
+    def allow_request(self, request, view):
+        ident = self.get_ident_key(request)
+        if ident is None:
+            return True
+
+        capacity, refill = self.get_bucket()
+        # hashed, usernames can contain characters some cache backends refuse in keys
+        key = f"throttle:{self.scope}:{hashlib.sha1(ident.encode()).hexdigest()}"
+        now = time.time()
+
+        # (tokens, last update); get + set isn't atomic, concurrent requests
+        # from one client may occasionally both get the last token
+        tokens, updated = cache.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * refill)
+        if tokens < 1:
+            self._wait = (1 - tokens) / refill
+            return False
+
+        # kept until the bucket would be full again anyway
+        cache.set(key, (tokens - 1, now), timeout=int(capacity / refill) + 1)
+        return True
+
+    def wait(self):
+        return self._wait
+
+
+class LoginIPThrottle(TokenBucketThrottle):
+    scope = "login_ip"
+
+    def get_ident_key(self, request):
+        return self.get_ident(request)
+
+
+class LoginUsernameThrottle(TokenBucketThrottle):
+    # Limits password guessing against one account from many addresses
+    scope = "login_user"
+
+    def get_ident_key(self, request):
+        username = request.data.get("username")
+        if not isinstance(username, str) or not username:
+            return None
+        return username.lower()
+
+
+class SignupIPThrottle(TokenBucketThrottle):
+    scope = "signup_ip"
+
+    def get_ident_key(self, request):
+        return self.get_ident(request)
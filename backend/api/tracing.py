@@ -0,0 +1,123 @@
+import functools
+import json
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+# Tracing spans around the stages of a request (see the upload views), so a
+# slow upload shows whether the time went to the multipart body, read_csv,
+# the aggregates, validation or the INSERT. Stages that don't run in one go
+# (an upload's CSV is parsed block by block while it's received) are timed
+# by the code itself and added with record().
+#
+# settings.TRACING picks where spans go:
+#   None             spans are no-ops (the default; about 3 us each)
+#   "file"           one JSON line per finished span appended to TRACING_FILE,
+#                    with OTLP's field names (traceId, spanId, parentSpanId,
+#                    startTimeUnixNano, ...) and the attributes as a flat object
+#   "opentelemetry"  through the opentelemetry-api package, exported wherever
+#                    the OpenTelemetry SDK is configured to send them
+
+_current = ContextVar("current_span", default=None)
+_write_lock = threading.Lock()
+
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "attributes")
+
+    def __init__(self, name, parent, attributes):
+        self.trace_id = parent.trace_id if parent is not None else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent is not None else ""
+        self.name = name
+        self.attributes = attributes
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+
+class NoopSpan:
+    def set_attribute(self, key, value):
+        pass
+
+
+NOOP_SPAN = NoopSpan()
+
+
+@functools.lru_cache(maxsize=None)
+def _otel_tracer():
+    try:
+        from opentelemetry import trace
+    except ImportError:
+        raise ImproperlyConfigured('TRACING = "opentelemetry" needs the opentelemetry-api package installed')
+    return trace.get_tracer("api")
+
+
+def _write(span, start, end, status):
+    line = json.dumps({
+        "traceId": span.trace_id,
+        "spanId": span.span_id,
+        "parentSpanId": span.parent_id,
+        "name": span.name,
+        "startTimeUnixNano": start,
+        "endTimeUnixNano": end,
+        "status": status,
+        "attributes": span.attributes,
+    }, default=str)
+    with _write_lock, open(settings.TRACING_FILE, "a", encoding="utf-8") as out:
+        out.write(line + "\n")
+
+
+@contextmanager
+def span(name, **attributes):
+    backend = getattr(settings, "TRACING", None)
+    if backend is None:
+        yield NOOP_SPAN
+        return
+    if backend == "opentelemetry":
+        with _otel_tracer().start_as_current_span(name, attributes=attributes) as otel_span:
+            yield otel_span
+        return
+
+    current = Span(name, _current.get(), attributes)
+    token = _current.set(current)
+    start = time.time_ns()
+    status = "OK"
+    try:
+        yield current
+    except BaseException as e:
+        status = "ERROR"
+        current.attributes["exception.type"] = type(e).__name__
+        raise
+    finally:
+        _current.reset(token)
+        _write(current, start, time.time_ns(), status)
+
+
+def record(name, start, end, **attributes):
+    # A finished child span of the current one, start and end in time.time_ns()
+    backend = getattr(settings, "TRACING", None)
+    if backend is None:
+        return
+    if backend == "opentelemetry":
+        _otel_tracer().start_span(name, start_time=start, attributes=attributes).end(end_time=end)
+        return
+    _write(Span(name, _current.get(), attributes), start, end, "OK")
+
+
+def traced(name):
+    # Decorator: the whole view in one span, with the response status on it
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            with span(name, **{"http.method": request.method}) as current:
+                response = view(request, *args, **kwargs)
+                current.set_attribute("http.status_code", response.status_code)
+                return response
+        return wrapper
+    return decorator
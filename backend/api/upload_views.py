@@ -1,50 +1,65 @@
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, parser_classes, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated 
 from .serializers import DatasetSerializer
-import pandas as pd 
+from .live import publish_dataset_created
+from .ingest import CSVUploadParser
+from .tracing import record, span, traced
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def trace_ingest(file, started):
+    # Receiving the body, read_csv and adding up the blocks interleave while
+    # the CSV arrives (api/ingest.py), so each stage is recorded as one span
+    # as long as its total time, laid end to end from when the body started
+    total = time.time_ns() - started
+    parse_ns = file.parse_ns if file else 0
+    aggregate_ns = file.aggregate_ns if file else 0
+    body_end = started + max(total - parse_ns - aggregate_ns, 0)
+    record("upload.read_body", started, body_end, **{"upload.bytes": file.size if file else 0})
+    if file:
+        record("upload.read_csv", body_end, body_end + parse_ns)
+        record("upload.aggregate", body_end + parse_ns, body_end + parse_ns + aggregate_ns, **{"upload.rows": file.rows})
+
 
 @api_view(["POST"])
 @permission_classes([IsAuthenticated]) # Only authenticated users can upload files and JWT is used 
+@parser_classes([CSVUploadParser]) # the CSV is aggregated while it's received, see api/ingest.py
+@traced("upload.web")
 def uploadWebFile(request):
     # Handle file upload logic here
-    file = request.FILES.get('file')
+    started = time.time_ns()
+    file = request.FILES.get('file') # receives, parses and aggregates the CSV in one pass
+    trace_ingest(file, started)
     
-    print("Its Web Upload File Api , if in future u want to change anything related to web upload , change here ")
+    # Its Web Upload File Api , if in future u want to change anything related to web upload , change here 
     
     if not file:
         return Response({"error": "No file provided"}, status=400)
     
-    if not file.name.endswith(".csv"):
-        return Response({"error": "Only CSV files are supported"}, status=400)
-    
-    try:
-        df = pd.read_csv(file)
-    except Exception as e:
-        return Response({"error": f"Failed to read CSV file: {str(e)}"}, status=400)
-    
-    total_records = len(df)
-    if total_records == 0:
-        return Response({"error": "CSV file is empty"}, status=400)
+    # not a CSV, missing columns, unreadable, empty or too large
+    if file.error:
+        return Response({"error": file.error.message}, status=file.error.status)
     
-    avg_flowRate = df["Flowrate"].mean()
-    avg_pressure = df["Pressure"].mean()
-    avg_temperature = df["Temperature"].mean()
+    summary = file.summary
+    total_records = summary["total_rows"]
     
-    equipment_distribution = df["Type"].value_counts().to_dict()
-    
-    serializer = DatasetSerializer(data={
-        "name": file.name,
-        "total_rows": total_records,
-        "avg_usage_hours": avg_flowRate,
-        "avg_power": avg_pressure,
-        "equipment_distribution": equipment_distribution,
-    })
+    # the summary is keyed like the Dataset fields (row counts, per-column mean/min/max/count, types)
+    serializer = DatasetSerializer(data={"name": file.name, **summary})
     
     # raise exception=True will raise a 400 error if data is invalid
-    serializer.is_valid(raise_exception=True)
+    with span("upload.validate"):
+        serializer.is_valid(raise_exception=True)
+    
+    with span("upload.insert"):
+        dataset = serializer.save(uploaded_by=request.user, equipment=summary["equipment"])
+    logger.debug("%s uploaded %s (%d rows)", request.user, file.name, total_records)
     
-    serializer.save(uploaded_by=request.user)
+    # tell the user's other open clients about it
+    publish_dataset_created(dataset)
     
     # 201 because a resource is created
     # 200 is generic success 
@@ -53,45 +68,39 @@ def uploadWebFile(request):
 
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
+@parser_classes([CSVUploadParser])
+@traced("upload.desktop")
 def uploadDesktopFile(request):
     # Handle file upload logic here
-    file = request.FILES.get('file')
+    started = time.time_ns()
+    file = request.FILES.get('file') # receives, parses and aggregates the CSV in one pass
+    trace_ingest(file, started)
     
-    print("Its Desktop Upload File Api , if in future u want to change anything related to Desktop upload , change here ")
+    # Its Desktop Upload File Api , if in future u want to change anything related to Desktop upload , change here 
     
     if not file:
         return Response({"error": "No file provided"}, status=400)
     
-    if not file.name.endswith(".csv"):
-        return Response({"error": "Only CSV files are supported"}, status=400)
-    
-    try:
-        df = pd.read_csv(file)
-    except Exception as e:
-        return Response({"error": f"Failed to read CSV file: {str(e)}"}, status=400)
+    # not a CSV, missing columns, unreadable, empty or too large
+    if file.error:
+        return Response({"error": file.error.message}, status=file.error.status)
     
-    total_records = len(df)
-    if total_records == 0:
-        return Response({"error": "CSV file is empty"}, status=400)
+    summary = file.summary
+    total_records = summary["total_rows"]
     
-    avg_flowRate = df["Flowrate"].mean()
-    avg_pressure = df["Pressure"].mean()
-    avg_temperature = df["Temperature"].mean()
-    
-    equipment_distribution = df["Type"].value_counts().to_dict()
-    
-    serializer = DatasetSerializer(data={
-        "name": file.name,
-        "total_rows": total_records,
-        "avg_usage_hours": avg_flowRate,
-        "avg_power": avg_pressure,
-        "equipment_distribution": equipment_distribution,
-    })
+    # the summary is keyed like the Dataset fields (row counts, per-column mean/min/max/count, types)
+    serializer = DatasetSerializer(data={"name": file.name, **summary})
     
     # raise exception=True will raise a 400 error if data is invalid
-    serializer.is_valid(raise_exception=True)
+    with span("upload.validate"):
+        serializer.is_valid(raise_exception=True)
+    
+    with span("upload.insert"):
+        dataset = serializer.save(uploaded_by=request.user, equipment=summary["equipment"])
+    logger.debug("%s uploaded %s (%d rows)", request.user, file.name, total_records)
     
-    serializer.save(uploaded_by=request.user)
+    # tell the user's other open clients about it
+    publish_dataset_created(dataset)
     
     # 201 because a resource is created
     # 200 is generic success 
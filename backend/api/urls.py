@@ -1,6 +1,7 @@
 from django.urls import path
-from .views import testHome , signUp, historyList
+from .views import testHome , signUp, historyList, exportHistory, profileList, profileDownload
 from .upload_views import uploadWebFile, uploadDesktopFile
+from .analytics_views import typeTotals, typeDatasets, equipmentHistory, monthlyRollups, readingRange
 
 urlpatterns = [
     path('', testHome),
@@ -8,4 +9,12 @@ urlpatterns = [
     path('desktop/upload', uploadDesktopFile), # POST
     path("signup/", signUp),
     path("get-history/", historyList),
+    path("export-history/", exportHistory), # streaming NDJSON / CSV
+    path("analytics/types/", typeTotals), # per type: uploads containing it, total count
+    path("analytics/types/<str:type_name>/", typeDatasets), # uploads containing this type
+    path("analytics/monthly/", monthlyRollups), # compacted history, per month
+    path("equipment/<str:name>/", equipmentHistory), # one equipment's readings across uploads
+    path("readings/", readingRange), # readings of a time range, live and archived
+    path("admin/profiles/", profileList), # staff: profiles saved by X-Profile requests
+    path("admin/profiles/<str:name>", profileDownload),
 ]
\ No newline at end of file
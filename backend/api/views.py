@@ -1,11 +1,20 @@
 # from django.shortcuts import render
+from django.db import IntegrityError, transaction
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils.dateparse import parse_datetime
 from rest_framework.response import Response
 from rest_framework.decorators import api_view
-from rest_framework.permissions import IsAuthenticated, AllowAny
-from rest_framework.decorators import permission_classes
+from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
+from rest_framework.decorators import permission_classes, renderer_classes, throttle_classes
 from django.contrib.auth.models import User
-from rest_framework_simplejwt.tokens import RefreshToken, AccessToken
-from .serializers import DatasetSerializer 
+from . import hashers
+from .auth_serializer import CustomTokenObtainPairSerializer
+from .serializers import parse_fields, only_fields, serialize_datasets
+from .renderers import LIST_RENDERER_CLASSES, EXPORT_RENDERER_CLASSES
+from .exports import iter_dataset_chunks, ndjson_lines, csv_lines
+from .conditional import upload_version, make_etag, not_modified, add_etag
+from .throttling import SignupIPThrottle
+from .profiling import list_profiles, profile_path
 from .models import Dataset
 
 # Create your views here.
@@ -19,6 +28,7 @@ def testHome(request):
 
 @api_view(["POST"])
 @permission_classes([AllowAny])
+@throttle_classes([SignupIPThrottle])
 def signUp(request):
     
     username = request.data.get("username")
@@ -27,14 +37,17 @@ def signUp(request):
     if not username or not password:
         return Response({"error": "Username and password are required."}, status=400)
     
-    if User.objects.filter(username=username).exists():
+    # No exists() check first: the unique constraint on username decides, in one
+    # round trip and without a race between two signups for the same name
+    try:
+        with hashers.reserved(), transaction.atomic():
+            user = User.objects.create_user(username=username, password=password)
+    except IntegrityError:
         return Response({"error": "Username already exists."}, status=400)
     
-    user = User.objects.create_user(username=username, password=password)
-    user.save()
-    
-    refresh = RefreshToken.for_user(user)
-    access = AccessToken.for_user(user)
+    # same claims as a login, so the tokens work with CachedJWTAuthentication
+    refresh = CustomTokenObtainPairSerializer.get_token(user)
+    access = refresh.access_token
     
     return Response({
         "access": str(access),
@@ -47,10 +60,10 @@ def signUp(request):
     
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
+@renderer_classes(LIST_RENDERER_CLASSES)
 def historyList(request):
     
     user = request.user 
-    print("Authenticated user:", user.username)
     
     # get limit and offset from query params
     limit = request.GET.get("limit")
@@ -70,25 +83,102 @@ def historyList(request):
     except Exception as e:  
         return Response({"error": "Invalid query parameters."}, status=400)
     
+    # ?fields=name,total_rows -> only those columns are read and returned
+    try:
+        fields = parse_fields(request.GET.get("fields"))
+    except ValueError as e:
+        return Response({"error": str(e)}, status=400)
+    
+    # ?since=<uploaded_at> -> only datasets uploaded after it (incremental sync)
+    since = request.GET.get("since")
+    if since:
+        since = parse_datetime(since)
+        if since is None:
+            return Response({"error": "Invalid query parameters."}, status=400)
+    
+    # Nothing new uploaded since the client's copy -> 304 without touching the rows
+    latest_id, count = upload_version(user)
+    etag = make_etag(request, (latest_id, count))
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+    
     # Lazy queryset (means it doesn't hit the database until evaluated)
-    # serialize the paginated queryset (DB doesnt get hit here)
     qs = (Dataset.objects.filter(uploaded_by=user).order_by("-uploaded_at"))
+    if since:
+        qs = qs.filter(uploaded_at__gt=since)
+        count = qs.count()
     
-    # apply pagination 
-    # serialize the paginated queryset (DB doesnt get hit here)
-    pagination_qs = qs[offset:offset+limit]
+    # push the field selection down to the SELECT
+    pagination_qs = qs.only(*only_fields(fields))
     
-    # serialize the paginated queryset (DB doesnt get hit here)
-    serializer = DatasetSerializer(pagination_qs, many=True)
+    # username comes from the same query (JOIN) instead of one User query per row
+    if "uploaded_by" in fields:
+        pagination_qs = pagination_qs.select_related("uploaded_by")
     
-    # 
-    print("Serialized data:", serializer.data) 
+    # apply pagination 
+    pagination_qs = pagination_qs[offset:offset+limit]
     
     # return response with count, limit, offset and serialized results
-    return Response({
-        "count": qs.count(),
+    # (without ?since count comes from upload_version above, no separate COUNT query)
+    return add_etag(Response({
+        "count": count,
         "limit": limit,
         "offset": offset,
-        "results": serializer.data, # here actually db is hit to fetch the data
+        "results": serialize_datasets(pagination_qs, fields), # here actually db is hit to fetch the data
+    }), etag)
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+@renderer_classes(EXPORT_RENDERER_CLASSES)
+def exportHistory(request):
+    
+    # Streams the whole upload history (oldest first) as NDJSON or CSV (?format=csv)
+    # Rows are fetched in chunks while the response is being sent, so memory
+    # doesn't grow with the size of the history.
+    try:
+        fields = parse_fields(request.GET.get("fields"))
+    except ValueError as e:
+        return Response({"error": str(e)}, status=400)
+    
+    etag = make_etag(request, upload_version(request.user))
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+    
+    chunks = iter_dataset_chunks(request.user, fields)
+    
+    export_format = request.accepted_renderer.format
+    if export_format == "csv":
+        body = csv_lines(chunks, fields)
+    else:
+        body = ndjson_lines(chunks)
+    
+    response = StreamingHttpResponse(body, content_type=request.accepted_renderer.media_type)
+    response["Content-Disposition"] = f'attachment; filename="history.{export_format}"'
+    return add_etag(response, etag)
+
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser]) # staff only; /api/admin/ always loads the user from the database
+def profileList(request):
+    
+    # Profiles saved by ProfilingMiddleware, newest first
+    profiles = sorted(list_profiles(), key=lambda path: path.stat().st_mtime, reverse=True)
+    return Response({
+        "results": [
+            {"name": path.name, "size": path.stat().st_size, "url": f"/api/admin/profiles/{path.name}"}
+            for path in profiles
+        ],
     })
-    
\ No newline at end of file
+
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def profileDownload(request, name):
+    
+    path = profile_path(name)
+    if path is None:
+        return Response({"error": "Profile not found."}, status=404)
+    return FileResponse(open(path, "rb"), as_attachment=True, filename=name)
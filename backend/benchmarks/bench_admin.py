@@ -0,0 +1,101 @@
+"""Dataset admin changelist at scale: queries and time per page view.
+
+    python -m benchmarks.bench_admin [--datasets 1M] [--users 2000] [--repeat 3]
+
+--datasets uploads (benchmarks.common.make_datasets) spread over --users
+users. The changelist is requested through the test client as a superuser,
+from api.admin.DatasetAdmin (/admin/) and from a copy of the DatasetAdmin it
+replaced (/before/: a sidebar link per user, icontains search, full COUNTs),
+registered on a second admin site. Per view: SQL queries and best time.
+"""
+
+import argparse
+import time
+from datetime import timedelta
+
+from benchmarks.common import make_datasets, make_user, setup_django
+from benchmarks.datagen import parse_rows
+
+urlpatterns = []  # filled in by main(), used as ROOT_URLCONF
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--datasets", default="1M", help="e.g. 100K, 1M")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.conf import settings
+    from django.contrib import admin
+    from django.contrib.auth.models import User
+    from django.db import connection, reset_queries
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext
+    from django.urls import clear_url_caches, path
+    from django.utils import timezone
+
+    from api.models import Dataset
+
+    class BeforeDatasetAdmin(admin.ModelAdmin):
+        list_display = ("name", "uploaded_by", "id", "uploaded_at", "total_rows")
+        list_filter = ("uploaded_by", "uploaded_at")
+        search_fields = ("name",)
+
+    before = admin.AdminSite(name="before")
+    before.register(Dataset, BeforeDatasetAdmin)
+    urlpatterns[:] = [path("admin/", admin.site.urls), path("before/", before.urls)]
+    settings.ROOT_URLCONF = __name__
+    clear_url_caches()
+
+    count = parse_rows(args.datasets)
+    owner = make_user()
+    make_datasets(owner, count)
+    User.objects.bulk_create([User(username=f"operator-{i:05d}") for i in range(args.users - 1)])
+    first = User.objects.order_by("id").values_list("id", flat=True).first()
+    with connection.cursor() as cursor:
+        cursor.execute("UPDATE api_dataset SET uploaded_by_id = %s + id %% %s", [first, args.users])
+    some_user = User.objects.order_by("id").values_list("id", flat=True)[args.users // 2]
+
+    client = Client()
+    client.force_login(User.objects.create_superuser("bench-admin", password="x"))
+
+    views = (
+        ("changelist", ""),
+        ("middle page", f"?p={count // 200}"),
+        ("one user", f"?uploaded_by__id__exact={some_user}"),
+        ("past 7 days", "?uploaded_at__gte={week:%Y-%m-%d+%H:%M:%S%%2B00:00}"),
+        ("search name", "?q=shift_00123"),
+        ("one user + search", f"?uploaded_by__id__exact={some_user}&q=shift_00123"),
+    )
+    week = timezone.localtime() - timedelta(days=7)
+
+    def get(url):
+        response = client.get(url)
+        assert response.status_code == 200, (url, response.status_code)
+        return response
+
+    print(f"{count:,} datasets, {args.users:,} users, best of {args.repeat}")
+    print(f"{'view':18} {'before: queries':>15} {'ms':>9} {'after: queries':>15} {'ms':>8}")
+    for label, query in views:
+        query = query.format(week=week)
+        row = [f"{label:18}"]
+        for prefix in ("before", "admin"):
+            url = f"/{prefix}/api/dataset/{query}"
+            reset_queries()  # DEBUG is on: the log is full from the setup, so it wouldn't grow
+            with CaptureQueriesContext(connection) as queries:
+                get(url)
+            best = float("inf")
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                get(url)
+                best = min(best, time.perf_counter() - start)
+            row.append(f"{len(queries):15} {best * 1000:9.1f}" if prefix == "before" else
+                       f"{len(queries):15} {best * 1000:8.1f}")
+        print(" ".join(row))
+
+
+if __name__ == "__main__":
+    main()
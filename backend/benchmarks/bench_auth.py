@@ -0,0 +1,67 @@
+"""Authentication overhead per request: JWTAuthentication vs CachedJWTAuthentication.
+
+    python -m benchmarks.bench_auth [--requests 5000]
+
+Times authenticate() alone, then a whole get-history/ request (one page,
+answered with a 304 so the view itself does as little as possible), with
+each authentication class. SQLite in memory makes the user lookup about as
+cheap as it gets; against a networked database the saved query is worth a
+full round trip more.
+"""
+
+import argparse
+import time
+from unittest import mock
+
+from benchmarks.common import make_datasets, make_user, setup_django
+
+
+def per_request(fn, requests):
+    start = time.perf_counter()
+    for _ in range(requests):
+        fn()
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.db import connection
+    from django.test import RequestFactory
+    from django.test.utils import CaptureQueriesContext
+    from rest_framework.test import APIClient
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+
+    from api.auth_serializer import CustomTokenObtainPairSerializer
+    from api.authentication import CachedJWTAuthentication
+    from api.views import historyList
+
+    user = make_user()
+    make_datasets(user, 10)
+    token = str(CustomTokenObtainPairSerializer.get_token(user).access_token)
+    request = RequestFactory().get("/api/get-history/", HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    client = APIClient()
+    auth = {"HTTP_AUTHORIZATION": f"Bearer {token}"}
+    etag = client.get("/api/get-history/", **auth)["ETag"]
+
+    print(f"{args.requests:,} requests")
+    print(f"{'':26} {'authenticate()':>16} {'304 request':>14} {'queries':>8}")
+    for auth_class in (JWTAuthentication, CachedJWTAuthentication):
+        authenticate_us = per_request(lambda: auth_class().authenticate(request), args.requests)
+        with mock.patch.object(historyList.cls, "authentication_classes", [auth_class]):
+            with CaptureQueriesContext(connection) as queries:
+                client.get("/api/get-history/", HTTP_IF_NONE_MATCH=etag, **auth)
+            query_count = len(queries)  # read now, the query log is a ring buffer
+            request_us = per_request(
+                lambda: client.get("/api/get-history/", HTTP_IF_NONE_MATCH=etag, **auth), args.requests
+            )
+        print(f"{auth_class.__name__:26} {authenticate_us:13.1f} us {request_us:11.1f} us {query_count:8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Backfilling history: the bulk importer vs one upload at a time.
+
+    python -m benchmarks.bench_bulk_import [--files 2000] [--rows 200] [--workers 0,1,4]
+
+--files generated shift CSVs (benchmarks.datagen) of --rows rows each,
+written to a temporary directory and a .tar.gz of it. Each is imported for a
+new user:
+  one by one   CSVAggregator and DatasetSerializer.save per file, what
+               desktop/upload does for each request (without the HTTP part)
+  import       api.bulk_import.run (manage.py import_csv_archive) with
+               --workers parsing processes (0: in this process), from the
+               directory and from the tarball
+"""
+
+import argparse
+import os
+import tarfile
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.common import make_user, setup_django
+from benchmarks.datagen import csv_bytes, parse_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", default="2000", help="e.g. 500, 2K")
+    parser.add_argument("--rows", default="200", help="rows per file")
+    parser.add_argument("--workers", default=",".join(str(n) for n in sorted({0, 1, os.cpu_count()})))
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from api import bulk_import
+    from api.serializers import DatasetSerializer
+
+    files, rows = parse_rows(args.files), parse_rows(args.rows)
+    root = Path(tempfile.mkdtemp(prefix="bench-import-"))
+    source = root / "shifts"
+    for index in range(files):
+        path = source / f"{index // 100:03d}" / f"shift_{index:06d}.csv"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(csv_bytes(rows, seed=index))
+    tarball = root / "shifts.tar.gz"
+    with tarfile.open(tarball, "w:gz") as tar:
+        tar.add(source, arcname="shifts")
+
+    print(f"{files:,} files of {rows:,} rows, {tarball.stat().st_size / 1e6:.1f} MB as .tar.gz, "
+          f"{os.cpu_count()} CPUs")
+    print(f"{'how':26} {'seconds':>8} {'files/s':>9} {'rows/s':>10}")
+
+    def report(label, seconds):
+        print(f"{label:26} {seconds:8.2f} {files / seconds:9,.0f} {files * rows / seconds:10,.0f}")
+
+    users = iter(range(1000))
+
+    user = make_user(f"import-{next(users)}")
+    start = time.perf_counter()
+    for path in sorted(source.rglob("*.csv")):
+        _, _, summary, _ = bulk_import.summarize((path.name, 0, str(path)))
+        serializer = DatasetSerializer(data={"name": path.name, **summary})
+        serializer.is_valid(raise_exception=True)
+        serializer.save(uploaded_by=user, equipment=summary["equipment"])
+    report("one by one", time.perf_counter() - start)
+
+    for workers in (int(value) for value in args.workers.split(",")):
+        for label, path in (("directory", source), ("tar.gz", tarball)):
+            user = make_user(f"import-{next(users)}")
+            stats = bulk_import.run(user, path, workers=workers, batch_size=args.batch_size)
+            assert stats.imported == files, stats
+            report(f"import {label}, {workers} workers", stats.seconds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Bandwidth and latency saved by ETags on repeated dashboard navigation.
+
+    python -m benchmarks.bench_conditional_get [--datasets 1000] [--navigations 50]
+
+One "navigation" is what the desktop dashboard does when it is opened:
+the first history page (limit=10) plus the analytics fetch (limit=1000).
+Runs it with and without If-None-Match while nothing new is uploaded.
+"""
+
+import argparse
+import time
+
+from benchmarks.common import make_datasets, make_user, setup_django
+
+NAVIGATION = ({"limit": 10, "offset": 0}, {"limit": 1000, "offset": 0})
+
+
+def navigate(client, navigations, conditional):
+    etags = {}
+    sent = 0
+    start = time.perf_counter()
+    for _ in range(navigations):
+        for params in NAVIGATION:
+            key = tuple(params.items())
+            headers = {"HTTP_IF_NONE_MATCH": etags[key]} if conditional and key in etags else {}
+            response = client.get("/api/get-history/", params, **headers)
+            etags[key] = response["ETag"]
+            sent += len(response.content)
+    return time.perf_counter() - start, sent
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--datasets", type=int, default=1000)
+    parser.add_argument("--navigations", type=int, default=50)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from rest_framework.test import APIClient
+
+    user = make_user()
+    make_datasets(user, args.datasets)
+    client = APIClient()
+    client.force_authenticate(user)
+
+    print(f"{args.navigations} navigations, {args.datasets} datasets")
+    print(f"{'mode':16} {'ms/navigation':>14} {'bytes/navigation':>18}")
+    for mode, conditional in (("plain", False), ("If-None-Match", True)):
+        seconds, sent = navigate(client, args.navigations, conditional)
+        print(f"{mode:16} {seconds / args.navigations * 1000:14.2f} {sent // args.navigations:18,}")
+
+
+if __name__ == "__main__":
+    main()
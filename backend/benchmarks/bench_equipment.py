@@ -0,0 +1,83 @@
+"""Ingest overhead of per-equipment readings and name interning.
+
+    python -m benchmarks.bench_equipment [--names 100K] [--repeat 3]
+
+A generated CSV (benchmarks.datagen) with --names rows, every one a
+different Equipment Name, as the worst case for interning. Times, separately:
+  parse      CSVAggregator over the file, without and with the name column
+             (the per-equipment group-by)
+  store      DatasetSerializer.save for one upload: without names (the
+             dataset and its type counts), names all new (bulk INSERT of the
+             Equipment rows), names known but not cached in this process
+             (SELECTs), names cached (no equipment queries), all with
+             EQUIPMENT_READINGS on (a reading per row), and names cached
+             with it off
+"""
+
+import argparse
+
+from benchmarks.common import make_user, setup_django, timed
+from benchmarks.datagen import csv_bytes, parse_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--names", default="100K", help="e.g. 10K, 100K")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.conf import settings
+
+    from api.equipment import clear_equipment_cache
+    from api.ingest import CSVAggregator
+    from api.serializers import DatasetSerializer
+
+    settings.EQUIPMENT_READINGS = True
+    rows = parse_rows(args.names)
+    content = csv_bytes(rows)
+    # the same file without the Equipment Name column
+    unnamed = b"\n".join(line.split(b",", 1)[1] for line in content.split(b"\n") if line) + b"\n"
+
+    def parse(body):
+        aggregator = CSVAggregator()
+        for start in range(0, len(body), 64 * 1024):
+            aggregator.feed(body[start:start + 64 * 1024])
+        return aggregator.finish()
+
+    print(f"{rows:,} rows, {rows:,} distinct names, best of {args.repeat}")
+    print(f"{'step':32} {'seconds':>9} {'µs/row':>8}")
+
+    def report(label, seconds):
+        print(f"{label:32} {seconds:9.3f} {seconds / rows * 1e6:8.2f}")
+
+    for label, body in (("parse without names", unnamed), ("parse with names", content)):
+        seconds, summary = timed(lambda: parse(body), args.repeat)
+        report(label, seconds)
+
+    users = iter(range(args.repeat + 1))
+
+    def store(equipment, user=make_user()):
+        serializer = DatasetSerializer(data={"name": "shift.csv", **summary})
+        serializer.is_valid(raise_exception=True)
+        return serializer.save(uploaded_by=user, equipment=equipment)
+
+    report("store without names", timed(lambda: store(()), args.repeat)[0])
+    # a new user each time, so every name is new
+    report("store, names new", timed(
+        lambda: store(summary["equipment"], make_user(f"new-{next(users)}")), args.repeat,
+    )[0])
+
+    def store_uncached():
+        clear_equipment_cache()
+        return store(summary["equipment"])
+
+    report("store, names known (uncached)", timed(store_uncached, args.repeat)[0])
+    report("store, names cached", timed(lambda: store(summary["equipment"]), args.repeat)[0])
+    settings.EQUIPMENT_READINGS = False
+    report("store, names cached, no readings", timed(lambda: store(summary["equipment"]), args.repeat)[0])
+
+
+if __name__ == "__main__":
+    main()
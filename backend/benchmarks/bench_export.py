@@ -0,0 +1,59 @@
+"""Time and peak memory of streaming the full history export.
+
+    python -m benchmarks.bench_export [--datasets 1000000] [--format ndjson|csv]
+
+Memory is the tracemalloc peak while the response is consumed, so it covers
+the view, the chunked queries and the encoder but not the test database
+itself. It should stay flat as --datasets grows.
+"""
+
+import argparse
+import time
+import tracemalloc
+
+from benchmarks.common import make_datasets, make_user, setup_django
+
+
+def consume(client, export_format):
+    response = client.get("/api/export-history/", {"format": export_format})
+    size = 0
+    for chunk in response.streaming_content:
+        size += len(chunk)
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--datasets", type=int, default=1_000_000)
+    parser.add_argument("--format", default="ndjson", choices=("ndjson", "csv"))
+    args = parser.parse_args()
+
+    setup_django()
+
+    from rest_framework.test import APIClient
+
+    user = make_user()
+    print(f"creating {args.datasets:,} datasets ...")
+    make_datasets(user, args.datasets)
+
+    client = APIClient()
+    client.force_authenticate(user)
+
+    start = time.perf_counter()
+    size = consume(client, args.format)
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    consume(client, args.format)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"format:        {args.format}")
+    print(f"datasets:      {args.datasets:,}")
+    print(f"bytes:         {size:,}")
+    print(f"time:          {seconds:.2f} s ({args.datasets / seconds:,.0f} rows/s)")
+    print(f"peak memory:   {peak / 1024 / 1024:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Memory per idle live-update connection and event fan-out time.
+
+    python -m benchmarks.bench_live_updates [--connections 5000] [--users 100] [--transport sse|websocket]
+
+Opens --connections idle subscribers spread over --users users against the
+ASGI app in core/asgi.py, in process (no sockets, so the ASGI server's own
+per-connection buffers are not included), and measures with tracemalloc
+the memory they hold. Then publishes one event per user from a worker
+thread, as an upload view would, and times until every client got it.
+Connect time includes tracemalloc overhead.
+"""
+
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+from benchmarks.common import setup_django
+
+
+class FakeClient:
+    # Just enough of an ASGI server connection: an input queue and a counter
+    def __init__(self, transport, delivered):
+        self.transport = transport
+        self.delivered = delivered
+        self.inbox = asyncio.Queue()
+        self.received = 0
+
+    async def receive(self):
+        return await self.inbox.get()
+
+    async def send(self, message):
+        if message["type"] == "websocket.send" or message.get("body", b"").startswith(b"data:"):
+            self.received += 1
+            self.delivered()
+
+    def connect_message(self):
+        return {"type": "websocket.connect"} if self.transport == "websocket" else {"type": "http.request", "body": b""}
+
+    def disconnect_message(self):
+        return {"type": "websocket.disconnect", "code": 1000} if self.transport == "websocket" else {"type": "http.disconnect"}
+
+
+def scope_for(transport, token):
+    from api import live
+
+    if transport == "websocket":
+        scope = {"type": "websocket", "path": live.WEBSOCKET_PATH}
+    else:
+        scope = {"type": "http", "method": "GET", "path": live.EVENTS_PATH}
+    scope.update({"headers": [(b"authorization", f"Bearer {token}".encode())], "query_string": b""})
+    return scope
+
+
+async def run(args, tokens):
+    from api import live
+    from core.asgi import application
+
+    loop = asyncio.get_running_loop()
+    pending = {"count": 0}
+    done = asyncio.Event()
+
+    def delivered():
+        pending["count"] -= 1
+        if pending["count"] == 0:
+            done.set()
+
+    clients = []
+    tasks = []
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    for i in range(args.connections):
+        client = FakeClient(args.transport, delivered)
+        client.inbox.put_nowait(client.connect_message())
+        clients.append(client)
+        scope = scope_for(args.transport, tokens[i % len(tokens)])
+        tasks.append(asyncio.ensure_future(application(scope, client.receive, client.send)))
+    while live.broker.subscriber_count() < args.connections:
+        await asyncio.sleep(0.01)
+    connect_time = time.perf_counter() - start
+    await asyncio.sleep(0.1)
+    during = tracemalloc.get_traced_memory()[0]
+    # tracing slows everything down, time the fan-out without it
+    tracemalloc.stop()
+
+    # one upload per user, published from a thread like the upload views do
+    pending["count"] = args.connections
+    payload = '{"type":"dataset.created","dataset":{"id":1,"name":"shift.csv"}}'
+    start = time.perf_counter()
+    for user_id in range(1, len(tokens) + 1):
+        await loop.run_in_executor(None, live.broker.publish, user_id, payload)
+    await done.wait()
+    fanout_time = time.perf_counter() - start
+
+    for client in clients:
+        client.inbox.put_nowait(client.disconnect_message())
+    await asyncio.gather(*tasks)
+
+    return {
+        "connect": connect_time,
+        "per_connection": (during - before) / args.connections,
+        "fanout": fanout_time,
+        "left": live.broker.subscriber_count(),
+        "received": sum(client.received for client in clients),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--connections", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--transport", choices=("sse", "websocket"), default="sse")
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.contrib.auth.models import User
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    tokens = [str(AccessToken.for_user(User(pk=pk, username=f"user-{pk}"))) for pk in range(1, args.users + 1)]
+    result = asyncio.run(run(args, tokens))
+
+    print(f"{args.connections:,} idle {args.transport} connections, {args.users} users")
+    print(f"connect all:       {result['connect'] * 1000:8.1f} ms")
+    print(f"memory/connection: {result['per_connection'] / 1024:8.2f} KiB")
+    print(f"fan-out:           {result['fanout'] * 1000:8.1f} ms for {result['received']:,} events")
+    print(f"after disconnect:  {result['left']} subscribers left")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Login throughput and latency under a burst, with and without the bounded hashing pool.
+
+    python -m benchmarks.bench_login [--logins 64] [--concurrency 32] [--iterations 1000000]
+
+Fires --logins token requests from --concurrency threads at once while
+another thread keeps polling get-history/, once hashing on every request
+thread (what Django's stock hasher does) and once through the bounded pool
+from api/hashers.py. Throttles are relaxed so every login is hashed.
+
+Hashing releases the GIL, so with more request threads than cores the
+unbounded run takes the CPU away from everything else; history/s is how much
+other work got done during the burst.
+"""
+
+import argparse
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from benchmarks.common import make_datasets, make_user, setup_django
+
+USERS = 16
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def burst(args, token):
+    from rest_framework.test import APIClient
+
+    def login(i):
+        start = time.perf_counter()
+        response = APIClient().post(
+            "/api/app1/token/", {"username": f"user-{i % USERS}", "password": "secret-pass-1"}, format="json"
+        )
+        return response.status_code, time.perf_counter() - start
+
+    polling = []
+    done = threading.Event()
+
+    def poll():
+        client = APIClient()
+        while not done.is_set():
+            start = time.perf_counter()
+            client.get("/api/get-history/", HTTP_AUTHORIZATION=f"Bearer {token}")
+            polling.append(time.perf_counter() - start)
+
+    poller = threading.Thread(target=poll)
+    poller.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as pool:
+        results = list(pool.map(login, range(args.logins)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    poller.join()
+
+    latencies = [seconds for status, seconds in results if status == 200]
+    return {
+        "ok": len(latencies),
+        "busy": sum(1 for status, _ in results if status == 503),
+        "throughput": len(latencies) / elapsed,
+        "p50": statistics.median(latencies) if latencies else 0,
+        "p99": percentile(latencies, 0.99) if latencies else 0,
+        "poll_p50": statistics.median(polling),
+        "poll_p99": percentile(polling, 0.99),
+        "polls": len(polling),
+        "elapsed": elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--iterations", type=int, default=None, help="PBKDF2 iterations (default: settings)")
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.contrib.auth.models import User
+    from django.test.utils import override_settings
+
+    from api import hashers
+    from api.auth_serializer import CustomTokenObtainPairSerializer
+
+    iterations = args.iterations or hashers.PooledPBKDF2PasswordHasher.iterations
+    relaxed = {scope: {"capacity": 10 ** 6, "refill": 10 ** 6} for scope in ("login_ip", "login_user", "signup_ip")}
+
+    with mock.patch.object(hashers.PooledPBKDF2PasswordHasher, "iterations", iterations), \
+            override_settings(THROTTLE_BUCKETS=relaxed):
+        for i in range(USERS):
+            User.objects.create_user(username=f"user-{i}", password="secret-pass-1")
+        poller_user = make_user()
+        make_datasets(poller_user, 10)
+        token = str(CustomTokenObtainPairSerializer.get_token(poller_user).access_token)
+
+        print(f"{args.logins} logins from {args.concurrency} threads, PBKDF2 {iterations:,} iterations, "
+              f"pool of {hashers.WORKERS} (+{hashers.MAX_WAITING} waiting)")
+        print(f"{'':10} {'logins/s':>9} {'p50':>8} {'p99':>8} {'503s':>5} {'history p50':>12} {'history p99':>12} {'history/s':>10}")
+        modes = (
+            ("unbounded", mock.patch.object(hashers, "run_bounded", lambda fn, *a: fn(*a))),
+            ("pooled", mock.patch.object(hashers, "run_bounded", hashers.run_bounded)),
+        )
+        for name, patch in modes:
+            with patch:
+                r = burst(args, token)
+            print(f"{name:10} {r['throughput']:9.1f} {r['p50'] * 1000:6.0f}ms {r['p99'] * 1000:6.0f}ms "
+                  f"{r['busy']:5} {r['poll_p50'] * 1000:10.1f}ms {r['poll_p99'] * 1000:10.1f}ms {r['polls'] / r['elapsed']:10.1f}")
+
+
+if __name__ == "__main__":
+    main()
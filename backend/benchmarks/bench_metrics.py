@@ -0,0 +1,63 @@
+"""Per-request cost of MetricsMiddleware, enabled vs disabled.
+
+    python -m benchmarks.bench_metrics [--requests 5000]
+
+Times the middleware wrapped around a view that does nothing (pure overhead),
+then whole requests through the test client: the home page (no queries) and
+a get-history/ page (two queries, each going through the query timer).
+"""
+
+import argparse
+import time
+
+from benchmarks.common import make_datasets, make_user, setup_django
+
+
+def per_request(fn, requests):
+    fn()  # warm up: first request resolves URLs, loads middleware
+    start = time.perf_counter()
+    for _ in range(requests):
+        fn()
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.http import HttpResponse
+    from django.test import RequestFactory
+    from django.test.utils import override_settings
+    from django.urls import resolve
+    from rest_framework.test import APIClient
+
+    from api import metrics
+    from api.middleware import MetricsMiddleware
+
+    user = make_user()
+    make_datasets(user, 10)
+
+    request = RequestFactory().get("/api/get-history/")
+    request.resolver_match = resolve("/api/get-history/")
+    response = HttpResponse(b"x" * 1000)
+    middleware = MetricsMiddleware(lambda request: response)
+
+    print(f"{args.requests:,} requests")
+    print(f"{'':12} {'middleware only':>16} {'home':>11} {'get-history':>12}")
+    for enabled in (False, True):
+        metrics.reset()
+        with override_settings(METRICS_ENABLED=enabled):
+            client = APIClient()  # builds its middleware chain with the current settings
+            client.force_authenticate(user)
+            bare = f"{per_request(lambda: middleware(request), args.requests):.2f} us" if enabled else "-"
+            home = per_request(lambda: client.get("/api/"), args.requests)
+            history = per_request(lambda: client.get("/api/get-history/"), args.requests)
+        label = "enabled" if enabled else "disabled"
+        print(f"{label:12} {bare:>16} {home:8.1f} us {history:9.1f} us")
+
+
+if __name__ == "__main__":
+    main()
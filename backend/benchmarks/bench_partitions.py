@@ -0,0 +1,99 @@
+"""Range queries over readings: partition pruning vs reading the whole archive.
+
+    python -m benchmarks.bench_partitions [--datasets 100K] [--years 4] [--readings 10]
+
+One user with --datasets uploads (benchmarks.common.make_datasets) spread
+evenly over the last --years, --readings equipment readings each, compacted
+to the last 30 days with api.retention.compact, so everything older is in
+the archive (ARCHIVE_DIR/user_<id>/<YYYY-MM>/*.npz, a temporary directory).
+Each range is queried with api.partitions.query_readings, which opens only
+the files ReadingPartition says overlap it, and by reading every file of
+the user the way it'd have to be done without the index. "page s" is
+query_readings for the first page of 50 (what /api/readings/ returns).
+"""
+
+import argparse
+import random
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+
+from benchmarks.common import make_datasets, make_user, setup_django, timed
+from benchmarks.datagen import parse_rows
+
+EQUIPMENT = 50
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--datasets", default="100K", help="e.g. 10K, 100K")
+    parser.add_argument("--years", type=float, default=4)
+    parser.add_argument("--readings", type=int, default=10, help="per dataset")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.conf import settings
+    from django.db import connection
+    from django.utils import timezone
+
+    from api import partitions, retention
+    from api.models import Dataset, Equipment, EquipmentReading, ReadingPartition
+
+    settings.ARCHIVE_DIR = Path(tempfile.mkdtemp(prefix="bench-archive-"))
+    count = parse_rows(args.datasets)
+    user = make_user()
+    make_datasets(user, count)
+    minutes = args.years * 365 * 24 * 60 / count
+    with connection.cursor() as cursor:
+        # newest id now, oldest --years ago (the test database is SQLite)
+        cursor.execute(
+            "UPDATE api_dataset SET uploaded_at = datetime('now', printf('-%%d minutes', "
+            "((SELECT MAX(id) FROM api_dataset) - id) * %s))",
+            [minutes],
+        )
+    Equipment.objects.bulk_create([Equipment(owner=user, name=f"Pump-{i}", type="Pump") for i in range(EQUIPMENT)])
+    equipment = list(Equipment.objects.filter(owner=user).values_list("id", flat=True))
+    rng = random.Random(0)
+    EquipmentReading.objects.bulk_create((
+        EquipmentReading(
+            dataset_id=dataset_id, equipment_id=equipment_id, rows=rng.randint(1, 50),
+            flowrate=rng.uniform(50, 200), pressure=rng.uniform(3, 10), temperature=rng.uniform(80, 120),
+        )
+        for dataset_id in Dataset.objects.values_list("id", flat=True).iterator()
+        for equipment_id in rng.sample(equipment, args.readings)
+    ), batch_size=10000)
+    retention.compact(user.pk, 30)
+
+    files = list(ReadingPartition.objects.filter(user=user).values_list("path", flat=True))
+    archived = sum(ReadingPartition.objects.filter(user=user).values_list("readings", flat=True))
+    print(f"{count:,} datasets over {args.years:g} years, {EquipmentReading.objects.count():,} live readings, "
+          f"{archived:,} archived in {len(files)} files; best of {args.repeat}")
+
+    def scan_all(since, until):
+        readings = []
+        for path in files:
+            readings.extend(partitions.read_partition(path, since, until)[0])
+        return readings
+
+    now = timezone.now()
+    year_ago = now - timedelta(days=365)
+    ranges = (
+        ("last 7 days", now - timedelta(days=7), now),
+        ("7 days, a year ago", year_ago - timedelta(days=7), year_ago),
+        ("30 days, a year ago", year_ago - timedelta(days=30), year_ago),
+        (f"all {args.years:g} years", now - timedelta(days=365 * args.years + 1), now),
+    )
+    print(f"{'range':22} {'readings':>9} {'files read':>10} {'pruned':>7} {'pruned s':>9} {'all files s':>12} "
+          f"{'speedup':>8} {'page s':>7}")
+    for label, since, until in ranges:
+        pruned_seconds, (_, count, stats) = timed(lambda: partitions.query_readings(user, since, until), args.repeat)
+        full_seconds, _ = timed(lambda: scan_all(since, until), args.repeat)
+        page_seconds, _ = timed(lambda: partitions.query_readings(user, since, until, limit=50), args.repeat)
+        print(f"{label:22} {count:9,} {stats['scanned']:10} {stats['pruned']:7} "
+              f"{pruned_seconds:9.3f} {full_seconds:12.3f} {full_seconds / pruned_seconds:7.1f}x {page_seconds:7.3f}")
+
+
+if __name__ == "__main__":
+    main()
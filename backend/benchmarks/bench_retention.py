@@ -0,0 +1,76 @@
+"""Compacting expired history: throughput, batch length, and history after.
+
+    python -m benchmarks.bench_retention [--datasets 200K] [--years 4] [--keep-days 365]
+
+One user with --datasets uploads (benchmarks.common.make_datasets) spread
+evenly over the last --years, compacted with api.retention.compact to the
+last --keep-days, archive on. Reports:
+  history      first page of get-history/ and the user's count, before and after
+  compact      datasets per second and the average batch (one transaction,
+               the longest the tables are locked for) at a few batch sizes
+"""
+
+import argparse
+import tempfile
+from pathlib import Path
+
+from benchmarks.common import make_datasets, make_user, setup_django, timed
+from benchmarks.datagen import parse_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--datasets", default="200K", help="e.g. 50K, 200K")
+    parser.add_argument("--years", type=float, default=4)
+    parser.add_argument("--keep-days", type=int, default=365)
+    parser.add_argument("--batch-sizes", default="100,500,2000")
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.conf import settings
+    from django.db import connection
+
+    from api import retention
+    from api.models import Dataset, DatasetRollup
+    from api.serializers import serialize_datasets
+
+    count = parse_rows(args.datasets)
+    settings.ARCHIVE_DIR = Path(tempfile.mkdtemp(prefix="bench-archive-"))
+
+    def history(user):
+        page = Dataset.objects.filter(uploaded_by=user).select_related("uploaded_by").order_by("-uploaded_at")[:10]
+        return Dataset.objects.filter(uploaded_by=user).count(), serialize_datasets(page)
+
+    def populate(username):
+        user = make_user(username)
+        make_datasets(user, count)
+        # newest id now, oldest id --years ago (the test database is SQLite)
+        minutes = args.years * 365 * 24 * 60 / count
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "UPDATE api_dataset SET uploaded_at = datetime('now', printf('-%%d minutes', "
+                "((SELECT MAX(id) FROM api_dataset WHERE uploaded_by_id = %s) - id) * %s)) "
+                "WHERE uploaded_by_id = %s",
+                [user.pk, minutes, user.pk],
+            )
+        return user
+
+    print(f"{count:,} datasets over {args.years:g} years, keeping {args.keep_days} days")
+    print(f"{'batch size':>10} {'compacted':>10} {'seconds':>8} {'per s':>8} {'ms/batch':>9} "
+          f"{'history before':>15} {'after':>8}")
+    for batch_size in (int(size) for size in args.batch_sizes.split(",")):
+        user = populate(f"bench-{batch_size}")
+        before, _ = timed(lambda: history(user), 5)
+        seconds, done = timed(lambda: retention.compact(user.pk, args.keep_days, batch_size=batch_size), 1)
+        after, _ = timed(lambda: history(user), 5)
+        batches = -(-done // batch_size)
+        print(f"{batch_size:10} {done:10,} {seconds:8.2f} {done / seconds:8,.0f} {seconds / batches * 1000:9.1f} "
+              f"{before * 1000:12.1f} ms {after * 1000:5.1f} ms")
+
+    print(f"{DatasetRollup.objects.count()} rollups, archive in {settings.ARCHIVE_DIR}")
+    retention.analyze(vacuum=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Serialization throughput for 1000-row history pages.
+
+    python -m benchmarks.bench_serialization [--rows 1000] [--repeat 5]
+
+Compares DatasetSerializer against the fast list path, with and without a
+sparse ?fields= selection, and the optional orjson / MessagePack renderers.
+"""
+
+import argparse
+
+from benchmarks.common import make_datasets, make_user, setup_django, timed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from rest_framework.renderers import JSONRenderer
+
+    from api import renderers
+    from api.models import Dataset
+    from api.serializers import DatasetSerializer, only_fields, parse_fields, serialize_datasets
+
+    user = make_user()
+    make_datasets(user, args.rows)
+
+    qs = Dataset.objects.filter(uploaded_by=user).order_by("-uploaded_at")
+    # Load once so we time serialization, not the DB
+    page = list(qs.select_related("uploaded_by")[:args.rows])
+    compact = parse_fields("id,name,total_rows,uploaded_at")
+    compact_page = list(qs.only(*only_fields(compact))[:args.rows])
+
+    cases = {
+        "DatasetSerializer": lambda: DatasetSerializer(page, many=True).data,
+        "serialize_datasets": lambda: serialize_datasets(page),
+        "serialize_datasets ?fields=compact": lambda: serialize_datasets(compact_page, compact),
+    }
+
+    data = serialize_datasets(page)
+    encoders = {"JSONRenderer": JSONRenderer().render}
+    if renderers.orjson:
+        encoders["ORJSONRenderer"] = renderers.ORJSONRenderer().render
+    if renderers.msgpack:
+        encoders["MessagePackRenderer"] = renderers.MessagePackRenderer().render
+
+    print(f"{args.rows} rows per page, best of {args.repeat}")
+    print(f"{'case':40} {'ms/page':>10} {'rows/s':>12}")
+    for name, fn in cases.items():
+        seconds, _ = timed(fn, args.repeat)
+        print(f"{name:40} {seconds * 1000:10.2f} {args.rows / seconds:12,.0f}")
+
+    print(f"\n{'renderer':40} {'ms/page':>10} {'bytes':>12}")
+    for name, render in encoders.items():
+        seconds, body = timed(lambda: render(data), args.repeat)
+        print(f"{name:40} {seconds * 1000:10.2f} {len(body):12,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Equipment type queries across uploads: DatasetTypeCount vs decoding the JSON.
+
+    python -m benchmarks.bench_type_queries [--datasets 1M] [--repeat 3]
+
+One user with --datasets uploads (benchmarks.common.make_datasets). Each
+question is answered the way /api/analytics/types/ does it, with the ORM on
+DatasetTypeCount, and the way it had to be done before: read every
+equipment_distribution, decode it and add it up in Python.
+  totals       per type: uploads containing it and total count
+  contains     uploads with a HeatExchanger: how many, and the newest 20
+"""
+
+import argparse
+from collections import Counter
+
+from benchmarks.common import make_datasets, make_user, setup_django, timed
+from benchmarks.datagen import parse_rows
+
+TYPE = "HeatExchanger"
+PAGE = 20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--datasets", default="1M", help="e.g. 100K, 1M")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.db.models import Count, Sum
+
+    from api.models import Dataset, DatasetTypeCount
+
+    user = make_user()
+    count = parse_rows(args.datasets)
+    make_datasets(user, count)
+    datasets = Dataset.objects.filter(uploaded_by=user)
+    type_counts = DatasetTypeCount.objects.filter(uploaded_by=user)
+
+    def totals_json():
+        uploads, totals = Counter(), Counter()
+        for distribution in datasets.values_list("equipment_distribution", flat=True).iterator(chunk_size=10000):
+            uploads.update(distribution.keys())
+            totals.update(distribution)
+        return sorted(totals.items(), key=lambda item: (-item[1], item[0])), uploads
+
+    def totals_table():
+        return list(
+            type_counts.values("type").annotate(datasets=Count("id"), total=Sum("count")).order_by("-total", "type")
+        )
+
+    def contains_json():
+        rows = datasets.order_by("-id").values_list("id", "equipment_distribution")
+        matches = [dataset_id for dataset_id, distribution in rows.iterator(chunk_size=10000) if TYPE in distribution]
+        return len(matches), matches[:PAGE]
+
+    def contains_table():
+        qs = type_counts.filter(type=TYPE)
+        return qs.count(), list(qs.order_by("-dataset_id").values_list("dataset_id", flat=True)[:PAGE])
+
+    print(f"{count:,} datasets, {DatasetTypeCount.objects.count():,} type rows, best of {args.repeat}")
+    print(f"{'question':10} {'JSON decode':>12} {'DatasetTypeCount':>17} {'speedup':>8}")
+    for name, json_way, table_way in (("totals", totals_json, totals_table), ("contains", contains_json, contains_table)):
+        json_seconds, _ = timed(json_way, args.repeat)
+        table_seconds, _ = timed(table_way, args.repeat)
+        print(f"{name:10} {json_seconds:10.3f} s {table_seconds:15.3f} s {json_seconds / table_seconds:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Time to reject a malformed upload: early schema / row validation vs reading it all.
+
+    python -m benchmarks.bench_upload_reject [--size-mb 2048] [--baseline-mb 200]
+
+Sends malformed CSVs, generated on the fly so 2 GB never sits in memory,
+over a real socket to a threaded WSGI server in this process, and measures
+how long until the response arrives and how much of the body was sent by
+then:
+  bad header   the columns aren't ours (Time, Flow, Press, Heat)
+  junk rows    right header, rows of non-numeric values
+/api/web/upload gets the full --size-mb; the previous upload view
+(benchmarks.bench_upload_stream.buffered_upload), which reads everything and
+then fails with a KeyError, gets --baseline-mb, as it holds the whole file.
+"""
+
+import argparse
+import socket
+import threading
+import time
+import uuid
+
+from benchmarks.bench_upload_stream import buffered_urlconf
+from benchmarks.common import make_user, serve_wsgi, setup_django
+
+CHUNK = 64 * 1024
+
+BODIES = {
+    "bad header": (b"Time,Flow,Press,Heat\n", b"2024-01-01 00:00:00,120.5,5.25,110.1\n"),
+    "junk rows": (b"Equipment Name,Type,Flowrate,Pressure,Temperature\n", b"Pump-1,Pump,high,low,hot\n"),
+}
+
+
+def send(port, path, token, header, row, size):
+    # Returns (seconds to the response, bytes of body sent by then, status)
+    boundary = uuid.uuid4().hex
+    preamble = (
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"shift.csv\"\r\n"
+        f"Content-Type: text/csv\r\n\r\n"
+    ).encode()
+    epilogue = f"\r\n--{boundary}--\r\n".encode()
+    # the header, then CHUNK-sized blocks of copies of row, to about size bytes
+    block = row * (CHUNK // len(row))
+    count = max(1, (size - len(header)) // len(block))
+    file_size = len(header) + count * len(block)
+    head = (
+        f"POST {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nAuthorization: Bearer {token}\r\n"
+        f"Content-Type: multipart/form-data; boundary={boundary}\r\n"
+        f"Content-Length: {len(preamble) + file_size + len(epilogue)}\r\nConnection: close\r\n\r\n"
+    ).encode()
+
+    sock = socket.create_connection(("127.0.0.1", port))
+    sent = [0]
+
+    def upload():
+        try:
+            sock.sendall(head + preamble + header)
+            sent[0] += len(header)
+            for _ in range(count):
+                sock.sendall(block)
+                sent[0] += len(block)
+            sock.sendall(epilogue)
+        except OSError:
+            pass  # the server answered and closed without reading the rest
+
+    start = time.perf_counter()
+    sender = threading.Thread(target=upload, daemon=True)
+    sender.start()
+    first = sock.recv(65536)
+    elapsed = time.perf_counter() - start
+    sent_by_then = sent[0]
+    sock.close()
+    sender.join()
+    return elapsed, sent_by_then, first.split(b" ", 2)[1].decode() if first else "no response"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=2048)
+    parser.add_argument("--baseline-mb", type=int, default=200)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.test.utils import override_settings
+
+    from api.auth_serializer import CustomTokenObtainPairSerializer
+
+    token = str(CustomTokenObtainPairSerializer.get_token(make_user()).access_token)
+    # the 2 GB file must get past the size limit to be judged on its content
+    with override_settings(
+        ROOT_URLCONF=buffered_urlconf(), ALLOWED_HOSTS=["127.0.0.1"], CSV_UPLOAD_MAX_BYTES=args.size_mb * 2 ** 21,
+    ), serve_wsgi() as port:
+        print(f"{'file':12} {'path':18} {'size':>8} {'status':>7} {'time to reject':>15} {'sent by then':>13}")
+        for name, (header, row) in BODIES.items():
+            for label, url, size_mb in (
+                ("buffered+read_csv", "/buffered/upload", args.baseline_mb),
+                ("streaming", "/api/web/upload", args.size_mb),
+            ):
+                elapsed, sent, status = send(port, url, token, header, row, size_mb * 2 ** 20)
+                print(f"{name:12} {label:18} {size_mb:6} MB {status:>7} {elapsed:13.3f} s {sent / 2 ** 20:10.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Upload time-to-result: parse-while-receiving vs buffer-then-read_csv.
+
+    python -m benchmarks.bench_upload_stream [--rows 100K,1M] [--mbps 0,400,100]
+
+Serves the app from a threaded WSGI server (like runserver) in this process
+and sends generated CSVs (benchmarks.datagen) over a real socket, throttled
+to --mbps megabits per second (0 = as fast as possible). Measures from the
+first byte sent to the response, for /api/web/upload (CSVUploadParser) and
+for a copy of the previous upload view (Django's default upload handlers,
+then pd.read_csv over the buffered file). "after last byte" is how long the
+client waits once it has sent everything.
+"""
+
+import argparse
+import socket
+import time
+import uuid
+
+from benchmarks.common import make_user, serve_wsgi, setup_django
+from benchmarks.datagen import csv_bytes, parse_rows
+
+urlpatterns = []  # filled in by buffered_urlconf()
+
+
+def buffered_upload(request):
+    # The upload view as it was: the file is stored by Django's upload
+    # handlers, then read again by pandas
+    import pandas as pd
+    from rest_framework.response import Response
+
+    from api.serializers import DatasetSerializer
+
+    file = request.FILES.get("file")
+    df = pd.read_csv(file)
+    serializer = DatasetSerializer(data={
+        "name": file.name,
+        "total_rows": len(df),
+        "flowrate_mean": df["Flowrate"].mean(),
+        "pressure_mean": df["Pressure"].mean(),
+        "equipment_distribution": df["Type"].value_counts().to_dict(),
+    })
+    serializer.is_valid(raise_exception=True)
+    serializer.save(uploaded_by=request.user)
+    return Response(serializer.data, status=201)
+
+
+def buffered_urlconf():
+    # A ROOT_URLCONF with buffered_upload at /buffered/upload next to the real URLs
+    from django.urls import include, path
+    from rest_framework.decorators import api_view, permission_classes
+    from rest_framework.permissions import IsAuthenticated
+
+    view = api_view(["POST"])(permission_classes([IsAuthenticated])(buffered_upload))
+    urlpatterns[:] = [path("buffered/upload", view), path("", include("core.urls"))]
+    return __name__
+
+
+def send(port, path, token, content, mbps):
+    boundary = uuid.uuid4().hex
+    body = (
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"shift.csv\"\r\n"
+        f"Content-Type: text/csv\r\n\r\n"
+    ).encode() + content + f"\r\n--{boundary}--\r\n".encode()
+    head = (
+        f"POST {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nAuthorization: Bearer {token}\r\n"
+        f"Content-Type: multipart/form-data; boundary={boundary}\r\nContent-Length: {len(body)}\r\n"
+        f"Connection: close\r\n\r\n"
+    ).encode()
+
+    chunk = 64 * 1024
+    seconds_per_chunk = chunk * 8 / (mbps * 1e6) if mbps else 0
+    with socket.create_connection(("127.0.0.1", port)) as sock:
+        start = time.perf_counter()
+        sock.sendall(head)
+        for offset in range(0, len(body), chunk):
+            sock.sendall(body[offset:offset + chunk])
+            if seconds_per_chunk:
+                # pace against the clock, not per chunk, so sleeps don't add up
+                delay = start + (offset + chunk) / chunk * seconds_per_chunk - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+        sent = time.perf_counter()
+        response = b""
+        while data := sock.recv(65536):
+            response += data
+        done = time.perf_counter()
+
+    status = response.split(b" ", 2)[1]
+    if status != b"201":
+        raise RuntimeError(f"{path} answered {response[:300]!r}")
+    return done - start, done - sent
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", default="100K,1M", help="comma separated, e.g. 100K,1M,10M")
+    parser.add_argument("--mbps", default="0,400,100", help="client upload speeds, 0 = unthrottled")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.test.utils import override_settings
+
+    from api.auth_serializer import CustomTokenObtainPairSerializer
+
+    token = str(CustomTokenObtainPairSerializer.get_token(make_user()).access_token)
+    with override_settings(ROOT_URLCONF=buffered_urlconf(), ALLOWED_HOSTS=["127.0.0.1"]), serve_wsgi() as port:
+        print(f"best of {args.repeat}, seconds from first byte sent to response")
+        print(f"{'rows':>9} {'MB':>6} {'Mbit/s':>7} {'path':18} {'total':>8} {'after last byte':>16}")
+        for rows in map(parse_rows, args.rows.split(",")):
+            content = csv_bytes(rows)
+            for mbps in map(float, args.mbps.split(",")):
+                for label, url in (("buffered+read_csv", "/buffered/upload"), ("streaming", "/api/web/upload")):
+                    runs = [send(port, url, token, content, mbps) for _ in range(args.repeat)]
+                    total, after = min(runs)
+                    speed = f"{mbps:.0f}" if mbps else "max"
+                    print(f"{rows:9,} {len(content) / 1e6:6.1f} {speed:>7} {label:18} {total:8.3f} {after:16.3f}")
+
+
+if __name__ == "__main__":
+    main()
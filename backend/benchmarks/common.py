@@ -0,0 +1,92 @@
+"""Shared setup for the backend benchmarks.
+
+Benchmarks run against a throwaway test database (in-memory for SQLite),
+never against db.sqlite3. Run them from the backend directory, e.g.
+
+    python -m benchmarks.bench_serialization
+"""
+
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+import django
+
+EQUIPMENT_TYPES = ("Pump", "Compressor", "Valve", "HeatExchanger", "Reactor", "Condenser")
+
+
+def setup_django():
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+    django.setup()
+
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+
+
+def make_user(username="bench"):
+    from django.contrib.auth.models import User
+
+    user, _ = User.objects.get_or_create(username=username)
+    return user
+
+
+def make_datasets(user, count, batch_size=5000, seed=0):
+    # Rows shaped like what uploadWebFile stores for sample_equipment_data.csv
+    from api.models import Dataset, DatasetTypeCount
+
+    rng = random.Random(seed)
+    for start in range(0, count, batch_size):
+        datasets = Dataset.objects.bulk_create([
+            Dataset(
+                name=f"shift_{start + i:07d}.csv",
+                uploaded_by=user,
+                total_rows=rng.randint(10, 5000),
+                flowrate_mean=rng.uniform(50, 200),
+                pressure_mean=rng.uniform(3, 10),
+                equipment_distribution={
+                    kind: rng.randint(1, 400)
+                    for kind in rng.sample(EQUIPMENT_TYPES, rng.randint(2, len(EQUIPMENT_TYPES)))
+                },
+            )
+            for i in range(min(batch_size, count - start))
+        ])
+        DatasetTypeCount.objects.bulk_create(
+            [row for dataset in datasets for row in DatasetTypeCount.for_dataset(dataset)]
+        )
+
+
+def timed(fn, repeat=5):
+    # Best-of-N wall time in seconds, plus the last return value
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+@contextmanager
+def serve_wsgi():
+    # The app on a threaded WSGI server (what runserver uses) on a free port,
+    # for benchmarks that need a real socket; yields the port
+    from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+    from django.core.wsgi import get_wsgi_application
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_message(self, *args):
+            pass
+
+    server = ThreadedWSGIServer(("127.0.0.1", 0), QuietHandler, allow_reuse_address=False)
+    server.set_app(get_wsgi_application())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        yield server.server_address[1]
+    finally:
+        server.shutdown()
+        server.server_close()
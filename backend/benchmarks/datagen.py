@@ -0,0 +1,101 @@
+"""Synthetic equipment CSVs shaped like sample_equipment_data.csv.
+
+    python -m benchmarks.datagen --rows 10M [--seed 0] [-o equipment_10M.csv]
+
+Same columns, the same six equipment types in the sample's proportions, and
+Flowrate / Pressure / Temperature scattered around each type's values in
+the sample. Output is deterministic for a given --rows and --seed, and is
+written in chunks, so 50M rows (about 1.5 GB) don't need 50M rows of memory.
+"""
+
+import argparse
+import io
+import sys
+
+import numpy as np
+import pandas as pd
+
+HEADER = ["Equipment Name", "Type", "Flowrate", "Pressure", "Temperature"]
+
+# type: (share of rows, (mean, spread) for Flowrate, Pressure, Temperature),
+# from the 15 rows of sample_equipment_data.csv
+TYPES = {
+    "Pump": (4, (126.75, 5.0), (5.5, 0.3), (115.5, 4.0)),
+    "Valve": (3, (60.0, 2.0), (4.1, 0.1), (104.7, 2.5)),
+    "Compressor": (2, (97.5, 2.5), (8.2, 0.2), (96.5, 1.5)),
+    "HeatExchanger": (2, (152.5, 2.5), (6.25, 0.05), (131.0, 1.0)),
+    "Reactor": (2, (142.5, 2.5), (7.35, 0.15), (139.0, 1.0)),
+    "Condenser": (2, (162.5, 2.5), (6.85, 0.05), (126.5, 1.5)),
+}
+
+# Named sizes used by the benchmark suite
+SIZES = {"1K": 1_000, "100K": 100_000, "1M": 1_000_000, "10M": 10_000_000, "50M": 50_000_000}
+
+CHUNK_ROWS = 500_000
+
+
+def parse_rows(value):
+    # "50M", "100K", "2500"
+    value = value.strip().upper()
+    multiplier = {"K": 1_000, "M": 1_000_000}.get(value[-1:], 1)
+    return int(float(value.rstrip("KM")) * multiplier)
+
+
+def iter_chunks(rows, seed=0, chunk_rows=CHUNK_ROWS):
+    # DataFrames of at most chunk_rows rows; names keep counting across chunks
+    rng = np.random.default_rng(seed)
+    names = list(TYPES)
+    weights = np.array([TYPES[name][0] for name in names], dtype=float)
+    weights /= weights.sum()
+    numbered = np.zeros(len(names), dtype=np.int64)
+
+    for start in range(0, rows, chunk_rows):
+        size = min(chunk_rows, rows - start)
+        kinds = rng.choice(len(names), size=size, p=weights)
+        number = np.empty(size, dtype=np.int64)
+        columns = {column: np.empty(size) for column in HEADER[2:]}
+        for index, name in enumerate(names):
+            mask = kinds == index
+            count = int(mask.sum())
+            number[mask] = numbered[index] + np.arange(1, count + 1)
+            numbered[index] += count
+            for column, (mean, spread) in zip(HEADER[2:], TYPES[name][1:]):
+                columns[column][mask] = rng.normal(mean, spread, count)
+
+        type_names = np.array(names, dtype=object)[kinds]
+        yield pd.DataFrame({
+            "Equipment Name": type_names + "-" + number.astype(str).astype(object),
+            "Type": type_names,
+            "Flowrate": columns["Flowrate"].round(1),
+            "Pressure": columns["Pressure"].round(2),
+            "Temperature": columns["Temperature"].round(1),
+        })
+
+
+def write_csv(out, rows, seed=0):
+    for position, chunk in enumerate(iter_chunks(rows, seed)):
+        chunk.to_csv(out, header=position == 0, index=False)
+
+
+def csv_bytes(rows, seed=0):
+    out = io.StringIO()
+    write_csv(out, rows, seed)
+    return out.getvalue().encode()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=parse_rows, default=SIZES["1M"], help="e.g. 1K, 100K, 50M")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", help="file to write (default: stdout)")
+    args = parser.parse_args()
+
+    if args.output:
+        with open(args.output, "w", newline="", encoding="utf-8") as out:
+            write_csv(out, args.rows, args.seed)
+    else:
+        write_csv(sys.stdout, args.rows, args.seed)
+
+
+if __name__ == "__main__":
+    main()
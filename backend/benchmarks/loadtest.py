@@ -0,0 +1,369 @@
+"""Load test: a fleet of simulated desktop and web operators against a running backend.
+
+    python -m benchmarks.loadtest --start [--users 10,25,50] [--duration 30] [--web-share 0.3]
+    python -m benchmarks.loadtest --url http://127.0.0.1:8000 --users 20
+
+--start migrates a throwaway database, seeds every operator with --history
+uploads and serves it with uvicorn (or runserver when uvicorn isn't
+installed) using benchmarks/loadtest_settings.py. With --url the operators
+sign up against an existing server, which needs THROTTLE_BUCKETS raised.
+
+Each operator is a thread with its own keep-alive connection that behaves
+like the clients in this repo:
+  desktop (frontend-desktop)  log in; sync history 500 at a time with ?since=
+                              and If-None-Match; analytics fetch (limit=1000);
+                              upload a generated CSV; refresh the token
+  web (frontend-web)          log in; page through history 5 at a time;
+                              upload; refresh the token
+with random think time between actions. --users runs one stage per count,
+so the table shows where get-history latency starts to climb. The load
+generator shares the machine with the server: on a small box, compare
+stages with each other rather than reading the numbers as the server's
+absolute capacity.
+"""
+
+import argparse
+import http.client
+import importlib.util
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from urllib.parse import urlencode, urlsplit
+
+from benchmarks.datagen import csv_bytes
+
+BACKEND = Path(__file__).resolve().parent.parent
+PASSWORD = "load-test-pass-1"
+
+SYNC_PAGE_SIZE = 500  # frontend-desktop/local_cache.py
+ANALYTICS_LIMIT = 1000  # frontend-desktop/analytics_screen.py
+WEB_PAGE_SIZE = 5  # frontend-web UploadDashboard
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, name, seconds, ok):
+        with self.lock:
+            self.latencies[name].append(seconds)
+            if not ok:
+                self.errors[name] += 1
+
+
+class Connection:
+    # One keep-alive HTTP connection, reopened when the server drops it
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.conn = None
+
+    def request(self, method, path, body=None, headers=None):
+        for attempt in range(2):
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+            try:
+                self.conn.request(method, path, body=body, headers=headers or {})
+                response = self.conn.getresponse()
+                return response.status, response.headers, response.read()
+            except (http.client.HTTPException, OSError):
+                self.conn.close()
+                self.conn = None
+                if attempt:
+                    raise
+
+
+def multipart(field, filename, content):
+    boundary = uuid.uuid4().hex
+    body = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+        f"Content-Type: text/csv\r\n\r\n"
+    ).encode() + content + f"\r\n--{boundary}--\r\n".encode()
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+class Operator:
+    # tasks: (weight, method name)
+    tasks = ()
+    upload_path = None
+
+    def __init__(self, url, username, stats, args, seed):
+        self.conn = Connection(url)
+        self.username = username
+        self.stats = stats
+        self.args = args
+        self.rng = random.Random(seed)
+        self.access = self.refresh_token = None
+        self.weights = [weight for weight, _ in self.tasks]
+        self.actions = [getattr(self, name) for _, name in self.tasks]
+
+    def call(self, name, method, path, body=None, headers=None, auth=True):
+        headers = dict(headers or {})
+        if auth:
+            headers["Authorization"] = f"Bearer {self.access}"
+        start = time.perf_counter()
+        try:
+            status, response_headers, content = self.conn.request(method, path, body, headers)
+        except (http.client.HTTPException, OSError):
+            self.stats.record(name, time.perf_counter() - start, False)
+            return None, {}, b""
+        self.stats.record(name, time.perf_counter() - start, status < 400)
+        if status == 401 and auth:
+            # expired access token: refresh and carry on, like auth_manager.request_with_retry
+            self.refresh()
+        return status, response_headers, content
+
+    def post_json(self, name, path, data, auth=True):
+        return self.call(name, "POST", path, json.dumps(data).encode(), {"Content-Type": "application/json"}, auth)
+
+    def login(self):
+        status, _, content = self.post_json(
+            "POST token", "/api/app1/token/", {"username": self.username, "password": PASSWORD}, auth=False
+        )
+        if status == 200:
+            tokens = json.loads(content)
+            self.access, self.refresh_token = tokens["access"], tokens["refresh"]
+        return status == 200
+
+    def refresh(self):
+        status, _, content = self.post_json(
+            "POST token/refresh", "/api/app1/token/refresh/", {"refresh": self.refresh_token}, auth=False
+        )
+        if status == 200:
+            self.access = json.loads(content)["access"]
+
+    def upload(self):
+        body, content_type = multipart("file", "shift.csv", csv_bytes(self.args.upload_rows, self.rng.randrange(10 ** 6)))
+        self.call(f"POST {self.upload_path}", "POST", self.upload_path, body, {"Content-Type": content_type})
+
+    def run(self, stop):
+        if not self.login():
+            return
+        while not stop.is_set():
+            self.rng.choices(self.actions, self.weights)[0]()
+            stop.wait(self.rng.expovariate(1 / self.args.think) if self.args.think else 0)
+
+
+class DesktopOperator(Operator):
+    tasks = ((6, "sync"), (2, "analytics"), (1, "upload"), (1, "refresh"))
+    upload_path = "/api/desktop/upload"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.etags = {}
+        self.since = None
+
+    def conditional_get(self, name, path):
+        headers = {"If-None-Match": self.etags[path]} if path in self.etags else {}
+        status, response_headers, content = self.call(name, "GET", path, headers=headers)
+        if status == 200:
+            if response_headers.get("ETag"):
+                self.etags[path] = response_headers["ETag"]
+            return json.loads(content)
+        return None
+
+    def sync(self):
+        # local_cache.py: everything uploaded since the newest cached row
+        params = {"limit": SYNC_PAGE_SIZE, "offset": 0}
+        if self.since:
+            params["since"] = self.since
+        data = self.conditional_get("GET get-history (sync)", f"/api/get-history/?{urlencode(params)}")
+        if data and data["results"]:
+            self.since = data["results"][0]["uploaded_at"]
+
+    def analytics(self):
+        self.conditional_get(
+            "GET get-history (analytics)", f"/api/get-history/?limit={ANALYTICS_LIMIT}&offset=0"
+        )
+
+
+class WebOperator(Operator):
+    tasks = ((6, "page"), (1, "upload"), (1, "refresh"))
+    upload_path = "/api/web/upload"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.count = 0
+
+    def page(self):
+        # mostly the first page, sometimes further back
+        offset = 0
+        if self.count > WEB_PAGE_SIZE and self.rng.random() < 0.3:
+            offset = self.rng.randrange(0, self.count, WEB_PAGE_SIZE)
+        status, _, content = self.call("GET get-history (page)", "GET", f"/api/get-history/?limit={WEB_PAGE_SIZE}&offset={offset}")
+        if status == 200:
+            self.count = json.loads(content)["count"]
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def report(stats, elapsed):
+    print(f"{'endpoint':32} {'reqs':>7} {'req/s':>7} {'err':>5} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8}")
+    total = 0
+    for name in sorted(stats.latencies):
+        values = sorted(stats.latencies[name])
+        total += len(values)
+        print(
+            f"{name:32} {len(values):7} {len(values) / elapsed:7.1f} {stats.errors[name]:5} "
+            + " ".join(f"{value * 1000:6.0f}ms" for value in (
+                statistics.median(values), percentile(values, 0.9), percentile(values, 0.99), values[-1],
+            ))
+        )
+    print(f"{'total':32} {total:7} {total / elapsed:7.1f}")
+
+
+def summary(stats, elapsed):
+    return {
+        name: {
+            "requests": len(values),
+            "errors": stats.errors[name],
+            "per_second": len(values) / elapsed,
+            "p50": statistics.median(values),
+            "p90": percentile(sorted(values), 0.9),
+            "p99": percentile(sorted(values), 0.99),
+        }
+        for name, values in stats.latencies.items()
+    }
+
+
+def run_stage(url, usernames, args):
+    # Spawns the operators at --spawn-rate, measures --duration once all are running
+    stats, stop = Stats(), threading.Event()
+    rng = random.Random(len(usernames))
+    threads = []
+    for index, username in enumerate(usernames):
+        kind = WebOperator if rng.random() < args.web_share else DesktopOperator
+        operator = kind(url, username, stats, args, seed=index)
+        thread = threading.Thread(target=operator.run, args=(stop,), daemon=True)
+        thread.start()
+        threads.append(thread)
+        time.sleep(1 / args.spawn_rate)
+
+    with stats.lock:
+        stats.latencies.clear()
+        stats.errors.clear()
+    start = time.perf_counter()
+    stop.wait(args.duration)
+    elapsed = time.perf_counter() - start
+    with stats.lock:
+        measured = Stats()
+        measured.latencies = {name: list(values) for name, values in stats.latencies.items()}
+        measured.errors = defaultdict(int, stats.errors)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return measured, elapsed
+
+
+def wait_for(url, timeout=60):
+    parts = urlsplit(url)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection((parts.hostname, parts.port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"server at {url} didn't start")
+
+
+@contextmanager
+def local_server(port):
+    with tempfile.TemporaryDirectory() as directory:
+        env = {
+            **os.environ,
+            "DJANGO_SETTINGS_MODULE": "benchmarks.loadtest_settings",
+            "LOADTEST_DB": str(Path(directory) / "db.sqlite3"),
+        }
+        subprocess.run([sys.executable, "manage.py", "migrate", "-v", "0"], cwd=BACKEND, env=env, check=True)
+        if importlib.util.find_spec("uvicorn"):
+            command = ["-m", "uvicorn", "core.asgi:application", "--port", str(port), "--log-level", "warning"]
+        else:
+            command = ["manage.py", "runserver", "--noreload", str(port)]
+        server = subprocess.Popen([sys.executable, *command], cwd=BACKEND, env=env)
+        url = f"http://127.0.0.1:{port}"
+        try:
+            wait_for(url)
+            os.environ.update(env)  # seeding writes to the same database
+            yield url
+        finally:
+            server.terminate()
+            server.wait()
+
+
+def create_operators(url, count, history, seeded):
+    # Signs the operators up through the API; with --start also gives each
+    # one `history` uploads straight in the database
+    prefix = f"load-{uuid.uuid4().hex[:6]}"
+    usernames = [f"{prefix}-{index}" for index in range(count)]
+    conn = Connection(url)
+    for username in usernames:
+        status, _, content = conn.request(
+            "POST", "/api/signup/", json.dumps({"username": username, "password": PASSWORD}).encode(),
+            {"Content-Type": "application/json"},
+        )
+        if status != 200:
+            raise RuntimeError(f"signup failed ({status}): {content[:200]!r}; raise THROTTLE_BUCKETS or use --start")
+
+    if seeded and history:
+        import django
+
+        django.setup()
+        from django.contrib.auth.models import User
+
+        from benchmarks.common import make_datasets
+
+        for user in User.objects.filter(username__in=usernames):
+            make_datasets(user, history, seed=user.pk)
+    return usernames
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--start", action="store_true", help="start a throwaway local server")
+    target.add_argument("--url", help="existing server, e.g. http://127.0.0.1:8000")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--users", default="10,25,50", help="operators per stage, comma separated")
+    parser.add_argument("--duration", type=float, default=30, help="seconds measured per stage")
+    parser.add_argument("--spawn-rate", type=float, default=10, help="operators started per second")
+    parser.add_argument("--web-share", type=float, default=0.3, help="fraction of web operators")
+    parser.add_argument("--think", type=float, default=1.0, help="mean seconds between actions")
+    parser.add_argument("--history", type=int, default=200, help="uploads seeded per operator (--start)")
+    parser.add_argument("--upload-rows", type=int, default=1000)
+    parser.add_argument("--json", help="also write the results here")
+    args = parser.parse_args()
+
+    stages = [int(count) for count in args.users.split(",")]
+    server = local_server(args.port) if args.start else contextmanager(lambda: (yield args.url))()
+    results = {}
+    with server as url:
+        usernames = create_operators(url, max(stages), args.history, seeded=args.start)
+        for count in stages:
+            print(f"\n{count} operators, {args.duration:.0f}s")
+            stats, elapsed = run_stage(url, usernames[:count], args)
+            report(stats, elapsed)
+            results[count] = summary(stats, elapsed)
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    main()
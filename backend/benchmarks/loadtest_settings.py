@@ -0,0 +1,22 @@
+# Settings for the server `python -m benchmarks.loadtest --start` launches:
+# the normal settings with DEBUG off (as in production, and so the query log
+# doesn't grow), a throwaway SQLite database, and throttles lifted so many
+# simulated operators can share one client address.
+
+import os
+
+from core.settings import *  # noqa: F401,F403
+
+DEBUG = False
+ALLOWED_HOSTS = ["127.0.0.1", "localhost"]
+
+DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": os.environ["LOADTEST_DB"],
+    }
+}
+
+THROTTLE_BUCKETS = {
+    scope: {"capacity": 10 ** 9, "refill": 10 ** 9} for scope in ("login_ip", "login_user", "signup_ip")
+}
@@ -0,0 +1,334 @@
+"""Benchmark suite for the backend hot paths, with stored baselines.
+
+    python -m benchmarks.suite run [--filter ingest] [--repeat 5] [--max-rows 1M] [--save NAME] [--compare NAME]
+    python -m benchmarks.suite compare BASELINE RESULTS [--threshold 0.25]
+    python -m benchmarks.suite list
+
+Cases (whole requests through the test client, JWT auth included):
+  ingest/web_upload[<rows>]       POST a generated CSV (benchmarks.datagen), up to --max-rows, with
+                                  EQUIPMENT_READINGS off (every row's name interned, no readings)
+  ingest/equipment_upload[<rows>] the same with EQUIPMENT_READINGS on (a reading per row), up to 100K
+  history/first_page[<depth>]     get-history/ for a user with <depth> uploads
+  history/deep_page[<depth>]      the same, offset near the end
+  history/not_modified[<depth>]   the same with a matching If-None-Match (304)
+  auth/signup, auth/token, auth/token_refresh
+  serialize/...                   1000-row history pages, no request around them
+
+Each case runs --repeat times after one warm-up call; min and median are
+kept. "run --save NAME" stores the results as benchmarks/baselines/NAME.json;
+"--compare NAME" (or "compare") flags every case whose min got slower than
+the baseline's by more than --threshold and exits with status 1. Baselines
+are only comparable on the same machine and settings: save one per machine.
+"""
+
+import argparse
+import datetime
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from benchmarks.common import make_datasets, make_user, setup_django
+from benchmarks.datagen import SIZES, csv_bytes, parse_rows
+
+BASELINES = Path(__file__).resolve().parent / "baselines"
+HISTORY_DEPTHS = (100, 10_000, 100_000)
+
+# Throttles would turn repeated signups / logins into 429s
+UNTHROTTLED = {scope: {"capacity": 10 ** 9, "refill": 10 ** 9} for scope in ("login_ip", "login_user", "signup_ip")}
+
+CASES = []  # (name, setup(args) -> callable to time)
+
+
+def case(name):
+    def register(setup):
+        CASES.append((name, setup))
+        return setup
+    return register
+
+
+def bearer(user):
+    from api.auth_serializer import CustomTokenObtainPairSerializer
+
+    return {"HTTP_AUTHORIZATION": f"Bearer {CustomTokenObtainPairSerializer.get_token(user).access_token}"}
+
+
+def client():
+    from rest_framework.test import APIClient
+
+    return APIClient()
+
+
+# ingest
+
+def ingest_case(label, rows):
+    @case(f"ingest/web_upload[{label}]")
+    def setup(args):
+        if rows > args.max_rows:
+            return None
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        from django.test.utils import override_settings
+
+        body = csv_bytes(rows)
+        api, auth = client(), bearer(make_user("ingest"))
+
+        def upload():
+            with override_settings(EQUIPMENT_READINGS=False):
+                return api.post("/api/web/upload", {"file": SimpleUploadedFile("shift.csv", body)}, **auth)
+        return upload
+
+
+for label, rows in SIZES.items():
+    ingest_case(label, rows)
+
+
+def equipment_case(label, rows):
+    @case(f"ingest/equipment_upload[{label}]")
+    def setup(args):
+        if rows > args.max_rows:
+            return None
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from django.test.utils import override_settings
+
+        body = csv_bytes(rows)
+        api, auth = client(), bearer(make_user("equipment"))
+
+        def upload():
+            with override_settings(EQUIPMENT_READINGS=True):
+                return api.post("/api/web/upload", {"file": SimpleUploadedFile("shift.csv", body)}, **auth)
+        return upload
+
+
+for label in ("1K", "100K"):
+    equipment_case(label, SIZES[label])
+
+
+# history
+
+def history_user(depth):
+    from api.models import Dataset
+
+    user = make_user(f"history-{depth}")
+    if not Dataset.objects.filter(uploaded_by=user).exists():
+        make_datasets(user, depth)
+    return user
+
+
+def history_cases(depth):
+    @case(f"history/first_page[{depth}]")
+    def first_page(args):
+        if depth > args.max_history:
+            return None
+        api, auth = client(), bearer(history_user(depth))
+        return lambda: api.get("/api/get-history/", **auth)
+
+    @case(f"history/deep_page[{depth}]")
+    def deep_page(args):
+        if depth > args.max_history:
+            return None
+        api, auth = client(), bearer(history_user(depth))
+        return lambda: api.get("/api/get-history/", {"limit": 5, "offset": depth - 5}, **auth)
+
+    @case(f"history/not_modified[{depth}]")
+    def not_modified(args):
+        if depth > args.max_history:
+            return None
+        api, auth = client(), bearer(history_user(depth))
+        etag = api.get("/api/get-history/", **auth)["ETag"]
+        return lambda: api.get("/api/get-history/", HTTP_IF_NONE_MATCH=etag, **auth)
+
+
+for depth in HISTORY_DEPTHS:
+    history_cases(depth)
+
+
+# auth
+
+@case("auth/signup")
+def signup(args):
+    api, numbers = client(), itertools.count()
+    return lambda: api.post(
+        "/api/signup/", {"username": f"signup-{next(numbers)}", "password": "secret-pass-1"}, format="json"
+    )
+
+
+@case("auth/token")
+def token(args):
+    from django.contrib.auth.models import User
+
+    User.objects.create_user(username="login", password="secret-pass-1")
+    api = client()
+    return lambda: api.post("/api/app1/token/", {"username": "login", "password": "secret-pass-1"}, format="json")
+
+
+@case("auth/token_refresh")
+def token_refresh(args):
+    from api.auth_serializer import CustomTokenObtainPairSerializer
+
+    refresh = str(CustomTokenObtainPairSerializer.get_token(make_user("refresh")))
+    api = client()
+    return lambda: api.post("/api/app1/token/refresh/", {"refresh": refresh}, format="json")
+
+
+# serialization
+
+def serialization_page():
+    from api.models import Dataset
+
+    user = history_user(1000)
+    return list(Dataset.objects.filter(uploaded_by=user).select_related("uploaded_by").order_by("-uploaded_at"))
+
+
+@case("serialize/serialize_datasets[1000]")
+def serialize_fast(args):
+    from api.serializers import serialize_datasets
+
+    page = serialization_page()
+    return lambda: serialize_datasets(page)
+
+
+@case("serialize/DatasetSerializer[1000]")
+def serialize_drf(args):
+    from api.serializers import DatasetSerializer
+
+    page = serialization_page()
+    return lambda: DatasetSerializer(page, many=True).data
+
+
+@case("serialize/json_render[1000]")
+def render_json(args):
+    from rest_framework.renderers import JSONRenderer
+
+    from api.serializers import serialize_datasets
+
+    data = serialize_datasets(serialization_page())
+    return lambda: JSONRenderer().render(data)
+
+
+def measure(fn, repeat):
+    fn()  # warm up
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = fn()
+        samples.append(time.perf_counter() - start)
+        status = getattr(response, "status_code", 200)
+        if status >= 400:
+            raise RuntimeError(f"request failed with {status}: {getattr(response, 'content', b'')[:200]!r}")
+    return {"min": min(samples), "median": statistics.median(samples), "repeat": repeat}
+
+
+def environment():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    import django
+    import pandas
+
+    return {
+        "date": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "pandas": pandas.__version__,
+    }
+
+
+def load(name_or_path):
+    path = Path(name_or_path)
+    if not path.suffix:
+        path = BASELINES / f"{name_or_path}.json"
+    return json.loads(path.read_text())
+
+
+def compare(baseline, results, threshold):
+    # Prints the comparison, returns the names of the cases that regressed
+    regressed = []
+    print(f"{'case':36} {'baseline':>11} {'now':>11} {'change':>8}")
+    for name, current in results["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            print(f"{name:36} {'-':>11} {current['min'] * 1000:9.2f}ms {'new':>8}")
+            continue
+        change = current["min"] / before["min"] - 1
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressed.append(name)
+        print(f"{name:36} {before['min'] * 1000:9.2f}ms {current['min'] * 1000:9.2f}ms {change:+7.0%}{flag}")
+    if regressed:
+        print(f"\n{len(regressed)} case(s) more than {threshold:.0%} slower than the baseline")
+    return regressed
+
+
+def run(args):
+    setup_django()
+
+    from django.test.utils import override_settings
+
+    results = {"environment": environment(), "results": {}}
+    with override_settings(THROTTLE_BUCKETS=UNTHROTTLED):
+        for name, setup in CASES:
+            if args.filter and args.filter not in name:
+                continue
+            fn = setup(args)
+            if fn is None:
+                continue
+            results["results"][name] = result = measure(fn, args.repeat)
+            print(f"{name:36} min {result['min'] * 1000:10.2f}ms   median {result['median'] * 1000:10.2f}ms")
+
+    if args.save:
+        BASELINES.mkdir(exist_ok=True)
+        path = BASELINES / f"{args.save}.json"
+        path.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"saved {path}")
+
+    if args.compare:
+        print()
+        return 1 if compare(load(args.compare), results, args.threshold) else 0
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the cases")
+    run_parser.add_argument("--filter", help="only cases whose name contains this")
+    run_parser.add_argument("--repeat", type=int, default=5)
+    run_parser.add_argument("--max-rows", type=parse_rows, default=SIZES["1M"], help="largest upload (default 1M)")
+    run_parser.add_argument("--max-history", type=int, default=HISTORY_DEPTHS[-1], help="deepest history")
+    run_parser.add_argument("--save", metavar="NAME", help="store results as baselines/NAME.json")
+    run_parser.add_argument("--compare", metavar="BASELINE", help="baseline name or .json path")
+    run_parser.add_argument("--threshold", type=float, default=0.25, help="slowdown that counts (0.25 = 25%%)")
+
+    compare_parser = commands.add_parser("compare", help="compare two saved result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("results")
+    compare_parser.add_argument("--threshold", type=float, default=0.25)
+
+    commands.add_parser("list", help="list the cases")
+
+    args = parser.parse_args()
+    if args.command == "run":
+        sys.exit(run(args))
+    if args.command == "compare":
+        sys.exit(1 if compare(load(args.baseline), load(args.results), args.threshold) else 0)
+    for name, _ in CASES:
+        print(name)
+
+
+if __name__ == "__main__":
+    main()
@@ -13,4 +13,10 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Live update endpoints (WebSocket / Server-Sent Events) sit in front of Django.
+# Imported after get_asgi_application() so the app registry is ready.
+from api.live import live_updates  # noqa: E402
+
+application = live_updates(django_application)
@@ -46,6 +46,8 @@ CSRF_TRUSTED_ORIGINS = [
 ]
 
 MIDDLEWARE = [
+    "api.middleware.MetricsMiddleware",        # request metrics, first so it times everything below
+    "api.middleware.ProfilingMiddleware",      # X-Profile: 1 from a staff user profiles that request
     "corsheaders.middleware.CorsMiddleware",   # CORS Middleware
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -65,11 +67,74 @@ REST_FRAMEWORK = {
     ),
     
     # Using JWT Authentication
+    # (user built from the token claims, no database query per request)
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "api.authentication.CachedJWTAuthentication",
     ),
 }
 
+# CachedJWTAuthentication: how long (seconds) a user built from a token is reused,
+# how many are kept, and the paths that always load the user from the database
+JWT_USER_CACHE_TTL = 60
+JWT_USER_CACHE_SIZE = 10000
+JWT_DB_USER_PATHS = ("/admin/", "/api/admin/")
+
+# Store one reading per Equipment Name with each upload (api/equipment.py,
+# /api/equipment/<name>/, /api/readings/). The names are interned either way;
+# off, an equipment's history stays empty. With a different name on every
+# row it's about one INSERT per row.
+EQUIPMENT_READINGS = True
+
+# Equipment name -> id entries kept per process (api/equipment.py)
+EQUIPMENT_CACHE_SIZE = 100000
+
+# Admin changelists (api/admin.py) show an estimated total instead of counting
+# the rows of an unfiltered table bigger than this
+ADMIN_EXACT_COUNT_MAX = 100000
+
+# Request metrics (api/middleware.py), served in the Prometheus text format at
+# /metrics. Disabled, the middleware drops out of the chain and /metrics is a 404.
+# Enabled, scrapers must send METRICS_TOKEN as "Authorization: Bearer <token>";
+# without a token set /metrics refuses every request (403) and logs a warning.
+METRICS_ENABLED = False
+METRICS_TOKEN = None
+
+# CSV uploads (api/ingest.py) are parsed and aggregated while they're received,
+# a block of lines at a time; bigger uploads are refused with a 413
+CSV_UPLOAD_MAX_BYTES = 512 * 1024 * 1024
+CSV_PARSE_BLOCK_BYTES = 1024 * 1024
+# Header names are matched ignoring case, spaces, "_" and "-"; these map other
+# names onto the columns we read
+CSV_COLUMN_ALIASES = {
+    "Equipment Type": "Type",
+    "Flow": "Flowrate",
+    "Press": "Pressure",
+    "Temp": "Temperature",
+}
+# Uploads where more than this share of rows has a non-numeric value are
+# rejected, as early as the first thousand rows
+CSV_MAX_INVALID_FRACTION = 0.5
+
+# Tracing spans around the upload stages (api/tracing.py): None (off), "file"
+# (JSON lines with OTLP field names, appended to TRACING_FILE) or
+# "opentelemetry" (needs opentelemetry-api; exported as the SDK is configured)
+TRACING = None
+TRACING_FILE = BASE_DIR / "traces.jsonl"
+
+# Per-request profiling for staff users (api/profiling.py), downloadable from
+# /api/admin/profiles/. Uses pyinstrument when installed, else cProfile.
+PROFILING_ENABLED = True
+PROFILE_DIR = BASE_DIR / "profiles"
+PROFILE_KEEP = 50
+
+# Retention (api/retention.py, `manage.py compact_history`): datasets older than
+# a user's RetentionPolicy, or RETENTION_DAYS for users without one (None: keep
+# forever), are folded into monthly rollups, RETENTION_BATCH_SIZE per
+# transaction, after their columns are written to ARCHIVE_DIR
+RETENTION_DAYS = None
+RETENTION_BATCH_SIZE = 500
+ARCHIVE_DIR = BASE_DIR / "archive"
+
 # Simple JWT Settings for Token Lifetimes and Auth Header Types
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=60),
@@ -110,6 +175,28 @@ DATABASES = {
 }
 
 
+# Password hashing (api/hashers.py): PBKDF2 with a configurable cost, run on a
+# bounded pool of threads so a burst of logins can't take every CPU.
+# Existing hashes below the configured cost are rehashed on the next login.
+PASSWORD_HASHERS = [
+    "api.hashers.PooledPBKDF2PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+    "django.contrib.auth.hashers.Argon2PasswordHasher",
+    "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
+    "django.contrib.auth.hashers.ScryptPasswordHasher",
+]
+PASSWORD_HASH_ITERATIONS = None  # None -> Django's PBKDF2 default
+PASSWORD_HASHING_WORKERS = None  # None -> one per CPU
+PASSWORD_HASHING_MAX_WAITING = 32  # more concurrent logins than this get a 503
+
+# Token bucket throttles (api/throttling.py): burst size and refill rate
+# (tokens per second) per client IP / username
+THROTTLE_BUCKETS = {
+    "login_ip": {"capacity": 30, "refill": 1.0},
+    "login_user": {"capacity": 10, "refill": 0.2},
+    "signup_ip": {"capacity": 5, "refill": 0.05},
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -6,6 +6,7 @@ from rest_framework_simplejwt.views import (
 )
 
 from api.auth_views import CustomTokenObtainPairView 
+from api.metrics import metricsView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -13,4 +14,6 @@ urlpatterns = [
     
     path('api/app1/token/', CustomTokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/app1/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    
+    path('metrics', metricsView), # Prometheus scrape endpoint
 ]
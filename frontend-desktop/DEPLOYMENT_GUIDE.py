@@ -60,9 +60,8 @@ Features:
    - Progress indication
    - Success/error feedback
    - Shows upload statistics:
-     * Total records
-     * Average FlowRate
-     * Average Power
+     * Total records (and invalid rows)
+     * Flowrate, Pressure and Temperature: mean, min and max
 
 5. UPLOAD HISTORY
    - View all uploaded files
@@ -70,8 +69,7 @@ Features:
    - Display columns:
      * File Name
      * Total Rows
-     * Avg FlowRate
-     * Avg Power
+     * Flowrate, Pressure, Temperature (mean, min-max)
      * Equipment Types
      * Date Uploaded
    - Previous/Next navigation
@@ -2,15 +2,12 @@
 
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
-    QComboBox, QMessageBox, QScrollArea
+    QComboBox, QMessageBox, QScrollArea, QFileDialog, QStackedWidget
 )
 from PyQt5.QtCore import Qt, pyqtSignal
 from PyQt5.QtGui import QFont
-import matplotlib
-matplotlib.use('Qt5Agg')
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.figure import Figure
-import matplotlib.pyplot as plt
+from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
+from charts import DistributionChart, AverageValuesChart, TrendsChart, UploadStatsChart
 from api_client import APIClient
 import json
 
@@ -20,8 +17,10 @@ class AnalyticsScreen(QWidget):
     
     back_requested = pyqtSignal()
     
-    def __init__(self, parent=None):
+    def __init__(self, cache=None, user_id=None, parent=None):
         super().__init__(parent)
+        self.cache = cache
+        self.user_id = user_id
         self.history_data = []
         self.init_ui()
         self.load_analytics_data()
@@ -54,6 +53,23 @@ class AnalyticsScreen(QWidget):
             }
         """)
         back_btn.clicked.connect(self.back_requested.emit)
+        
+        export_btn = QPushButton("Export")
+        export_btn.setMinimumWidth(80)
+        export_btn.setStyleSheet("""
+            QPushButton {
+                background-color: #28a745;
+                color: white;
+                border: none;
+                border-radius: 5px;
+                padding: 5px 15px;
+            }
+            QPushButton:hover {
+                background-color: #218838;
+            }
+        """)
+        export_btn.clicked.connect(self.export_data)
+        header_layout.addWidget(export_btn)
         header_layout.addWidget(back_btn)
         layout.addLayout(header_layout)
         
@@ -72,178 +88,73 @@ class AnalyticsScreen(QWidget):
         filter_layout.addStretch()
         layout.addLayout(filter_layout)
         
-        # Chart area
-        self.chart_figure = Figure(figsize=(12, 6), dpi=100)
-        self.chart_canvas = FigureCanvas(self.chart_figure)
-        layout.addWidget(self.chart_canvas)
+        # Chart area: one canvas per chart (same order as the combo box),
+        # switching charts just flips the stacked widget
+        self.charts = [DistributionChart(), AverageValuesChart(), TrendsChart(), UploadStatsChart()]
+        self.chart_stack = QStackedWidget()
+        for chart in self.charts:
+            self.chart_stack.addWidget(self.chart_page(chart))
+        layout.addWidget(self.chart_stack)
         
         self.setLayout(layout)
     
+    def chart_page(self, chart):
+        """Widget shown for a chart, with a zoom / pan toolbar if it supports it."""
+        if not chart.zoomable:
+            return chart.canvas
+        page = QWidget()
+        page_layout = QVBoxLayout(page)
+        page_layout.setContentsMargins(0, 0, 0, 0)
+        page_layout.addWidget(NavigationToolbar(chart.canvas, page))
+        page_layout.addWidget(chart.canvas)
+        return page
+    
     def load_analytics_data(self):
         """Load all history data for analytics."""
         try:
-            # Load all data (with high limit)
-            data = APIClient.get_history(limit=1000, offset=0)
-            self.history_data = data.get('results', [])
-            self.refresh_chart()
+            if self.cache is not None:
+                # Whole history from the local cache, no network round trip
+                self.history_data = self.cache.all_datasets(self.user_id)
+            else:
+                # Load all data (with high limit)
+                data = APIClient.get_history(limit=1000, offset=0)
+                self.history_data = data.get('results', [])
+            self.update_charts()
         except Exception as e:
             QMessageBox.warning(self, "Error", f"Failed to load analytics: {str(e)}")
     
-    def refresh_chart(self):
-        """Refresh the chart based on selection."""
-        self.chart_figure.clear()
-        chart_type = self.chart_combo.currentText()
-        
-        try:
-            if "Equipment Distribution" in chart_type:
-                self.plot_equipment_distribution()
-            elif "Average Values" in chart_type:
-                self.plot_average_values()
-            elif "Equipment Type Trends" in chart_type:
-                self.plot_equipment_trends()
-            elif "Upload Statistics" in chart_type:
-                self.plot_upload_stats()
-            
-            self.chart_canvas.draw()
-        except Exception as e:
-            self.chart_figure.text(0.5, 0.5, f"Error: {str(e)}", 
-                                  ha='center', va='center', fontsize=12)
-            self.chart_canvas.draw()
+    def add_datasets(self, records):
+        """Apply newly uploaded datasets without reloading the whole history."""
+        known = {r.get('id') for r in records}
+        self.history_data = list(records) + [r for r in self.history_data if r.get('id') not in known]
+        self.update_charts()
     
-    def plot_equipment_distribution(self):
-        """Plot pie chart of equipment distribution from latest upload."""
-        if not self.history_data:
-            self.chart_figure.text(0.5, 0.5, "No data available", 
-                                  ha='center', va='center', fontsize=14)
-            return
-        
-        # Get latest upload
-        latest = self.history_data[0]
-        equipment_dist = latest.get('equipment_distribution', {})
-        
-        if not equipment_dist:
-            self.chart_figure.text(0.5, 0.5, "No equipment distribution data", 
-                                  ha='center', va='center', fontsize=14)
-            return
-        
-        ax = self.chart_figure.add_subplot(111)
-        
-        # Convert to lists
-        labels = list(equipment_dist.keys())
-        sizes = list(equipment_dist.values())
-        
-        # Create pie chart
-        colors = plt.cm.Set3(range(len(labels)))
-        ax.pie(sizes, labels=labels, autopct='%1.1f%%', colors=colors, startangle=90)
-        ax.set_title(f"Equipment Distribution\n({latest.get('name', 'Latest Upload')})", 
-                    fontsize=12, fontweight='bold')
+    def update_charts(self):
+        """Hand the current data to every chart, only the visible one redraws now."""
+        for chart in self.charts:
+            chart.set_data(self.history_data)
+        self.refresh_chart()
     
-    def plot_average_values(self):
-        """Plot bar chart of average values across all uploads."""
-        if not self.history_data:
-            self.chart_figure.text(0.5, 0.5, "No data available", 
-                                  ha='center', va='center', fontsize=14)
-            return
-        
-        # Extract data
-        filenames = [r.get('name', f"Upload {i+1}")[:15] for i, r in enumerate(self.history_data[:10])]
-        flowrates = [r.get('avg_usage_hours', 0) for r in self.history_data[:10]]
-        pressures = [r.get('avg_power', 0) for r in self.history_data[:10]]
-        
-        ax = self.chart_figure.add_subplot(111)
-        
-        # Create grouped bar chart
-        x = range(len(filenames))
-        width = 0.35
-        
-        bars1 = ax.bar([i - width/2 for i in x], flowrates, width, label='Avg FlowRate', color='#3498db')
-        bars2 = ax.bar([i + width/2 for i in x], pressures, width, label='Avg Power', color='#e74c3c')
-        
-        ax.set_xlabel('Uploads', fontweight='bold')
-        ax.set_ylabel('Value', fontweight='bold')
-        ax.set_title('Average Values Across Uploads (Last 10)', fontsize=12, fontweight='bold')
-        ax.set_xticks(x)
-        ax.set_xticklabels(filenames, rotation=45, ha='right')
-        ax.legend()
-        ax.grid(axis='y', alpha=0.3)
-        
-        self.chart_figure.tight_layout()
-    
-    def plot_equipment_trends(self):
-        """Plot equipment type trends over uploads."""
-        if not self.history_data:
-            self.chart_figure.text(0.5, 0.5, "No data available", 
-                                  ha='center', va='center', fontsize=14)
-            return
-        
-        # Collect equipment types and their counts
-        equipment_types = {}
-        for upload in self.history_data[:15]:  # Last 15 uploads
-            dist = upload.get('equipment_distribution', {})
-            for equipment, count in dist.items():
-                if equipment not in equipment_types:
-                    equipment_types[equipment] = []
-                equipment_types[equipment].append(count)
-        
-        if not equipment_types:
-            self.chart_figure.text(0.5, 0.5, "No equipment data", 
-                                  ha='center', va='center', fontsize=14)
-            return
-        
-        ax = self.chart_figure.add_subplot(111)
-        
-        # Plot lines for each equipment type
-        for equipment, counts in equipment_types.items():
-            ax.plot(range(len(counts)), counts, marker='o', label=equipment, linewidth=2)
-        
-        ax.set_xlabel('Upload Order (Recent →)', fontweight='bold')
-        ax.set_ylabel('Count', fontweight='bold')
-        ax.set_title('Equipment Type Trends Over Time', fontsize=12, fontweight='bold')
-        ax.legend(loc='best')
-        ax.grid(True, alpha=0.3)
-        
-        self.chart_figure.tight_layout()
+    def refresh_chart(self):
+        """Show the selected chart, redrawing it only if its data changed."""
+        index = self.chart_combo.currentIndex()
+        self.chart_stack.setCurrentIndex(index)
+        self.charts[index].render()
     
-    def plot_upload_stats(self):
-        """Plot upload statistics."""
-        if not self.history_data:
-            self.chart_figure.text(0.5, 0.5, "No data available", 
-                                  ha='center', va='center', fontsize=14)
+    def export_data(self):
+        """Export the full upload history to a CSV or NDJSON file."""
+        file_path, selected_filter = QFileDialog.getSaveFileName(
+            self,
+            "Export Upload History",
+            "history.csv",
+            "CSV Files (*.csv);;NDJSON Files (*.ndjson)"
+        )
+        if not file_path:
             return
         
-        # Extract statistics
-        total_uploads = len(self.history_data)
-        total_records = sum([r.get('total_rows', 0) for r in self.history_data])
-        avg_flowrate = sum([r.get('avg_usage_hours', 0) for r in self.history_data]) / total_uploads if total_uploads > 0 else 0
-        avg_power = sum([r.get('avg_power', 0) for r in self.history_data]) / total_uploads if total_uploads > 0 else 0
-        
-        # Create figure with subplots
-        ax = self.chart_figure.add_subplot(111)
-        
-        # Statistics text
-        stats_text = f"""
-        UPLOAD STATISTICS
-        ═══════════════════════════════════════
-        
-        Total Uploads:                    {total_uploads}
-        
-        Total Records Uploaded:           {total_records:,}
-        
-        Average FlowRate (All):           {avg_flowrate:.2f}
-        
-        Average Power (All):              {avg_power:.2f}
-        
-        Average Records/Upload:           {total_records/total_uploads:.0f} records
-        
-        Latest Upload:                    {self.history_data[0].get('name', 'N/A')}
-        """
-        
-        ax.text(0.5, 0.5, stats_text, transform=ax.transAxes,
-               fontsize=11, verticalalignment='center', horizontalalignment='center',
-               bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.5),
-               family='monospace')
-        ax.axis('off')
-    
-    def export_data(self):
-        """Export analytics data to file (future feature)."""
-        pass
+        export_format = 'ndjson' if 'NDJSON' in selected_filter else 'csv'
+        try:
+            written = APIClient.export_history(file_path, export_format)
+            QMessageBox.information(self, "Export", f"Saved {written:,} bytes to {file_path}")
+        except Exception as e:
+            QMessageBox.critical(self, "Export Failed", str(e))
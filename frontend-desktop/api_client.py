@@ -1,11 +1,48 @@
 """API client for communicating with the backend."""
 
 import requests
-from typing import Optional, Dict, Any
+from collections import OrderedDict
+from urllib.parse import urlencode
+from typing import Optional, Dict, Any, Tuple
 from auth_manager import auth_manager
 from config import API_BASE_URL, API_TIMEOUT
 
 
+# url -> (ETag, parsed body) of the last 200 response for conditional GETs,
+# least recently used first. The ETag depends on the whole URL, since= included,
+# so every sync cursor is its own entry and only the newest few are kept.
+CONDITIONAL_CACHE_SIZE = 20
+_conditional_cache: "OrderedDict[str, Tuple[str, Dict[str, Any]]]" = OrderedDict()
+
+
+def _conditional_get(url: str) -> Dict[str, Any]:
+    """
+    GET a JSON resource, revalidating the local copy with If-None-Match.
+    
+    A 304 from the server means our cached body is still current, so it is
+    returned without downloading or parsing anything.
+    """
+    headers = {}
+    cached = _conditional_cache.get(url)
+    if cached:
+        headers['If-None-Match'] = cached[0]
+        _conditional_cache.move_to_end(url)
+    
+    response = auth_manager.request_with_retry('GET', url, headers=headers)
+    if response.status_code == 304 and cached:
+        return cached[1]
+    
+    response.raise_for_status()
+    data = response.json()
+    etag = response.headers.get('ETag')
+    if etag:
+        _conditional_cache[url] = (etag, data)
+        _conditional_cache.move_to_end(url)
+        if len(_conditional_cache) > CONDITIONAL_CACHE_SIZE:
+            _conditional_cache.popitem(last=False)
+    return data
+
+
 class APIClient:
     """Handles all API communication."""
     
@@ -97,26 +134,62 @@ class APIClient:
             raise Exception(f"File error: {str(e)}")
     
     @staticmethod
-    def get_history(limit: int = 10, offset: int = 0) -> Dict[str, Any]:
+    def get_history(limit: int = 10, offset: int = 0, since: Optional[str] = None,
+                    fields: Optional[str] = None) -> Dict[str, Any]:
         """
         Get upload history.
         
         Args:
             limit: Number of records to fetch
             offset: Offset for pagination
+            since: Only return uploads after this uploaded_at timestamp (optional)
+            fields: Comma separated fields to return, e.g. 'id' (optional, default all)
         
         Returns:
             Dictionary with history data
         """
+        try:
+            params = {'limit': limit, 'offset': offset}
+            if since:
+                params['since'] = since
+            if fields:
+                params['fields'] = fields
+            return _conditional_get(f"{API_BASE_URL}/get-history/?{urlencode(params)}")
+        except requests.exceptions.RequestException as e:
+            raise Exception(f"Fetch history failed: {str(e)}")
+    
+    @staticmethod
+    def export_history(file_path: str, export_format: str = 'ndjson') -> int:
+        """
+        Stream the full upload history to a file.
+        
+        The response is written to disk chunk by chunk as it arrives, so
+        memory use doesn't depend on how many uploads the user has.
+        
+        Args:
+            file_path: Destination file
+            export_format: 'ndjson' or 'csv'
+        
+        Returns:
+            Number of bytes written
+        """
         try:
             response = auth_manager.request_with_retry(
                 'GET',
-                f"{API_BASE_URL}/get-history/?limit={limit}&offset={offset}"
+                f"{API_BASE_URL}/export-history/?format={export_format}",
+                stream=True
             )
             response.raise_for_status()
-            return response.json()
+            written = 0
+            with open(file_path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    f.write(chunk)
+                    written += len(chunk)
+            return written
         except requests.exceptions.RequestException as e:
-            raise Exception(f"Fetch history failed: {str(e)}")
+            raise Exception(f"Export failed: {str(e)}")
+        except IOError as e:
+            raise Exception(f"File error: {str(e)}")
     
     @staticmethod
     def logout() -> None:
@@ -131,3 +204,4 @@ class APIClient:
             print(f"Error during logout: {e}")
         finally:
             auth_manager.clear_tokens()
+            _conditional_cache.clear()
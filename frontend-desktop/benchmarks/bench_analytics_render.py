@@ -0,0 +1,91 @@
+"""Time to switch charts and to update after an upload in AnalyticsScreen.
+
+    python benchmarks/bench_analytics_render.py [--datasets 1000] [--rounds 5]
+
+Builds the analytics screen offscreen over a throwaway local cache, then
+cycles through the four charts --rounds times and applies --rounds new
+uploads, timing each until Qt has finished drawing.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from bench_cache_startup import USER_ID, fill_cache  # noqa: E402
+
+
+def new_upload(dataset_id):
+    return {
+        'id': dataset_id,
+        'name': f"new_{dataset_id}.csv",
+        'uploaded_by': 'bench',
+        'uploaded_at': f"2027-01-01T00:00:00.{dataset_id % 1000000:06d}Z",
+        'total_rows': 500,
+        'invalid_rows': 0,
+        'flowrate_mean': 120.0, 'flowrate_min': 80.0, 'flowrate_max': 160.0, 'flowrate_count': 500,
+        'pressure_mean': 6.0, 'pressure_min': 3.0, 'pressure_max': 9.0, 'pressure_count': 500,
+        'temperature_mean': 100.0, 'temperature_min': 85.0, 'temperature_max': 115.0, 'temperature_count': 500,
+        'equipment_distribution': {'Pump': 10, 'Valve': 7, 'Compressor': 3},
+    }
+
+
+def settle(app):
+    # draw_idle() only schedules a paint, let the event loop run it
+    for _ in range(3):
+        app.processEvents()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--datasets', type=int, default=1000)
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    from PyQt5.QtWidgets import QApplication
+    from local_cache import LocalCache
+    from analytics_screen import AnalyticsScreen
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, 'history_cache.sqlite3')
+        fill_cache(path, args.datasets)
+        cache = LocalCache(path)
+
+        screen = AnalyticsScreen(cache=cache, user_id=USER_ID)
+        screen.resize(1000, 700)
+        screen.show()
+        settle(app)
+
+        switches = []
+        for _ in range(args.rounds):
+            for index in (1, 2, 3, 0):
+                start = time.perf_counter()
+                screen.chart_combo.setCurrentIndex(index)
+                settle(app)
+                switches.append((time.perf_counter() - start) * 1000)
+
+        updates = []
+        for i in range(args.rounds):
+            record = new_upload(args.datasets + 1 + i)
+            cache.upsert(USER_ID, [record])
+            start = time.perf_counter()
+            if hasattr(screen, 'add_datasets'):
+                screen.add_datasets([record])
+            else:
+                screen.load_analytics_data()
+            settle(app)
+            updates.append((time.perf_counter() - start) * 1000)
+
+    print(f"{args.datasets:,} datasets")
+    print(f"switch chart:       median {statistics.median(switches):7.2f} ms, max {max(switches):7.2f} ms")
+    print(f"update after upload: median {statistics.median(updates):7.2f} ms, max {max(updates):7.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
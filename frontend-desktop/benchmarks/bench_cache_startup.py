@@ -0,0 +1,104 @@
+"""Startup-to-first-render time with a warm local history cache.
+
+    python benchmarks/bench_cache_startup.py [--datasets 10000]
+
+Fills a throwaway cache with --datasets uploads, then measures what the
+dashboard does before anything is fetched from the server: opening the
+cache, reading the first page and loading the analytics data. With PyQt5
+installed it also times building the real DashboardScreen (offscreen, with
+the server unreachable) up to its first paint.
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+USER_ID = 1
+
+
+def fill_cache(path, count):
+    from local_cache import LocalCache
+
+    rng = random.Random(0)
+    cache = LocalCache(path)
+    cache.upsert(USER_ID, [
+        {
+            'id': i,
+            'name': f"shift_{i:07d}.csv",
+            'uploaded_by': 'bench',
+            'uploaded_at': f"2026-01-01T00:00:00.{i:06d}Z",
+            'total_rows': rng.randint(10, 5000),
+            'invalid_rows': 0,
+            'flowrate_mean': rng.uniform(50, 200), 'flowrate_min': 50.0, 'flowrate_max': 200.0, 'flowrate_count': 500,
+            'pressure_mean': rng.uniform(3, 10), 'pressure_min': 3.0, 'pressure_max': 10.0, 'pressure_count': 500,
+            'temperature_mean': rng.uniform(80, 120), 'temperature_min': 80.0, 'temperature_max': 120.0,
+            'temperature_count': 500,
+            'equipment_distribution': {'Pump': rng.randint(1, 50), 'Valve': rng.randint(1, 50)},
+        }
+        for i in range(1, count + 1)
+    ])
+
+
+def time_cache_reads(path):
+    from local_cache import LocalCache
+
+    start = time.perf_counter()
+    cache = LocalCache(path)
+    opened = time.perf_counter()
+    cache.page(USER_ID, 10, 0)
+    cache.count(USER_ID)
+    first_page = time.perf_counter()
+    cache.all_datasets(USER_ID)
+    analytics = time.perf_counter()
+    return {
+        'open cache': opened - start,
+        'first page + count': first_page - opened,
+        'analytics data (all rows)': analytics - first_page,
+    }
+
+
+def time_dashboard(workdir):
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5.QtWidgets import QApplication
+
+    import config
+    config.API_BASE_URL = 'http://127.0.0.1:9/api'  # nothing listens there -> offline
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    os.chdir(workdir)
+    start = time.perf_counter()
+    from dashboard_screen import DashboardScreen
+    screen = DashboardScreen({'id': USER_ID, 'username': 'bench'})
+    screen.show()
+    app.processEvents()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--datasets', type=int, default=10000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, 'history_cache.sqlite3')
+        fill_cache(path, args.datasets)
+
+        print(f"warm cache with {args.datasets:,} datasets")
+        for name, seconds in time_cache_reads(path).items():
+            print(f"{name:30} {seconds * 1000:8.2f} ms")
+
+        try:
+            import PyQt5  # noqa: F401
+        except ImportError:
+            print("PyQt5 not installed, skipping DashboardScreen first render")
+            return
+        print(f"{'DashboardScreen first render':30} {time_dashboard(workdir) * 1000:8.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
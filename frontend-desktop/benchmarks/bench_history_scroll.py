@@ -0,0 +1,90 @@
+"""Scripted scrolling through a virtualized 100k-row history table.
+
+    python benchmarks/bench_history_scroll.py [--rows 100000] [--steps 400] [--fetch-ms 2]
+
+Scrolls a QTableView backed by HistoryTableModel from top to bottom in
+--steps jumps (plus a short fling back up) and records the time of each
+frame: scroll, handle finished block loads, repaint the viewport. Rows come
+from a synthetic source that sleeps --fetch-ms per block to stand in for
+the SQLite cache. Runs offscreen, no display needed.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+
+def make_source(fetch_ms):
+    def fetch_page(limit, offset):
+        time.sleep(fetch_ms / 1000)
+        return [
+            {
+                'name': f"shift_{i:07d}.csv",
+                'total_rows': 100 + i % 900,
+                'flowrate_mean': 100 + i % 50, 'flowrate_min': 50, 'flowrate_max': 150,
+                'pressure_mean': 5 + i % 5, 'pressure_min': 3, 'pressure_max': 10,
+                'temperature_mean': 90 + i % 20, 'temperature_min': 80, 'temperature_max': 120,
+                'equipment_distribution': {'Pump': i % 7, 'Valve': i % 11},
+                'uploaded_at': '2026-01-01T00:00:00Z',
+            }
+            for i in range(offset, offset + limit)
+        ]
+    return fetch_page
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--steps', type=int, default=400)
+    parser.add_argument('--fetch-ms', type=float, default=2.0)
+    args = parser.parse_args()
+
+    from PyQt5.QtWidgets import QApplication, QTableView, QHeaderView
+    from history_model import HistoryTableModel
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    model = HistoryTableModel(make_source(args.fetch_ms))
+    view = QTableView()
+    view.setModel(model)
+    view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+    view.verticalHeader().setDefaultSectionSize(28)
+    view.resize(900, 600)
+    view.show()
+
+    start = time.perf_counter()
+    model.reset(args.rows)
+    app.processEvents()
+    print(f"reset to {args.rows:,} rows: {(time.perf_counter() - start) * 1000:.2f} ms")
+
+    bar = view.verticalScrollBar()
+    positions = [bar.maximum() * i // args.steps for i in range(args.steps + 1)]
+    positions += [bar.maximum() - bar.pageStep() * i for i in range(1, 50)]
+
+    frames = []
+    for value in positions:
+        start = time.perf_counter()
+        bar.setValue(max(0, value))
+        app.processEvents()
+        view.viewport().repaint()
+        frames.append((time.perf_counter() - start) * 1000)
+
+    # let the last loads land
+    while model._pending:
+        app.processEvents()
+
+    frames.sort()
+    print(f"frames:         {len(frames)}")
+    print(f"frame p50:      {statistics.median(frames):.2f} ms")
+    print(f"frame p95:      {frames[int(len(frames) * 0.95)]:.2f} ms")
+    print(f"frame max:      {frames[-1]:.2f} ms")
+    print(f"blocks loaded:  {model.blocks_loaded}")
+    print(f"blocks cached:  {model.cached_blocks()} (max {model.max_blocks})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""Startup import time of the desktop app, with a regression threshold.
+
+    python benchmarks/bench_startup_imports.py [--max-ms 400] [--runs 5]
+
+Runs `python -X importtime -c "import main"` in a fresh interpreter (best of
+--runs), prints the slowest modules and exits with status 1 when importing
+main takes longer than --max-ms or pulls in a module that must stay lazy
+(matplotlib, analytics_screen, dashboard_screen).
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Only needed after login / when the analytics tab is opened
+MUST_BE_LAZY = ('matplotlib', 'analytics_screen', 'dashboard_screen')
+
+
+def import_times():
+    """Return {module: cumulative microseconds} for one `import main`."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import main'],
+        cwd=APP_DIR, capture_output=True, text=True, check=True
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--max-ms', type=float, default=400.0)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+
+    runs = [import_times() for _ in range(args.runs)]
+    best = min(runs, key=lambda times: times['main'])
+    total_ms = best['main'] / 1000
+
+    print(f"import main: {total_ms:.1f} ms (best of {args.runs})")
+    print("slowest imports (cumulative):")
+    for name, us in sorted(best.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {us / 1000:8.1f} ms  {name}")
+
+    failed = False
+    eager = [name for name in MUST_BE_LAZY if name in best]
+    if eager:
+        print(f"FAIL: imported at startup but should be lazy: {', '.join(eager)}")
+        failed = True
+    if total_ms > args.max_ms:
+        print(f"FAIL: {total_ms:.1f} ms is over the {args.max_ms:.0f} ms threshold")
+        failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
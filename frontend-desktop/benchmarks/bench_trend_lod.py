@@ -0,0 +1,98 @@
+"""Redraw time of a full-history trend chart with and without downsampling.
+
+    python benchmarks/bench_trend_lod.py [--points 1000000] [--series 3] [--rounds 20]
+
+Draws --series random-walk lines of --points uploads each in an offscreen
+chart, first the way SeriesChart does (visible range downsampled to the
+canvas width), then handing every point to matplotlib, and times full
+view, zoom and pan redraws.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+
+def make_series(points, count):
+    import numpy as np
+    rng = np.random.default_rng(0)
+    return {
+        f"Type {i}": np.abs(np.cumsum(rng.normal(size=points))) + 10
+        for i in range(count)
+    }
+
+
+def time_views(chart, points, rounds):
+    """Median / max redraw time (ms) for the full view, zooms and pans."""
+    import numpy as np
+    rng = np.random.default_rng(1)
+    results = {}
+
+    def redraw(xmin, xmax):
+        start = time.perf_counter()
+        chart.ax.set_xlim(xmin, xmax)
+        chart.canvas.draw()
+        return (time.perf_counter() - start) * 1000
+
+    results['full view'] = [redraw(0, points + 1) for _ in range(rounds)]
+    results['zoom'] = []
+    for _ in range(rounds):
+        width = points / 10 ** rng.uniform(0.5, 4)
+        left = rng.uniform(0, points - width)
+        results['zoom'].append(redraw(left, left + width))
+    width = points / 20
+    results['pan'] = [redraw(left, left + width) for left in np.linspace(0, points - width, rounds)]
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--points', type=int, default=1000000)
+    parser.add_argument('--series', type=int, default=3)
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+
+    from PyQt5.QtWidgets import QApplication
+    from charts import SeriesChart
+
+    app = QApplication.instance() or QApplication(sys.argv)  # noqa: F841
+    series = make_series(args.points, args.series)
+
+    class SyntheticChart(SeriesChart):
+        def series(self):
+            return series
+
+    chart = SyntheticChart()
+    chart.canvas.resize(1000, 500)
+    chart.set_data([None])  # series() ignores the records
+    start = time.perf_counter()
+    chart.render()
+    chart.canvas.draw()
+    first = (time.perf_counter() - start) * 1000
+    lod = time_views(chart, args.points, args.rounds)
+
+    # every point handed to matplotlib, as plotting the raw history would
+    raw = SyntheticChart()
+    raw.canvas.resize(1000, 500)
+    for label, values in series.items():
+        raw.ax.plot(range(1, args.points + 1), values, label=label, linewidth=2)
+    start = time.perf_counter()
+    raw.canvas.draw()
+    raw_first = (time.perf_counter() - start) * 1000
+    full = time_views(raw, args.points, max(args.rounds // 4, 1))
+
+    print(f"{args.series} series x {args.points:,} points")
+    print(f"{'':12} {'downsampled':>24} {'all points':>24}")
+    print(f"{'first draw':12} {first:21.1f} ms {raw_first:21.1f} ms")
+    for name in lod:
+        print(f"{name:12} median {statistics.median(lod[name]):7.1f} max {max(lod[name]):6.1f} ms"
+              f"  median {statistics.median(full[name]):7.1f} max {max(full[name]):6.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
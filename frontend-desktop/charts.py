@@ -0,0 +1,263 @@
+"""Analytics charts that keep their matplotlib artists between updates."""
+
+import matplotlib
+matplotlib.use('Qt5Agg')
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+from matplotlib.figure import Figure
+import numpy as np
+from downsample import downsample, visible_range
+
+
+class Chart:
+    """
+    One chart with its own figure and canvas.
+
+    The axes and artists are created once; new data only updates them in
+    place and marks the chart dirty. A dirty chart is redrawn (with
+    draw_idle, so repeated updates coalesce into one paint) the next time
+    it is shown, charts that aren't visible are never redrawn.
+    """
+
+    zoomable = False  # gets a navigation toolbar in the analytics screen
+
+    def __init__(self):
+        self.figure = Figure(figsize=(12, 6), dpi=100)
+        self.canvas = FigureCanvas(self.figure)
+        self.ax = self.figure.add_subplot(111)
+        self.message = self.figure.text(0.5, 0.5, "", ha='center', va='center', fontsize=14)
+        self.history_data = []
+        self.dirty = True
+
+    def set_data(self, history_data):
+        """Use new history data (newest first) the next time the chart is shown."""
+        self.history_data = history_data
+        self.dirty = True
+
+    def render(self):
+        """Bring the artists up to date and schedule a redraw, if anything changed."""
+        if not self.dirty:
+            return
+        self.dirty = False
+        try:
+            self.message.set_text("")
+            self.ax.set_visible(True)
+            if not self.history_data:
+                self.show_message("No data available")
+            else:
+                self.update_artists()
+        except Exception as e:
+            self.show_message(f"Error: {str(e)}")
+        self.canvas.draw_idle()
+
+    def show_message(self, text):
+        self.ax.set_visible(False)
+        self.message.set_text(text)
+
+    def update_artists(self):
+        raise NotImplementedError
+
+
+class DistributionChart(Chart):
+    """Pie chart of equipment distribution from latest upload."""
+
+    def __init__(self):
+        super().__init__()
+        self._shown_id = None
+
+    def update_artists(self):
+        latest = self.history_data[0]
+        equipment_dist = latest.get('equipment_distribution', {})
+        if not equipment_dist:
+            self.show_message("No equipment distribution data")
+            return
+
+        # Only the latest upload is drawn, nothing to do unless it changed
+        if latest.get('id') == self._shown_id:
+            return
+        self._shown_id = latest.get('id')
+
+        # a handful of wedges, rebuilding them is cheaper than patching angles and labels
+        self.ax.clear()
+        labels = list(equipment_dist.keys())
+        sizes = list(equipment_dist.values())
+        colors = matplotlib.colormaps['Set3'](range(len(labels)))
+        self.ax.pie(sizes, labels=labels, autopct='%1.1f%%', colors=colors, startangle=90)
+        self.ax.set_title(f"Equipment Distribution\n({latest.get('name', 'Latest Upload')})",
+                          fontsize=12, fontweight='bold')
+
+
+class SeriesChart(Chart):
+    """
+    Line chart over the whole history, drawn at the canvas resolution.
+
+    The full series are kept as numpy arrays and only the points in the
+    visible x range, downsampled to about one per pixel column, are handed
+    to matplotlib. Zooming or panning (xlim_changed) and resizing pick the
+    points again, so detail appears as the user zooms in.
+    """
+
+    zoomable = True
+    marker_limit = 50  # show markers once this few points are visible
+
+    def __init__(self):
+        super().__init__()
+        self._x = None
+        self._series = {}
+        self._lines = {}
+        self.canvas.mpl_connect('resize_event', self._refine)
+
+    def series(self):
+        """Return {label: values} for the history, oldest upload first."""
+        raise NotImplementedError
+
+    def decorate(self):
+        """Set titles and labels after the axes were cleared."""
+
+    def update_artists(self):
+        series = self.series()
+        if not series:
+            self.show_message("No equipment data")
+            return
+
+        self._series = {label: np.asarray(values, dtype=float) for label, values in series.items()}
+        self._x = np.arange(1, len(next(iter(self._series.values()))) + 1, dtype=float)
+        if list(series) != list(self._lines):
+            self._build()
+
+        low = min(values.min() for values in self._series.values())
+        high = max(values.max() for values in self._series.values())
+        margin = (high - low) * 0.05 or 1
+        self.ax.set_ylim(low - margin, high + margin)
+        # triggers _refine with the new data
+        self.ax.set_xlim(self._x[0] - 0.5, self._x[-1] + 0.5)
+
+    def _build(self):
+        # clear() also drops the axes callbacks, so reconnect every time
+        self.ax.clear()
+        self.ax.callbacks.connect('xlim_changed', self._refine)
+        self._lines = {
+            label: self.ax.plot([], [], label=label, linewidth=2)[0]
+            for label in self._series
+        }
+        self.decorate()
+        self.ax.legend(loc='best')
+        self.ax.grid(True, alpha=0.3)
+        self.figure.tight_layout()
+
+    def _refine(self, *args):
+        if self._x is None or not self._lines:
+            return
+        xmin, xmax = self.ax.get_xlim()
+        lo, hi = visible_range(self._x, xmin, xmax)
+        width = max(int(self.ax.bbox.width), 100)
+        for label, line in self._lines.items():
+            xs, ys = downsample(self._x[lo:hi], self._series[label][lo:hi], width)
+            line.set_data(xs, ys)
+            line.set_marker('o' if len(xs) <= self.marker_limit else '')
+
+
+class AverageValuesChart(SeriesChart):
+    """Average values of every upload."""
+
+    def series(self):
+        uploads = self.history_data[::-1]
+        return {
+            'Avg Flowrate': [r.get('flowrate_mean') or 0 for r in uploads],
+            'Avg Pressure': [r.get('pressure_mean') or 0 for r in uploads],
+            'Avg Temperature': [r.get('temperature_mean') or 0 for r in uploads],
+        }
+
+    def decorate(self):
+        self.ax.set_xlabel('Upload # (oldest → newest)', fontweight='bold')
+        self.ax.set_ylabel('Value', fontweight='bold')
+        self.ax.set_title('Average Values Across Uploads', fontsize=12, fontweight='bold')
+
+
+class TrendsChart(SeriesChart):
+    """Count of each equipment type in every upload."""
+
+    def series(self):
+        uploads = self.history_data[::-1]
+        equipment_types = {}
+        for upload in uploads:
+            for equipment in upload.get('equipment_distribution', {}):
+                equipment_types.setdefault(equipment, None)
+
+        # a type missing from an upload counts as 0 so every line has a point per upload
+        return {
+            equipment: [upload.get('equipment_distribution', {}).get(equipment, 0) for upload in uploads]
+            for equipment in equipment_types
+        }
+
+    def decorate(self):
+        self.ax.set_xlabel('Upload # (oldest → newest)', fontweight='bold')
+        self.ax.set_ylabel('Count', fontweight='bold')
+        self.ax.set_title('Equipment Type Trends Over Time', fontsize=12, fontweight='bold')
+
+
+def value_count(upload, column):
+    """
+    How many values the upload's mean of a column is over.
+
+    Uploads from before counts were stored have a mean but a count of 0;
+    their rows stand in for it, as in the server's retention rollups.
+    """
+    if upload.get(f'{column}_mean') is None:
+        return 0
+    return upload.get(f'{column}_count') or upload.get('total_rows') or 0
+
+
+def overall_stats(uploads, column):
+    """Mean of a column over every row of every upload, with its min and max."""
+    counts = [value_count(r, column) for r in uploads]
+    count = sum(counts)
+    if not count:
+        return 'N/A'
+    # each upload's mean weighted by how many values it had
+    total = sum((r.get(f'{column}_mean') or 0) * n for r, n in zip(uploads, counts))
+    low = min((r[f'{column}_min'] for r in uploads if r.get(f'{column}_min') is not None), default=None)
+    high = max((r[f'{column}_max'] for r in uploads if r.get(f'{column}_max') is not None), default=None)
+    if low is None:
+        # only uploads from before min / max were stored
+        return f"{total / count:.2f}"
+    return f"{total / count:.2f} ({low:.2f}-{high:.2f})"
+
+
+class UploadStatsChart(Chart):
+    """Summary statistics as text."""
+
+    def __init__(self):
+        super().__init__()
+        self.ax.axis('off')
+        self._text = self.ax.text(
+            0.5, 0.5, "", transform=self.ax.transAxes,
+            fontsize=11, verticalalignment='center', horizontalalignment='center',
+            bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.5),
+            family='monospace'
+        )
+
+    def update_artists(self):
+        total_uploads = len(self.history_data)
+        total_records = sum([r.get('total_rows', 0) for r in self.history_data])
+        flowrate = overall_stats(self.history_data, 'flowrate')
+        pressure = overall_stats(self.history_data, 'pressure')
+        temperature = overall_stats(self.history_data, 'temperature')
+
+        self._text.set_text(f"""
+        UPLOAD STATISTICS
+        ═══════════════════════════════════════
+
+        Total Uploads:                    {total_uploads}
+
+        Total Records Uploaded:           {total_records:,}
+
+        Flowrate (All):                   {flowrate}
+
+        Pressure (All):                   {pressure}
+
+        Temperature (All):                {temperature}
+
+        Average Records/Upload:           {total_records/total_uploads:.0f} records
+
+        Latest Upload:                    {self.history_data[0].get('name', 'N/A')}
+        """)
@@ -4,9 +4,15 @@
 API_BASE_URL = "http://localhost:8000/api"
 API_TIMEOUT = 10  # seconds
 
+# Server-Sent Events stream of new uploads (needs the backend running under ASGI)
+LIVE_UPDATES_URL = f"{API_BASE_URL}/events/"
+
 # Token Configuration
 TOKEN_STORAGE_FILE = "auth_tokens.json"
 
+# Local history cache (SQLite), used for instant pages and offline mode
+LOCAL_CACHE_FILE = "history_cache.sqlite3"
+
 # UI Configuration
 WINDOW_WIDTH = 900
 WINDOW_HEIGHT = 700
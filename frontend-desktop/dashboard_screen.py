@@ -2,14 +2,16 @@
 
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, 
-    QTableWidget, QTableWidgetItem, QFileDialog, QMessageBox,
+    QTableView, QFileDialog, QMessageBox,
     QTabWidget, QScrollArea, QHeaderView
 )
-from PyQt5.QtCore import Qt, pyqtSignal, QThread
+from PyQt5.QtCore import Qt, pyqtSignal, QThread, QTimer
 from PyQt5.QtGui import QFont
 from api_client import APIClient
 from auth_manager import auth_manager
-from analytics_screen import AnalyticsScreen
+from local_cache import LocalCache, sync_history
+from history_model import HistoryTableModel, format_stats
+from live_updates import LiveUpdatesThread
 
 
 class UploadWorker:
@@ -25,9 +27,13 @@ class DashboardScreen(QWidget):
     def __init__(self, user_data=None, parent=None):
         super().__init__(parent)
         self.user_data = user_data or {}
-        self.current_page = 0
+        self.user_id = self.user_data.get('id')
+        self.cache = LocalCache()
         self.init_ui()
+        # Render what we already have, then fetch only what's new
         self.load_history()
+        QTimer.singleShot(0, self.sync_history)
+        self.start_live_updates()
     
     def init_ui(self):
         """Initialize the UI."""
@@ -45,6 +51,10 @@ class DashboardScreen(QWidget):
         
         top_layout.addStretch()
         
+        self.offline_label = QLabel("")
+        self.offline_label.setStyleSheet("color: #dc3545; font-weight: bold;")
+        top_layout.addWidget(self.offline_label)
+        
         logout_btn = QPushButton("Logout")
         logout_btn.setMinimumWidth(100)
         logout_btn.setMinimumHeight(35)
@@ -80,10 +90,12 @@ class DashboardScreen(QWidget):
         history_widget = self.create_history_tab()
         tab_widget.addTab(history_widget, "Upload History")
         
-        # Analytics tab
-        self.analytics_screen = AnalyticsScreen()
-        self.analytics_screen.back_requested.connect(lambda: tab_widget.setCurrentIndex(1))
-        tab_widget.addTab(self.analytics_screen, "📊 Analytics")
+        # Analytics tab: a placeholder until the tab is first opened, the real
+        # screen (matplotlib and all) is built in on_tab_changed
+        self.analytics_screen = None
+        self.analytics_tab_index = tab_widget.addTab(QWidget(), "📊 Analytics")
+        tab_widget.currentChanged.connect(self.on_tab_changed)
+        self.tab_widget = tab_widget
         
         layout.addWidget(tab_widget)
         
@@ -181,15 +193,18 @@ class DashboardScreen(QWidget):
         title.setFont(QFont("Arial", 12, QFont.Bold))
         layout.addWidget(title)
         
-        # Table
-        self.history_table = QTableWidget()
-        self.history_table.setColumnCount(6)
-        self.history_table.setHorizontalHeaderLabels([
-            "File Name", "Total Rows", "Avg FlowRate", "Avg Power", "Equipment Types", "Date"
-        ])
+        # Table (virtualized: rows are loaded from the local cache in blocks while scrolling)
+        self.history_model = HistoryTableModel(
+            lambda limit, offset: self.cache.page(self.user_id, limit, offset)
+        )
+        self.history_table = QTableView()
+        self.history_table.setModel(self.history_model)
         self.history_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        # Fixed row heights so the view never has to measure rows it isn't showing
+        self.history_table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.history_table.verticalHeader().setDefaultSectionSize(28)
         self.history_table.setStyleSheet("""
-            QTableWidget {
+            QTableView {
                 gridline-color: #ddd;
                 background-color: white;
             }
@@ -202,62 +217,31 @@ class DashboardScreen(QWidget):
         """)
         layout.addWidget(self.history_table)
         
-        # Pagination buttons
-        pagination_layout = QHBoxLayout()
-        pagination_layout.addStretch()
-        
-        self.prev_btn = QPushButton("Previous")
-        self.prev_btn.setMinimumWidth(100)
-        self.prev_btn.clicked.connect(self.previous_page)
-        self.prev_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #6c757d;
-                color: white;
-                border: none;
-                border-radius: 5px;
-                padding: 5px 10px;
-            }
-            QPushButton:hover:!disabled {
-                background-color: #5a6268;
-            }
-            QPushButton:disabled {
-                background-color: #ccc;
-                color: #999;
-            }
-        """)
-        pagination_layout.addWidget(self.prev_btn)
-        
-        self.page_label = QLabel("Page 1")
-        self.page_label.setFont(QFont("Arial", 10))
-        pagination_layout.addWidget(self.page_label)
+        self.history_count_label = QLabel("0 uploads")
+        self.history_count_label.setFont(QFont("Arial", 10))
+        self.history_count_label.setStyleSheet("color: #666;")
+        layout.addWidget(self.history_count_label)
         
-        self.next_btn = QPushButton("Next")
-        self.next_btn.setMinimumWidth(100)
-        self.next_btn.clicked.connect(self.next_page)
-        self.next_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #6c757d;
-                color: white;
-                border: none;
-                border-radius: 5px;
-                padding: 5px 10px;
-            }
-            QPushButton:hover:!disabled {
-                background-color: #5a6268;
-            }
-            QPushButton:disabled {
-                background-color: #ccc;
-                color: #999;
-            }
-        """)
-        pagination_layout.addWidget(self.next_btn)
+        widget.setLayout(layout)
+        return widget
+    
+    def on_tab_changed(self, index):
+        """Build the analytics screen the first time its tab is opened."""
+        if index != self.analytics_tab_index or self.analytics_screen is not None:
+            return
         
-        pagination_layout.addStretch()
+        from analytics_screen import AnalyticsScreen
         
-        layout.addLayout(pagination_layout)
+        self.analytics_screen = AnalyticsScreen(cache=self.cache, user_id=self.user_id)
+        self.analytics_screen.back_requested.connect(lambda: self.tab_widget.setCurrentIndex(1))
         
-        widget.setLayout(layout)
-        return widget
+        placeholder = self.tab_widget.widget(index)
+        self.tab_widget.blockSignals(True)
+        self.tab_widget.removeTab(index)
+        self.tab_widget.insertTab(index, self.analytics_screen, "📊 Analytics")
+        self.tab_widget.setCurrentIndex(index)
+        self.tab_widget.blockSignals(False)
+        placeholder.deleteLater()
     
     def browse_file(self):
         """Open file browser to select a CSV file."""
@@ -288,17 +272,18 @@ class DashboardScreen(QWidget):
                 self,
                 "Success",
                 f"File uploaded successfully!\n\n"
-                f"Records: {result.get('total_rows', 'N/A')}\n"
-                f"Avg FlowRate: {result.get('avg_usage_hours', 'N/A'):.2f}\n"
-                f"Avg Power (Pressure): {result.get('avg_power', 'N/A'):.2f}"
+                f"Records: {result.get('total_rows', 'N/A')} ({result.get('invalid_rows') or 0} invalid)\n"
+                f"Flowrate: {format_stats(result, 'flowrate')}\n"
+                f"Pressure: {format_stats(result, 'pressure')}\n"
+                f"Temperature: {format_stats(result, 'temperature')}"
             )
             
-            # Refresh history
-            self.current_page = 0
-            self.load_history()
-            
-            # Refresh analytics
-            self.analytics_screen.load_analytics_data()
+            # Store the new dataset locally and apply it as a delta. Uploads from
+            # other sessions arrive as live updates; without them, pick those up now.
+            self.cache.upsert(self.user_id, [result])
+            self.apply_new_datasets([result])
+            if not self.live_connected:
+                self.sync_history()
             
             # Reset file selection
             self.file_path_label.setText("No file selected")
@@ -310,62 +295,59 @@ class DashboardScreen(QWidget):
             self.upload_btn.setEnabled(True)
             self.upload_btn.setText("Upload File")
     
-    def load_history(self):
-        """Load upload history from API."""
+    def sync_history(self):
+        """Fetch uploads newer than the local cache, then refresh the views."""
         try:
-            limit = 10
-            offset = self.current_page * limit
-            data = APIClient.get_history(limit, offset)
-            
-            # Clear table
-            self.history_table.setRowCount(0)
-            
-            # Populate table
-            records = data.get('results', [])
-            for row_idx, record in enumerate(records):
-                self.history_table.insertRow(row_idx)
-                
-                self.history_table.setItem(row_idx, 0, QTableWidgetItem(record.get('name', 'N/A')))
-                self.history_table.setItem(row_idx, 1, QTableWidgetItem(str(record.get('total_rows', 'N/A'))))
-                self.history_table.setItem(row_idx, 2, QTableWidgetItem(f"{float(record.get('avg_usage_hours', 0)):.2f}"))
-                self.history_table.setItem(row_idx, 3, QTableWidgetItem(f"{float(record.get('avg_power', 0)):.2f}"))
-                
-                # Equipment distribution - format nicely
-                equipment_dist = record.get('equipment_distribution', {})
-                if isinstance(equipment_dist, dict):
-                    dist_str = ", ".join([f"{k}: {v}" for k, v in equipment_dist.items()])
-                else:
-                    dist_str = str(equipment_dist)
-                self.history_table.setItem(row_idx, 4, QTableWidgetItem(dist_str))
-                
-                # Date
-                uploaded_at = record.get('uploaded_at', 'N/A')
-                if uploaded_at != 'N/A':
-                    uploaded_at = uploaded_at[:10]  # Format: YYYY-MM-DD
-                self.history_table.setItem(row_idx, 5, QTableWidgetItem(uploaded_at))
-            
-            # Update pagination
-            total = data.get('count', 0)
-            limit = data.get('limit', 10)
-            total_pages = (total + limit - 1) // limit if total > 0 else 1
-            self.page_label.setText(f"Page {self.current_page + 1} of {total_pages}")
-            
-            self.prev_btn.setEnabled(self.current_page > 0)
-            self.next_btn.setEnabled(self.current_page < total_pages - 1)
-            
-        except Exception as e:
-            QMessageBox.warning(self, "Error", f"Failed to load history: {str(e)}")
-    
-    def previous_page(self):
-        """Go to previous page."""
-        if self.current_page > 0:
-            self.current_page -= 1
+            records, removed = sync_history(self.cache, self.user_id)
+            self.offline_label.setText("")
+        except Exception:
+            # Server unreachable, keep showing the cached data
+            self.offline_label.setText("Offline - showing cached data")
+            return
+        
+        if removed:
+            # datasets went away on the server, the charts start over from the cache
             self.load_history()
+            if self.analytics_screen is not None:
+                self.analytics_screen.load_analytics_data()
+        elif records:
+            self.apply_new_datasets(records)
+    
+    def start_live_updates(self):
+        """Listen for uploads made from other sessions of this user."""
+        self.live_connected = False
+        self.live_updates = LiveUpdatesThread(self)
+        self.live_updates.dataset_created.connect(self.on_live_dataset)
+        self.live_updates.resync_needed.connect(self.sync_history)
+        self.live_updates.connection_changed.connect(self.on_live_connection_changed)
+        self.live_updates.start()
+    
+    def stop_live_updates(self):
+        """Close the live update stream (before the dashboard goes away)."""
+        self.live_updates.stop()
     
-    def next_page(self):
-        """Go to next page."""
-        self.current_page += 1
+    def on_live_connection_changed(self, connected):
+        self.live_connected = connected
+    
+    def on_live_dataset(self, record):
+        """Apply a dataset pushed by the server, without refetching anything."""
+        self.cache.upsert(self.user_id, [record])
+        self.apply_new_datasets([record])
+    
+    def apply_new_datasets(self, records):
+        """Show datasets that were just added to the local cache."""
         self.load_history()
+        if self.analytics_screen is not None:
+            self.analytics_screen.add_datasets(records)
+    
+    def load_history(self):
+        """Point the history table at the current contents of the local cache."""
+        try:
+            total = self.cache.count(self.user_id)
+            self.history_model.reset(total)
+            self.history_count_label.setText(f"{total:,} uploads")
+        except Exception as e:
+            QMessageBox.warning(self, "Error", f"Failed to load history: {str(e)}")
     
     def on_logout_clicked(self):
         """Handle logout."""
@@ -377,5 +359,7 @@ class DashboardScreen(QWidget):
         )
         
         if reply == QMessageBox.Yes:
+            self.stop_live_updates()
             APIClient.logout()
+            self.cache.clear(self.user_id)
             self.logout_requested.emit()
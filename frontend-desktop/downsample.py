@@ -0,0 +1,93 @@
+"""Downsampling of long line series for plotting."""
+
+import numpy as np
+
+
+def visible_range(x, xmin, xmax):
+    """
+    Index range of the points of sorted `x` needed to draw [xmin, xmax].
+
+    One extra point is kept on each side so the lines run to the edges of
+    the axes instead of stopping at the last point inside them.
+    """
+    lo = max(int(np.searchsorted(x, xmin, side='left')) - 1, 0)
+    hi = min(int(np.searchsorted(x, xmax, side='right')) + 1, len(x))
+    return lo, hi
+
+
+def minmax(x, y, n_out):
+    """
+    Keep the smallest and largest point of each of n_out / 2 buckets.
+
+    Spikes survive no matter how many points share a pixel column, and it
+    is fully vectorized, so it is used to cut huge inputs down first.
+    """
+    n = len(x)
+    buckets = n_out // 2
+    if n <= n_out or buckets < 2:
+        return x, y
+
+    size = -(-n // buckets)  # ceil
+    buckets = -(-n // size)
+    # pad the last bucket with copies of the last point, padded picks map back to it
+    padded = np.empty(buckets * size, dtype=y.dtype)
+    padded[:n] = y
+    padded[n:] = y[n - 1]
+    padded = padded.reshape(buckets, size)
+
+    offsets = np.arange(buckets) * size
+    lows = np.minimum(offsets + padded.argmin(axis=1), n - 1)
+    highs = np.minimum(offsets + padded.argmax(axis=1), n - 1)
+    # keep each bucket's pair in x order, and always keep the end points
+    index = np.concatenate(([0], np.sort(np.stack([lows, highs], axis=1), axis=1).ravel(), [n - 1]))
+    index = index[np.concatenate(([True], np.diff(index) > 0))]
+    return x[index], y[index]
+
+
+def lttb(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets: pick n_out points that keep the shape.
+
+    First and last points are always kept; from every bucket in between
+    the point forming the largest triangle with the previously kept point
+    and the average of the next bucket is chosen.
+    """
+    n = len(x)
+    if n <= n_out or n_out < 3:
+        return x, y
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    # average of every bucket, used as the third corner of the triangle
+    counts = np.diff(edges)
+    avg_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1) / counts
+    avg_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1) / counts
+    avg_x = np.append(avg_x[1:], x[n - 1])
+    avg_y = np.append(avg_y[1:], y[n - 1])
+
+    index = np.empty(n_out, dtype=np.int64)
+    index[0] = 0
+    index[-1] = n - 1
+    prev = 0
+    for bucket in range(n_out - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        bx = x[start:end]
+        by = y[start:end]
+        area = np.abs((x[prev] - avg_x[bucket]) * (by - y[prev])
+                      - (x[prev] - bx) * (avg_y[bucket] - y[prev]))
+        prev = start + int(area.argmax())
+        index[bucket + 1] = prev
+    return x[index], y[index]
+
+
+def downsample(x, y, n_out):
+    """
+    Reduce a series to about n_out points for drawing.
+
+    Inputs much larger than n_out are first cut down with minmax (cheap,
+    keeps spikes), then LTTB picks the final points.
+    """
+    if len(x) <= n_out:
+        return x, y
+    if len(x) > 8 * n_out:
+        x, y = minmax(x, y, 4 * n_out)
+    return lttb(x, y, n_out)
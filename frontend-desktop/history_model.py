@@ -0,0 +1,166 @@
+"""Virtualized table model for the upload history."""
+
+from collections import OrderedDict
+from typing import Callable, Dict, Any, List
+from PyQt5.QtCore import (
+    Qt, QAbstractTableModel, QModelIndex, QObject, QRunnable, QThreadPool, pyqtSignal
+)
+
+
+HEADERS = [
+    "File Name", "Total Rows", "Flowrate (min-max)", "Pressure (min-max)", "Temperature (min-max)",
+    "Equipment Types", "Date"
+]
+
+
+def format_stats(record: Dict[str, Any], column: str) -> str:
+    """A column's mean with its range, e.g. "120.00 (95.00-140.00)"."""
+    mean = record.get(f'{column}_mean')
+    if mean is None:
+        return 'N/A'  # no values in this column
+    low, high = record.get(f'{column}_min'), record.get(f'{column}_max')
+    if low is None or high is None:
+        return f"{float(mean):.2f}"
+    return f"{float(mean):.2f} ({float(low):.2f}-{float(high):.2f})"
+
+
+def format_record(record: Dict[str, Any]) -> tuple:
+    """Turn a history record into the display strings of one table row."""
+    equipment_dist = record.get('equipment_distribution', {})
+    if isinstance(equipment_dist, dict):
+        dist_str = ", ".join([f"{k}: {v}" for k, v in equipment_dist.items()])
+    else:
+        dist_str = str(equipment_dist)
+
+    uploaded_at = record.get('uploaded_at') or 'N/A'
+    if uploaded_at != 'N/A':
+        uploaded_at = uploaded_at[:10]  # Format: YYYY-MM-DD
+
+    total_rows = str(record.get('total_rows', 'N/A'))
+    if record.get('invalid_rows'):
+        total_rows += f" ({record['invalid_rows']} invalid)"
+
+    return (
+        record.get('name', 'N/A'),
+        total_rows,
+        format_stats(record, 'flowrate'),
+        format_stats(record, 'pressure'),
+        format_stats(record, 'temperature'),
+        dist_str,
+        uploaded_at,
+    )
+
+
+class _BlockSignals(QObject):
+    """Signals for _BlockLoader (QRunnable can't have its own)."""
+
+    loaded = pyqtSignal(int, int, list)  # generation, block, rows
+
+
+class _BlockLoader(QRunnable):
+    """Fetches and formats one block of rows on a thread pool thread."""
+
+    def __init__(self, fetch_page, generation, block, block_size):
+        super().__init__()
+        self.fetch_page = fetch_page
+        self.generation = generation
+        self.block = block
+        self.block_size = block_size
+        self.signals = _BlockSignals()
+
+    def run(self):
+        try:
+            records = self.fetch_page(self.block_size, self.block * self.block_size)
+            rows = [format_record(r) for r in records]
+        except Exception as e:
+            print(f"Error loading history rows: {e}")
+            rows = []
+        self.signals.loaded.emit(self.generation, self.block, rows)
+
+
+class HistoryTableModel(QAbstractTableModel):
+    """
+    Table model that only holds the blocks of rows the view has asked for.
+
+    Rows are fetched in blocks of `block_size` in the background the first
+    time the view paints them, and at most `max_blocks` blocks are kept
+    (least recently used are dropped), so memory stays bounded no matter
+    how many uploads the user has.
+    """
+
+    def __init__(self, fetch_page: Callable[[int, int], List[Dict[str, Any]]],
+                 block_size: int = 200, max_blocks: int = 20, parent=None):
+        super().__init__(parent)
+        self.fetch_page = fetch_page
+        self.block_size = block_size
+        self.max_blocks = max_blocks
+        self.total_rows = 0
+        self.blocks_loaded = 0
+        self._blocks: "OrderedDict[int, list]" = OrderedDict()
+        # (generation, block) -> loader still running, keeps the loader and its signals alive
+        self._pending: Dict[tuple, _BlockLoader] = {}
+        self._generation = 0
+        self._pool = QThreadPool.globalInstance()
+
+    def reset(self, total_rows: int) -> None:
+        """Drop every cached block and start over with a new row count."""
+        self.beginResetModel()
+        self.total_rows = total_rows
+        self._blocks.clear()
+        # blocks still loading for the old data are dropped when they arrive
+        self._generation += 1
+        self.endResetModel()
+
+    def cached_blocks(self) -> int:
+        return len(self._blocks)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.total_rows
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.ToolTipRole):
+            return None
+
+        block, row_in_block = divmod(index.row(), self.block_size)
+        rows = self._blocks.get(block)
+        if rows is None:
+            self._request_block(block)
+            return "Loading..." if index.column() == 0 else ""
+
+        self._blocks.move_to_end(block)
+        if row_in_block >= len(rows):
+            return ""
+        return rows[row_in_block][index.column()]
+
+    def _request_block(self, block: int) -> None:
+        key = (self._generation, block)
+        if key in self._pending:
+            return
+        loader = _BlockLoader(self.fetch_page, self._generation, block, self.block_size)
+        loader.setAutoDelete(False)
+        loader.signals.loaded.connect(self._on_block_loaded)
+        self._pending[key] = loader
+        self._pool.start(loader)
+
+    def _on_block_loaded(self, generation: int, block: int, rows: list) -> None:
+        self._pending.pop((generation, block), None)
+        if generation != self._generation:
+            return
+        self._blocks[block] = rows
+        self.blocks_loaded += 1
+
+        while len(self._blocks) > self.max_blocks:
+            self._blocks.popitem(last=False)
+
+        first = block * self.block_size
+        last = min(first + self.block_size, self.total_rows) - 1
+        if last >= first:
+            self.dataChanged.emit(self.index(first, 0), self.index(last, len(HEADERS) - 1))
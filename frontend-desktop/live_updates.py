@@ -0,0 +1,107 @@
+"""Background listener for live "dataset created" events from the server."""
+
+import json
+import socket
+from typing import Optional
+import requests
+from PyQt5.QtCore import QThread, pyqtSignal
+from auth_manager import auth_manager
+from config import LIVE_UPDATES_URL, API_TIMEOUT
+
+
+# The server sends a keepalive every 25s, a read waiting much longer means the
+# connection is dead
+READ_TIMEOUT = 60
+MAX_BACKOFF = 60  # seconds between reconnect attempts, at most
+
+
+class LiveUpdatesThread(QThread):
+    """
+    Keeps a Server-Sent Events stream open and turns its events into signals.
+
+    Reconnects with exponential backoff when the connection drops; after a
+    reconnect `resync_needed` is emitted since events may have been missed.
+    Gives up if the server doesn't offer the stream (e.g. it runs under WSGI).
+    """
+
+    dataset_created = pyqtSignal(dict)
+    resync_needed = pyqtSignal()
+    connection_changed = pyqtSignal(bool)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._response: Optional[requests.Response] = None
+
+    def run(self):
+        backoff = 1
+        connected_before = False
+        while not self.isInterruptionRequested():
+            try:
+                response = requests.get(
+                    LIVE_UPDATES_URL,
+                    headers={'Authorization': f'Bearer {auth_manager.access_token}'},
+                    stream=True,
+                    timeout=(API_TIMEOUT, READ_TIMEOUT)
+                )
+                self._response = response
+                if response.status_code == 404:
+                    return
+                if response.status_code == 401:
+                    # token expired (the server also closes the stream when it
+                    # does); reconnect after the backoff below like any other
+                    # drop, so a server that keeps answering 401 isn't hammered
+                    if not auth_manager.refresh_access_token():
+                        return
+                else:
+                    response.raise_for_status()
+                    self.connection_changed.emit(True)
+                    if connected_before:
+                        self.resync_needed.emit()
+                    connected_before = True
+                    backoff = 1
+
+                    for line in response.iter_lines(decode_unicode=True):
+                        if self.isInterruptionRequested():
+                            return
+                        if line and line.startswith('data:'):
+                            self.handle_event(json.loads(line[5:]))
+            except (requests.RequestException, ValueError, AttributeError):
+                # connection dropped, or closed by stop()
+                pass
+            finally:
+                if self._response is not None:
+                    self._response.close()
+                    self._response = None
+
+            if self.isInterruptionRequested():
+                return
+            self.connection_changed.emit(False)
+            self.wait_interruptible(backoff)
+            backoff = min(backoff * 2, MAX_BACKOFF)
+
+    def handle_event(self, event):
+        if event.get('type') == 'dataset.created':
+            self.dataset_created.emit(event['dataset'])
+        elif event.get('type') == 'resync':
+            self.resync_needed.emit()
+
+    def wait_interruptible(self, seconds):
+        for _ in range(seconds * 10):
+            if self.isInterruptionRequested():
+                return
+            self.msleep(100)
+
+    def stop(self):
+        """Close the stream and wait for the thread to finish."""
+        self.requestInterruption()
+        response = self._response
+        if response is not None:
+            # Shut the socket down to wake the blocked read in run(); close()
+            # would wait for the reader's lock, i.e. for the next keepalive
+            sock = getattr(getattr(response.raw, 'connection', None), 'sock', None)
+            try:
+                if sock is not None:
+                    sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        self.wait(2000)
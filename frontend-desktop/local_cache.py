@@ -0,0 +1,243 @@
+"""Local SQLite cache of the user's upload history."""
+
+import json
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, List, Tuple
+from api_client import APIClient
+from config import LOCAL_CACHE_FILE
+
+
+SYNC_PAGE_SIZE = 500
+
+# ids only, when the cache and the server disagree on how many datasets there are
+PRUNE_PAGE_SIZE = 5000
+
+# PRAGMA user_version of the cache file; older files are emptied (_create_schema)
+SCHEMA_VERSION = 2
+
+# mean / min / max / count of every numeric column, as the history API sends them
+AGGREGATE_COLUMNS = tuple(
+    f'{column}_{stat}'
+    for column in ('flowrate', 'pressure', 'temperature')
+    for stat in ('mean', 'min', 'max', 'count')
+)
+
+_COLUMNS = (
+    'id', 'name', 'uploaded_by', 'uploaded_at', 'total_rows', 'invalid_rows',
+    *AGGREGATE_COLUMNS, 'equipment_distribution'
+)
+
+
+class LocalCache:
+    """
+    On-disk copy of the datasets the server returned for each user.
+
+    Pages and analytics are served from here, so the dashboard renders
+    without waiting for the network and keeps working offline. Each thread
+    gets its own SQLite connection.
+    """
+
+    def __init__(self, path: str = LOCAL_CACHE_FILE):
+        self.path = path
+        self._local = threading.local()
+        self._create_schema()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's connection, opening it on first use."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def _create_schema(self) -> None:
+        conn = self._connection()
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version < SCHEMA_VERSION:
+            # Written by an older version (other columns, uploaded_at as the
+            # server sent it): it's only a copy, the next sync fills it again
+            conn.execute("DROP TABLE IF EXISTS datasets")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS datasets (
+                id INTEGER PRIMARY KEY,
+                user_id INTEGER NOT NULL,
+                name TEXT,
+                uploaded_by TEXT,
+                uploaded_at TEXT,
+                total_rows INTEGER,
+                invalid_rows INTEGER,
+                flowrate_mean REAL,
+                flowrate_min REAL,
+                flowrate_max REAL,
+                flowrate_count INTEGER,
+                pressure_mean REAL,
+                pressure_min REAL,
+                pressure_max REAL,
+                pressure_count INTEGER,
+                temperature_mean REAL,
+                temperature_min REAL,
+                temperature_max REAL,
+                temperature_count INTEGER,
+                equipment_distribution TEXT
+            );
+            CREATE INDEX IF NOT EXISTS datasets_user_uploaded
+                ON datasets (user_id, uploaded_at DESC, id DESC);
+        """)
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.commit()
+
+    def upsert(self, user_id: int, records: List[Dict[str, Any]]) -> None:
+        """Insert or replace records as returned by the history API."""
+        conn = self._connection()
+        conn.executemany(
+            f"""
+            INSERT OR REPLACE INTO datasets (user_id, {', '.join(_COLUMNS)})
+            VALUES ({', '.join('?' * (len(_COLUMNS) + 1))})
+            """,
+            [
+                (
+                    user_id, r.get('id'), r.get('name'), r.get('uploaded_by'),
+                    normalize_timestamp(r.get('uploaded_at')), r.get('total_rows'), r.get('invalid_rows'),
+                    *(r.get(column) for column in AGGREGATE_COLUMNS),
+                    json.dumps(r.get('equipment_distribution') or {})
+                )
+                for r in records
+            ]
+        )
+        conn.commit()
+
+    def latest_uploaded_at(self, user_id: int) -> Optional[str]:
+        """Timestamp of the newest cached dataset, or None if nothing is cached."""
+        row = self._connection().execute(
+            """
+            SELECT uploaded_at FROM datasets
+            WHERE user_id = ?
+            ORDER BY uploaded_at DESC, id DESC
+            LIMIT 1
+            """,
+            (user_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def count(self, user_id: int) -> int:
+        """Number of cached datasets for the user."""
+        row = self._connection().execute(
+            "SELECT COUNT(*) FROM datasets WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        return row[0]
+
+    def page(self, user_id: int, limit: int, offset: int) -> List[Dict[str, Any]]:
+        """Datasets newest first, same order and shape as the history API."""
+        rows = self._connection().execute(
+            f"""
+            SELECT {', '.join(_COLUMNS)} FROM datasets
+            WHERE user_id = ?
+            ORDER BY uploaded_at DESC, id DESC
+            LIMIT ? OFFSET ?
+            """,
+            (user_id, limit, offset)
+        ).fetchall()
+        return [self._to_record(row) for row in rows]
+
+    def all_datasets(self, user_id: int) -> List[Dict[str, Any]]:
+        """Every cached dataset for the user, newest first."""
+        return self.page(user_id, -1, 0)
+
+    def prune(self, user_id: int, keep_ids: set) -> int:
+        """Delete the user's cached datasets whose id isn't in keep_ids, returns how many."""
+        conn = self._connection()
+        cached = conn.execute("SELECT id FROM datasets WHERE user_id = ?", (user_id,)).fetchall()
+        gone = [(row[0],) for row in cached if row[0] not in keep_ids]
+        conn.executemany("DELETE FROM datasets WHERE id = ?", gone)
+        conn.commit()
+        return len(gone)
+
+    def clear(self, user_id: Optional[int] = None) -> None:
+        """Forget cached datasets for one user, or for everyone."""
+        conn = self._connection()
+        if user_id is None:
+            conn.execute("DELETE FROM datasets")
+        else:
+            conn.execute("DELETE FROM datasets WHERE user_id = ?", (user_id,))
+        conn.commit()
+
+    @staticmethod
+    def _to_record(row: sqlite3.Row) -> Dict[str, Any]:
+        record = dict(row)
+        record['equipment_distribution'] = json.loads(record['equipment_distribution'] or '{}')
+        return record
+
+
+def normalize_timestamp(value: Optional[str]) -> Optional[str]:
+    """
+    Rewrite an ISO 8601 timestamp as UTC with microseconds.
+
+    The server leaves out the fraction when it is zero ("...:05Z" vs
+    "...:05.123000Z"), so the strings as received don't sort in time order.
+    Stored in this one format, ORDER BY uploaded_at and the sync cursor do.
+    """
+    if not value:
+        return value
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return value
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+
+def sync_history(cache: LocalCache, user_id: int) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Fetch datasets newer than the newest cached one and store them.
+
+    Only new uploads come with ?since=, so afterwards the cached count is
+    compared with the server's. If they differ (datasets deleted, or
+    compacted away by the server's retention), the ids the server still has
+    are fetched and every other cached dataset is dropped.
+
+    Args:
+        cache: Local cache to update
+        user_id: Id of the logged in user
+
+    Returns:
+        The datasets fetched, newest first, and how many cached ones were removed
+
+    Raises:
+        Exception: If the server can't be reached (the cache stays usable)
+    """
+    since = cache.latest_uploaded_at(user_id)
+    fetched, total = _fetch(cache, user_id, since)
+    if since:
+        # the count above was of the new ones only (usually a 304)
+        total = APIClient.get_history(1, 0).get('count')
+    if total is None or cache.count(user_id) == total:
+        return fetched, 0
+
+    keep = set()
+    while True:
+        page = APIClient.get_history(PRUNE_PAGE_SIZE, len(keep), fields='id').get('results', [])
+        keep.update(record['id'] for record in page)
+        if len(page) < PRUNE_PAGE_SIZE:
+            break
+    removed = cache.prune(user_id, keep)
+    if cache.count(user_id) < len(keep):
+        # some never came through since= (e.g. the same uploaded_at as the
+        # cursor), fetch the whole history once
+        fetched = _fetch(cache, user_id, None)[0]
+    return fetched, removed
+
+
+def _fetch(cache: LocalCache, user_id: int, since: Optional[str]) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+    """Store every page of get-history (after since), returns the records and the server's count."""
+    fetched = []
+    while True:
+        data = APIClient.get_history(SYNC_PAGE_SIZE, len(fetched), since=since)
+        records = data.get('results', [])
+        cache.upsert(user_id, records)
+        fetched.extend(records)
+        if len(records) < SYNC_PAGE_SIZE:
+            return fetched, data.get('count')
@@ -7,8 +7,9 @@ from PyQt5.QtGui import QIcon, QFont
 from config import WINDOW_WIDTH, WINDOW_HEIGHT, WINDOW_TITLE
 from login_screen import LoginScreen
 from signup_screen import SignupScreen
-from dashboard_screen import DashboardScreen
 from auth_manager import auth_manager
+# dashboard_screen (and through it matplotlib) is imported on first use in
+# show_dashboard, so the login window doesn't wait for it
 
 
 class MainWindow(QMainWindow):
@@ -16,6 +17,7 @@ class MainWindow(QMainWindow):
     
     def __init__(self):
         super().__init__()
+        self.dashboard_screen = None
         self.init_ui()
         self.check_auth_status()
     
@@ -86,16 +88,10 @@ class MainWindow(QMainWindow):
     
     def show_dashboard(self, user_data):
         """Show dashboard screen."""
-        # Remove old dashboard if exists
-        dashboard = None
-        for i in range(self.stacked_widget.count()):
-            widget = self.stacked_widget.widget(i)
-            if isinstance(widget, DashboardScreen):
-                dashboard = widget
-                break
+        from dashboard_screen import DashboardScreen
         
-        if dashboard:
-            self.stacked_widget.removeWidget(dashboard)
+        # Remove old dashboard if exists
+        self.remove_dashboard()
         
         # Create new dashboard
         self.dashboard_screen = DashboardScreen(user_data)
@@ -103,18 +99,18 @@ class MainWindow(QMainWindow):
         self.stacked_widget.addWidget(self.dashboard_screen)
         self.stacked_widget.setCurrentWidget(self.dashboard_screen)
     
+    def remove_dashboard(self):
+        """Remove the current dashboard, if any."""
+        if self.dashboard_screen is not None:
+            self.dashboard_screen.stop_live_updates()
+            self.stacked_widget.removeWidget(self.dashboard_screen)
+            self.dashboard_screen.deleteLater()
+            self.dashboard_screen = None
+    
     def on_logout(self):
         """Handle logout."""
         # Remove dashboard
-        dashboard = None
-        for i in range(self.stacked_widget.count()):
-            widget = self.stacked_widget.widget(i)
-            if isinstance(widget, DashboardScreen):
-                dashboard = widget
-                break
-        
-        if dashboard:
-            self.stacked_widget.removeWidget(dashboard)
+        self.remove_dashboard()
         
         self.show_login()
 
@@ -128,6 +124,8 @@ def main():
     
     window = MainWindow()
     window.show()
+    # stop the dashboard's background threads before Qt tears everything down
+    app.aboutToQuit.connect(window.remove_dashboard)
     
     sys.exit(app.exec_())
 
@@ -5,7 +5,7 @@ import { AnalyticsCharts } from '../components/upload/AnalyticsCharts';
 import { UploadHistoryList } from '../components/upload/UploadHistoryList';
 import { useAuthStore } from '../store/authStore';
 import type { UploadResponse } from '../types/upload';
-import { fetchHistoryAPI } from '../services/api';
+import { fetchHistoryAPI, subscribeToDatasetEvents } from '../services/api';
 
 export const UploadDashboard = () => {
   const navigate = useNavigate();
@@ -16,17 +16,7 @@ export const UploadDashboard = () => {
   const [limit, setLimit] = useState<number>(5);
   const [offset, setOffset] = useState<number>(0);
 
-  const handleUploadSuccess = useCallback((uploadData: UploadResponse) => {
-    setCurrentUpload(uploadData);
-    setUploadHistory((prev) => [uploadData, ...prev]);
-  }, []);
-
-  const handleLogout = () => {
-    logout();
-    navigate('/login');
-  };
-
-  useEffect(() => {
+  const loadHistory = useCallback(() => {
     // Fetch upload history from API
     fetchHistoryAPI(limit, offset).then((response) => {
       // response is { count, limit, offset, results }
@@ -40,6 +30,29 @@ export const UploadDashboard = () => {
     });
   }, [limit, offset]);
 
+  const handleUploadSuccess = useCallback((uploadData: UploadResponse) => {
+    setCurrentUpload(uploadData);
+    // the same upload also arrives as a live event, only add it once
+    setUploadHistory((prev) =>
+      prev.some((upload) => upload.id === uploadData.id) ? prev : [uploadData, ...prev]
+    );
+  }, []);
+
+  const handleLogout = () => {
+    logout();
+    navigate('/login');
+  };
+
+  useEffect(() => {
+    loadHistory();
+  }, [loadHistory]);
+
+  useEffect(() => {
+    // Uploads from this user's other sessions are pushed by the server and
+    // added in place; "resync" means events were dropped, so refetch
+    return subscribeToDatasetEvents(handleUploadSuccess, loadHistory);
+  }, [handleUploadSuccess, loadHistory]);
+
   return (
     <div className="min-h-screen bg-gradient-to-br from-gray-50 to-gray-100">
       {/* Header */}
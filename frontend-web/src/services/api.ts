@@ -168,4 +168,51 @@ export const fetchHistoryAPI = async (limit: number, offset: number) => {
   return response.data;
 }
 
+// Live "dataset created" events for the logged in user (Server-Sent Events,
+// only served when the backend runs under ASGI). EventSource can't send
+// headers, so the access token goes in the query string.
+// Returns a function that closes the stream.
+export const subscribeToDatasetEvents = (
+  onCreated: (dataset: UploadResponse) => void,
+  onResync: () => void,
+) => {
+  let source: EventSource | null = null;
+  let retry: ReturnType<typeof setTimeout> | undefined;
+  let delay = 5000;
+  let closed = false;
+
+  const connect = () => {
+    const token = useAuthStore.getState().accessToken;
+    if (!token || closed) return;
+
+    source = new EventSource(`${api.defaults.baseURL}/events/?token=${encodeURIComponent(token)}`);
+    source.onopen = () => {
+      delay = 5000;
+    };
+    source.onmessage = (message) => {
+      const event = JSON.parse(message.data);
+      if (event.type === 'dataset.created') {
+        onCreated(event.dataset);
+      } else if (event.type === 'resync') {
+        onResync();
+      }
+    };
+    source.onerror = () => {
+      // EventSource retries dropped connections by itself, but gives up on
+      // errors like a 401 once the token expired: reconnect with the current one
+      if (source?.readyState === EventSource.CLOSED) {
+        retry = setTimeout(connect, delay);
+        delay = Math.min(delay * 2, 60000);
+      }
+    };
+  };
+
+  connect();
+  return () => {
+    closed = true;
+    clearTimeout(retry);
+    source?.close();
+  };
+};
+
 export default api;